@@ -0,0 +1,115 @@
+"""Benchmark concurrent AWSProvider uploads against a local S3 stand-in
+
+Starts a moto S3 server in-process, uploads a set of generated assets
+through a single shared AWSProvider from many threads, and reports the
+throughput for several connection pool sizes as JSON. "Connection pool is
+full" warnings emitted by urllib3 are counted for each run.
+
+Requires moto with server support:
+
+    pip install "moto[server]"
+    python benchmarks/bench_aws_upload.py --files 200 --threads 32
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_corpus.providers.aws import AWSProvider  # noqa: E402
+
+
+class PoolFullCounter(logging.Handler):
+    """Count urllib3 warnings about discarded connections"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if 'Connection pool is full' in record.getMessage():
+            self.count += 1
+
+
+def run(endpoint_url, files, threads, pool_connections, max_concurrency):
+    """Upload all files once and return throughput figures"""
+    provider = AWSProvider(
+        bucket='bench',
+        access_key='testing',
+        secret_key='testing',
+        region='us-east-1',
+        endpoint_url=endpoint_url,
+        max_pool_connections=pool_connections,
+        max_concurrency=max_concurrency
+    )
+    counter = PoolFullCounter()
+    logging.getLogger('urllib3.connectionpool').addHandler(counter)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(provider.upload_file, files))
+        elapsed = time.perf_counter() - start
+    finally:
+        logging.getLogger('urllib3.connectionpool').removeHandler(counter)
+    total_bytes = sum(os.path.getsize(f) for f in files)
+    return {
+        'max_pool_connections': pool_connections,
+        'threads': threads,
+        'files': len(files),
+        'seconds': round(elapsed, 3),
+        'uploads_per_sec': round(len(files) / elapsed, 1),
+        'bytes_per_sec': round(total_bytes / elapsed),
+        'pool_full_warnings': counter.count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200, help='Number of assets to upload')
+    parser.add_argument('--size', type=int, default=64 * 1024, help='Size of each asset in bytes')
+    parser.add_argument('--threads', type=int, default=32, help='Number of concurrent upload threads')
+    parser.add_argument('--pool-sizes', default='10,32,64', help='Comma separated connection pool sizes')
+    parser.add_argument('--max-concurrency', type=int, default=10, help='Multipart concurrency per file')
+    args = parser.parse_args()
+
+    try:
+        import boto3
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('moto[server] is required: pip install "moto[server]"')
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint_url = f'http://{host}:{port}'
+    try:
+        boto3.client('s3', region_name='us-east-1', endpoint_url=endpoint_url).create_bucket(Bucket='bench')
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for i in range(args.files):
+                path = Path(tmp) / f'asset-{i}.png'
+                path.write_bytes(os.urandom(args.size))
+                files.append(str(path))
+            results = [
+                run(endpoint_url, files, args.threads, int(pool_size), args.max_concurrency)
+                for pool_size in args.pool_sizes.split(',')
+            ]
+    finally:
+        server.stop()
+
+    json.dump({'benchmark': 'aws_upload', 'results': results}, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Micro-benchmark of link scanning and rewriting on large generated documents
+
+Compares the single-pass scanner in md_corpus.links with the previous
+implementation (two chained re.sub passes with per-call compiled patterns)
+on multi-MB documents and reports MB/s as JSON.
+
+    python benchmarks/bench_scanner.py --size-mb 4 --link-every 40
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_corpus.links import replace_targets, scan_links  # noqa: E402
+
+
+def generate_document(size_bytes, link_every, seed=0):
+    """Generate Markdown prose with a link, image or <img> tag every link_every lines"""
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit']
+    lines = []
+    size = 0
+    while size < size_bytes:
+        if len(lines) % link_every == 0:
+            n = rng.randrange(1000)
+            line = rng.choice([
+                f'![figure {n}](./images/figure-{n}.png)',
+                f'See [the guide](../guide/page-{n}.md) for details.',
+                f'<img src="./images/shot-{n}.jpg" alt="shot {n}">',
+                f'[external](https://example.com/page/{n})',
+            ])
+        else:
+            line = ' '.join(rng.choice(words) for _ in range(12))
+        lines.append(line)
+        size += len(line) + 1
+    return '\n'.join(lines)
+
+
+def legacy_rewrite(content, urls):
+    """The previous two-pass implementation, compiling patterns on every call"""
+    def replace_match(match):
+        prefix, path, suffix = match.groups()
+        url = urls.get(path)
+        return f'{prefix}{url}{suffix}' if url else match.group(0)
+    content = re.sub(r'(!?\[.*?\]\()([^http].*?)(\))', replace_match, content)
+    return re.sub(r'(<img\s+[^>]*src=")([^"]+)(")', replace_match, content)
+
+
+def scanner_rewrite(content, urls):
+    """The single-pass scanner and slice-based rewrite"""
+    return replace_targets(content, scan_links(content), urls)
+
+
+def timed(func, content, urls, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content, urls)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=4, help='Size of the generated document in MB')
+    parser.add_argument('--link-every', type=int, default=40, help='Emit a link every N lines')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions; the best time is reported')
+    args = parser.parse_args()
+
+    content = generate_document(int(args.size_mb * 1024 * 1024), args.link_every)
+    targets = [link.target for link in scan_links(content)]
+    urls = {target: f'https://cdn.example.com/{Path(target).name}' for target in targets}
+    megabytes = len(content.encode()) / (1024 * 1024)
+
+    results = {}
+    for name, func in (('legacy_two_pass', legacy_rewrite), ('single_pass', scanner_rewrite)):
+        seconds = timed(func, content, urls, args.repeat)
+        results[name] = {'seconds': round(seconds, 4), 'mb_per_sec': round(megabytes / seconds, 1)}
+
+    json.dump({
+        'benchmark': 'link_scanner',
+        'document_mb': round(megabytes, 2),
+        'links': len(targets),
+        'results': results,
+    }, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
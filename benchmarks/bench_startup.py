@@ -0,0 +1,74 @@
+"""Measure the import time of the md-corpus CLI
+
+Runs `python -X importtime -c "import md_corpus.cli"` several times and
+reports the best cumulative import time of md_corpus.cli as JSON. The run
+fails if any of the heavy optional modules (provider SDKs, mdformat) were
+imported at startup, or if the import time exceeds --max-ms.
+
+    python benchmarks/bench_startup.py --runs 5 --max-ms 150
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported by the commands that need them
+LAZY_MODULES = ('boto3', 'botocore', 'oss2', 'mdformat', 'markdown_it', 'sqlite3')
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def measure():
+    """Run one interpreter and return (cumulative microseconds, imported module names)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import md_corpus.cli'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative = None
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        modules.add(match.group(4).split('.')[0])
+        if match.group(4) == 'md_corpus.cli':
+            cumulative = int(match.group(2))
+    return cumulative, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Number of interpreter runs')
+    parser.add_argument('--max-ms', type=float, help='Fail if the best import time exceeds this many ms')
+    args = parser.parse_args()
+
+    timings = []
+    eager = set()
+    for _ in range(args.runs):
+        cumulative, modules = measure()
+        timings.append(cumulative / 1000)
+        eager |= modules & set(LAZY_MODULES)
+
+    report = {
+        'benchmark': 'cli_startup',
+        'runs': args.runs,
+        'best_ms': round(min(timings), 1),
+        'median_ms': round(sorted(timings)[len(timings) // 2], 1),
+        'eager_heavy_modules': sorted(eager),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+    if eager:
+        sys.exit(f"Heavy modules imported at startup: {', '.join(sorted(eager))}")
+    if args.max_ms is not None and report['best_ms'] > args.max_ms:
+        sys.exit(f"CLI import took {report['best_ms']} ms, limit is {args.max_ms} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Synthetic Markdown corpus generator for benchmarks"""
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Union
+
+WORDS = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit',
+         'sed', 'do', 'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore']
+
+
+@dataclass
+class CorpusSpec:
+    """Shape of a generated corpus
+
+    Attributes:
+        files: Number of Markdown documents
+        doc_size: Approximate size of each document in bytes
+        link_density: Local asset links per KB of document text
+        asset_size: Size of each asset in bytes
+        shared_ratio: Fraction of links that point into a shared asset pool
+            referenced by all documents (the rest point to per-document assets)
+        shared_assets: Number of assets in the shared pool
+        dirs: Number of subdirectories the documents are spread over
+        seed: Random seed, so that the same spec always generates the same corpus
+    """
+    files: int = 200
+    doc_size: int = 4096
+    link_density: float = 1.0
+    asset_size: int = 16 * 1024
+    shared_ratio: float = 0.5
+    shared_assets: int = 20
+    dirs: int = 10
+    seed: int = 0
+
+
+def _paragraph(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def _messy_list(rng: random.Random) -> str:
+    """A list in a style mdformat rewrites, so formatting has real work to do"""
+    return '\n'.join(f'* {_paragraph(rng, 40)}' for _ in range(rng.randint(2, 5)))
+
+
+def generate_corpus(root: Union[str, Path], spec: CorpusSpec) -> Path:
+    """Write a synthetic corpus of documents and assets
+
+    Args:
+        root: Directory to create the corpus in
+        spec: Shape of the corpus
+
+    Returns:
+        Path: The corpus root directory
+    """
+    rng = random.Random(spec.seed)
+    root = Path(root)
+    shared_dir = root / 'shared'
+    shared_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(spec.shared_assets):
+        (shared_dir / f'shared-{i}.png').write_bytes(rng.randbytes(spec.asset_size))
+
+    links_per_doc = max(0, round(spec.link_density * spec.doc_size / 1024))
+    for n in range(spec.files):
+        doc_dir = root / f'section-{n % spec.dirs}'
+        (doc_dir / 'images').mkdir(parents=True, exist_ok=True)
+        blocks = [f'# Document {n}']
+        for k in range(links_per_doc):
+            if rng.random() < spec.shared_ratio:
+                target = f'../shared/shared-{rng.randrange(spec.shared_assets)}.png'
+            else:
+                name = f'doc-{n}-{k}.png'
+                (doc_dir / 'images' / name).write_bytes(rng.randbytes(spec.asset_size))
+                target = f'./images/{name}'
+            blocks.append(f'![figure {k}]({target})')
+        size = sum(len(block) for block in blocks)
+        while size < spec.doc_size:
+            block = _messy_list(rng) if rng.random() < 0.3 else _paragraph(rng, 300)
+            blocks.append(block)
+            size += len(block) + 2
+        rng.shuffle(blocks[1:])
+        (doc_dir / f'doc-{n}.md').write_text('\n\n'.join(blocks) + '\n', encoding='utf-8')
+    return root
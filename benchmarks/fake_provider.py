@@ -0,0 +1,46 @@
+"""In-process storage provider with configurable latency and bandwidth"""
+
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from md_corpus.providers.base import StorageProvider
+
+
+class LatencyProvider(StorageProvider):
+    """StorageProvider that simulates network cost without network access
+
+    Every upload sleeps for the per-request latency plus the time needed to
+    transfer the file at the configured bandwidth. Sleeping releases the GIL,
+    so concurrent uploads overlap like real network requests.
+    """
+
+    def __init__(self, latency: float = 0.02, bandwidth: float = 50 * 1024 * 1024,
+                 base_url: str = 'https://bench.example.com'):
+        """Initialize the provider
+
+        Args:
+            latency: Seconds of latency per request
+            bandwidth: Transfer rate in bytes per second (0 for unlimited)
+            base_url: Base URL of returned file URLs
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.base_url = base_url
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+
+    def upload_file(self, file_path: str) -> str:
+        file_path = Path(file_path)
+        size = file_path.stat().st_size
+        delay = self.latency + (size / self.bandwidth if self.bandwidth else 0)
+        time.sleep(delay)
+        with self._lock:
+            self.uploads += 1
+            self.bytes_uploaded += size
+        return self.get_file_url(file_path.name)
+
+    def get_file_url(self, file_key: str) -> str:
+        return f'{self.base_url}/{quote(file_key)}'
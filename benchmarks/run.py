@@ -0,0 +1,140 @@
+"""Throughput benchmarks for md-corpus
+
+Generates a synthetic corpus, then measures files/sec, uploads/sec and
+bytes/sec of format_directory, convert_directory (against an in-process
+provider with simulated latency and bandwidth) and _process_content.
+Results are written as JSON so that they can be compared between releases.
+
+    python benchmarks/run.py --files 500 --latency 0.02 --output results.json
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_corpus import MDCorpus, __version__  # noqa: E402
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+from fake_provider import LatencyProvider  # noqa: E402
+
+
+def corpus_bytes(root):
+    return sum(path.stat().st_size for path in Path(root).rglob('*.md'))
+
+
+def bench_format_directory(template, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(shutil.copytree(template, Path(tmp) / 'corpus'))
+        size = corpus_bytes(root)
+        start = time.perf_counter()
+        files = MDCorpus(None).format_directory(root, workers=workers)
+        seconds = time.perf_counter() - start
+    return {
+        'workers': workers,
+        'files': len(files),
+        'seconds': round(seconds, 3),
+        'files_per_sec': round(len(files) / seconds, 1),
+        'bytes_per_sec': round(size / seconds),
+    }
+
+
+def bench_convert_directory(template, workers, upload_workers, latency, bandwidth):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(shutil.copytree(template, Path(tmp) / 'corpus'))
+        size = corpus_bytes(root)
+        provider = LatencyProvider(latency=latency, bandwidth=bandwidth)
+        corpus = MDCorpus(provider, upload_workers=upload_workers)
+        start = time.perf_counter()
+        files = corpus.convert_directory(root, workers=workers)
+        seconds = time.perf_counter() - start
+    return {
+        'workers': workers,
+        'upload_workers': upload_workers,
+        'files': len(files),
+        'uploads': provider.uploads,
+        'seconds': round(seconds, 3),
+        'files_per_sec': round(len(files) / seconds, 1),
+        'uploads_per_sec': round(provider.uploads / seconds, 1),
+        'bytes_per_sec': round(size / seconds),
+        'upload_bytes_per_sec': round(provider.bytes_uploaded / seconds),
+    }
+
+
+def bench_process_content(template, upload_workers, latency, bandwidth):
+    docs = sorted(Path(template).rglob('*.md'))
+    contents = [(doc.read_text(encoding='utf-8'), doc.parent) for doc in docs]
+    size = sum(len(content.encode()) for content, _ in contents)
+    provider = LatencyProvider(latency=latency, bandwidth=bandwidth)
+    corpus = MDCorpus(provider, upload_workers=upload_workers)
+    start = time.perf_counter()
+    for content, base_path in contents:
+        corpus._process_content(content, base_path)
+    seconds = time.perf_counter() - start
+    return {
+        'upload_workers': upload_workers,
+        'documents': len(contents),
+        'uploads': provider.uploads,
+        'seconds': round(seconds, 3),
+        'docs_per_sec': round(len(contents) / seconds, 1),
+        'uploads_per_sec': round(provider.uploads / seconds, 1),
+        'bytes_per_sec': round(size / seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200, help='Number of documents')
+    parser.add_argument('--doc-size', type=int, default=4096, help='Approximate document size in bytes')
+    parser.add_argument('--link-density', type=float, default=1.0, help='Asset links per KB of text')
+    parser.add_argument('--asset-size', type=int, default=16 * 1024, help='Asset size in bytes')
+    parser.add_argument('--shared-ratio', type=float, default=0.5, help='Fraction of links to shared assets')
+    parser.add_argument('--latency', type=float, default=0.02, help='Simulated seconds of latency per upload')
+    parser.add_argument('--bandwidth', type=float, default=50 * 1024 * 1024,
+                        help='Simulated upload bandwidth in bytes/sec (0 for unlimited)')
+    parser.add_argument('--workers', default='1,4', help='Comma separated process pool sizes')
+    parser.add_argument('--upload-workers', default='1,8', help='Comma separated upload thread counts')
+    parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    spec = CorpusSpec(files=args.files, doc_size=args.doc_size, link_density=args.link_density,
+                      asset_size=args.asset_size, shared_ratio=args.shared_ratio)
+    workers = [int(n) for n in args.workers.split(',')]
+    upload_workers = [int(n) for n in args.upload_workers.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = generate_corpus(Path(tmp) / 'template', spec)
+        results = {
+            'format_directory': [bench_format_directory(template, n) for n in workers],
+            'convert_directory': [
+                bench_convert_directory(template, n, u, args.latency, args.bandwidth)
+                for n in workers for u in upload_workers
+            ],
+            'process_content': [
+                bench_process_content(template, u, args.latency, args.bandwidth) for u in upload_workers
+            ],
+        }
+
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'corpus': asdict(spec),
+        'provider': {'latency': args.latency, 'bandwidth': args.bandwidth},
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
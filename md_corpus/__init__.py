@@ -2,29 +2,126 @@
 md-corpus - A Python package for integrating Markdown files with cloud object storage
 """
 
-from typing import Union, List
+import inspect
+import time
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, Union, List
 from pathlib import Path
-import re
-import mdformat
+from urllib.parse import unquote
 
-from .providers.base import StorageProvider
-from .exceptions import MDCorpusError
+from .providers.base import StorageProvider, object_key, upload_concurrently
+from .exceptions import BatchError, MDCorpusError
+from .formatter import Formatter
+from .links import LinkTarget, has_local_links, is_local_target, replace_targets, scan_links
+from .metrics import Metrics
+from .ratelimit import AdaptiveLimiter
+from .state import IncrementalState
+from .utils import atomic_write_text, file_sha256
+from .walker import CorpusWalker
+
+if TYPE_CHECKING:
+    from .images import ImageOptimizer
+    from .journal import ConversionJournal
+    from .linkgraph import LinkGraph
+    from .manifest import AssetManifest
+    from .shard import Shard
+
+@dataclass
+class FileResult:
+    """Outcome of processing a single Markdown file
+    
+    Attributes:
+        path: Path of the processed file
+        content: Content of the file after processing
+        changed: Whether the file was rewritten
+        assets: URL of every referenced local asset (None if its upload failed)
+    """
+    path: str
+    content: str
+    changed: bool
+    assets: Dict[Path, Optional[str]] = field(default_factory=dict)
 
 class MDCorpus:
     """Main class for handling Markdown file conversions"""
     
-    def __init__(self, provider: StorageProvider):
+    def __init__(
+        self,
+        provider: StorageProvider,
+        manifest: Optional['AssetManifest'] = None,
+        upload_workers: int = 8,
+        formatter: Optional[Formatter] = None,
+        batch_size: int = 64,
+        limiter: Optional[AdaptiveLimiter] = None,
+        metrics: Optional[Metrics] = None,
+        optimizer: Optional['ImageOptimizer'] = None,
+        link_graph: Optional['LinkGraph'] = None,
+        skip_unlinked: bool = False,
+        shard: Optional['Shard'] = None,
+        journal: Optional['ConversionJournal'] = None
+    ):
         """Initialize MDCorpus with a storage provider
         
         Args:
             provider: An instance of StorageProvider for handling cloud storage operations
+            manifest: Optional persistent asset manifest used to skip uploads of
+                assets that were already uploaded in a previous run
+            upload_workers: Maximum number of concurrent uploads per batch
+            formatter: Formatter used for all documents (default mdformat settings if not set)
+            batch_size: Number of documents of a directory whose assets are uploaded together
+            limiter: Limiter shared by all uploads; throttled uploads are retried with
+                backoff (default: an AdaptiveLimiter allowing upload_workers uploads at once)
+            metrics: Collector of per-stage timings (read, format, scan, upload, write)
+                and file counters (a new collector if not set)
+            optimizer: Optional image optimizer applied to assets before they are uploaded
+            link_graph: Optional persistent graph of the assets referenced by each
+                converted document, used by refresh_asset
+            skip_unlinked: When converting, leave documents that cannot have local
+                links as they are instead of formatting them
+            shard: Optional shard of the corpus handled by this instance. Directory
+                runs only process the documents of the shard and only upload the
+                assets it owns; the URLs of other assets are derived from their
+                object keys. Requires a provider with get_file_url.
+            journal: Optional journal every finished upload and directory document
+                is recorded in. Documents it already records as finished are
+                skipped by process_directory and its uploads are reused, so an
+                interrupted run can be resumed.
+            
+        Raises:
+            MDCorpusError: If sharding with a provider that cannot derive URLs
         """
         self.provider = provider
         self.storage = provider  # For backward compatibility with tests
+        self.manifest = manifest
+        self.upload_workers = upload_workers
+        self.formatter = formatter or Formatter()
+        self.batch_size = max(1, batch_size)
+        self.limiter = limiter or AdaptiveLimiter(max_concurrency=upload_workers)
+        self.metrics = metrics or Metrics()
+        self.optimizer = optimizer
+        self.link_graph = link_graph
+        self.skip_unlinked = skip_unlinked
+        self.shard = shard
+        self.journal = journal
+        if shard is not None and provider is not None and not hasattr(provider, 'get_file_url'):
+            raise MDCorpusError("Sharding requires a provider with get_file_url")
+        # Scope of the URLs recorded in the manifest and journal, see _upload_scope
+        self.upload_scope = self._upload_scope()
+        # Error message of every asset whose upload failed, keyed by asset path
+        self.upload_errors: Dict[str, str] = {}
+        # Per-instance upload cache keyed by (content digest, file name)
+        self._uploaded: Dict[Tuple[str, str], str] = {}
+        # With object keys derived from the file name, an upload overwrites the
+        # object of every other digest with that name; the digest of the last
+        # upload of each name is kept to drop the overwritten cache entries
+        self._name_keyed = getattr(provider, 'key_strategy', 'name') != 'hash'
+        self._uploaded_names: Dict[str, str] = {}
         
     def convert_file(self, file_path: Union[str, Path]) -> str:
         """Convert local resource links in a single Markdown file to cloud storage URLs
         
+        The file is formatted before its links are converted. See process_file.
+        
         Args:
             file_path: Path to the Markdown file
             
@@ -34,46 +131,33 @@ class MDCorpus:
         Raises:
             MDCorpusError: If file operations fail
         """
-        file_path = Path(file_path)
-        if not file_path.exists():
-            raise MDCorpusError(f"File not found: {file_path}")
-            
-        try:
-            # First format the file
-            self.format_file(file_path)
-            
-            # Then convert image links
-            content = file_path.read_text(encoding='utf-8')
-            converted = self._process_content(content, file_path.parent)
-            file_path.write_text(converted, encoding='utf-8')
-            return converted
-        except Exception as e:
-            raise MDCorpusError(f"Failed to process file {file_path}: {str(e)}")
+        return self.process_file(file_path).content
     
-    def convert_directory(self, dir_path: Union[str, Path]) -> List[str]:
+    def convert_directory(
+        self,
+        dir_path: Union[str, Path],
+        workers: int = 1,
+        state: Optional[IncrementalState] = None
+    ) -> List[str]:
         """Convert local resource links in all Markdown files in a directory
         
         Args:
             dir_path: Path to the directory containing Markdown files
+            workers: Number of worker processes used for formatting. Link
+                conversion and uploads always run in the calling process.
+            state: Optional incremental state; only files that changed since
+                they were last converted are processed, and the state is saved
+                when the run ends
             
         Returns:
-            List[str]: List of processed file paths
+            List[str]: List of processed file paths, sorted by path
             
         Raises:
-            MDCorpusError: If directory operations fail
+            MDCorpusError: If the directory does not exist
+            BatchError: If some files failed; all other files are still processed
         """
-        dir_path = Path(dir_path)
-        if not dir_path.is_dir():
-            raise MDCorpusError(f"Directory not found: {dir_path}")
-            
-        processed_files = []
-        try:
-            for md_file in dir_path.glob("**/*.md"):
-                self.convert_file(md_file)
-                processed_files.append(str(md_file))
-            return processed_files
-        except Exception as e:
-            raise MDCorpusError(f"Failed to process directory {dir_path}: {str(e)}")
+        results = self.process_directory(dir_path, workers=workers, state=state)
+        return [result.path for result in results]
 
     def format_file(self, file_path: Union[str, Path]) -> str:
         """Format a single Markdown file
@@ -84,45 +168,624 @@ class MDCorpus:
         Returns:
             str: The formatted Markdown content
             
+        Raises:
+            MDCorpusError: If file operations fail
+        """
+        return self.process_file(file_path, convert=False).content
+    
+    def format_directory(
+        self,
+        dir_path: Union[str, Path],
+        workers: int = 1,
+        state: Optional[IncrementalState] = None
+    ) -> List[str]:
+        """Format all Markdown files in a directory
+        
+        Args:
+            dir_path: Path to the directory containing Markdown files
+            workers: Number of worker processes used for formatting
+            state: Optional incremental state; only files that changed since
+                they were last formatted are processed, and the state is saved
+                when the run ends
+            
+        Returns:
+            List[str]: List of processed file paths, sorted by path
+            
+        Raises:
+            MDCorpusError: If the directory does not exist
+            BatchError: If some files failed; all other files are still processed
+        """
+        results = self.process_directory(dir_path, convert=False, workers=workers, state=state)
+        return [result.path for result in results]
+    
+    def format_text(self, content: str) -> str:
+        """Format a Markdown string
+        
+        Args:
+            content: Markdown content
+            
+        Returns:
+            str: The formatted Markdown content
+        """
+        return self.formatter.format(content)
+    
+    def format_texts(self, contents: Iterable[str]) -> Iterator[str]:
+        """Format a stream of Markdown strings, e.g. from git blobs, a database or stdin
+        
+        The parser is set up once and reused for every item.
+        
+        Args:
+            contents: Markdown contents
+            
+        Yields:
+            str: Each formatted content, in input order
+        """
+        return self.formatter.format_many(contents)
+    
+    def process_file(self, file_path: Union[str, Path], convert: bool = True) -> FileResult:
+        """Format a Markdown file and optionally convert its local resource links
+        
+        The file is read once, formatted and converted in memory, and written
+        atomically (temporary file and rename) only if its content changed.
+        When converting, a byte-level prefilter lets documents without local
+        links skip the link scan (and formatting if skip_unlinked is set).
+        
+        Args:
+            file_path: Path to the Markdown file
+            convert: Whether to convert local resource links after formatting
+            
+        Returns:
+            FileResult: The new content of the file and whether it changed
+            
         Raises:
             MDCorpusError: If file operations fail
         """
         file_path = Path(file_path)
         if not file_path.exists():
             raise MDCorpusError(f"File not found: {file_path}")
-            
+        
         try:
-            content = file_path.read_text(encoding='utf-8')
-            formatted = mdformat.text(content)
-            file_path.write_text(formatted, encoding='utf-8')
-            return formatted
+            formatted, changed, linked, timings = _read_and_format(
+                file_path, self.formatter, convert, convert and self.skip_unlinked)
         except Exception as e:
             raise MDCorpusError(f"Failed to format file {file_path}: {str(e)}")
+        self._record_timings(timings)
+        links = None
+        if convert and not linked:
+            links = []
+            self.metrics.increment('files_fast_path')
+        return self._finish_file(file_path, formatted, changed, convert, links=links)
     
-    def format_directory(self, dir_path: Union[str, Path]) -> List[str]:
-        """Format all Markdown files in a directory
+    def process_directory(
+        self,
+        dir_path: Union[str, Path],
+        convert: bool = True,
+        workers: int = 1,
+        state: Optional[IncrementalState] = None,
+        walker: Optional[CorpusWalker] = None
+    ) -> List[FileResult]:
+        """Format, and optionally convert, all Markdown files in a directory
+        
+        Files are processed in batches as the walker finds them, so the first
+        batch starts before the whole tree has been walked.
+        
+        With a shard, only the documents of the shard are processed. When
+        converting, the documents of other shards are still scanned for local
+        links, and the assets this shard owns are uploaded once its own
+        documents were processed without errors, so that every asset is
+        uploaded by exactly one shard even if none of the documents of its
+        owner references it.
         
         Args:
             dir_path: Path to the directory containing Markdown files
+            convert: Whether to convert local resource links after formatting
+            workers: Number of worker processes used for formatting. Link
+                conversion, uploads and writes always run in the calling process.
+            state: Optional incremental state; only files that changed since
+                they were last processed are processed, and the state is saved
+                when the run ends
+            walker: Walker listing the files (default: *.md files, honouring
+                .gitignore and .mdcorpusignore and skipping VCS directories)
             
         Returns:
-            List[str]: List of processed file paths
+            List[FileResult]: One result per processed file of the shard, sorted by path
             
         Raises:
-            MDCorpusError: If directory operations fail
+            MDCorpusError: If the directory does not exist
+            BatchError: If some files failed; all other files are still processed
         """
         dir_path = Path(dir_path)
         if not dir_path.is_dir():
             raise MDCorpusError(f"Directory not found: {dir_path}")
+        md_files = (walker or CorpusWalker()).walk(dir_path)
+        other_assets: Set[Path] = set()
+        if self.shard is not None:
+            md_files = self._shard_files(md_files, dir_path, other_assets if convert else None)
+        mode = 'convert' if convert else 'format'
+        if self.journal is not None:
+            md_files = self._unfinished(md_files, mode)
+        if state is not None:
+            md_files = (md_file for md_file in md_files if state.is_dirty(mode, md_file))
+        results = self.process_files(md_files, convert, workers, state, description=f"files in {dir_path}")
+        if other_assets:
+            self._upload_assets(other_assets)
+        # A parallel walker finds files out of order
+        results.sort(key=lambda result: Path(result.path))
+        return results
+    
+    def process_files(
+        self,
+        file_paths: Iterable[Union[str, Path]],
+        convert: bool = True,
+        workers: int = 1,
+        state: Optional[IncrementalState] = None,
+        description: str = "files"
+    ) -> List[FileResult]:
+        """Format, and optionally convert, a list of Markdown files
+        
+        Args:
+            file_paths: Markdown files to process; an iterator is consumed batch by batch
+            convert: Whether to convert local resource links after formatting
+            workers: Number of worker processes used for formatting
+            state: Optional incremental state; every processed file is recorded
+                in it and the state is saved when the run ends. Files are not
+                filtered by it.
+            description: What the files are, used in the BatchError message
+            
+        Returns:
+            List[FileResult]: One result per processed file, in input order
+            
+        Raises:
+            BatchError: If some files failed; all other files are still processed
+        """
+        md_files = (Path(file_path) for file_path in file_paths)
+        mode = 'convert' if convert else 'format'
+        results = []
+        errors = {}
+        try:
+            for md_file, result, error in self._process_files(md_files, convert, workers):
+                if error is not None:
+                    errors[str(md_file)] = str(error)
+                    self.metrics.increment('files_failed')
+                    continue
+                if convert and state is not None:
+                    try:
+                        result = self._update_recorded_assets(state, md_file, result)
+                    except MDCorpusError as e:
+                        errors[str(md_file)] = str(e)
+                        self.metrics.increment('files_failed')
+                        continue
+                results.append(result)
+                if self.journal is not None and all(result.assets.values()):
+                    self.journal.record_document(mode, md_file, result.content)
+                if state is not None:
+                    # Keep documents with failed uploads dirty so the next run retries them
+                    state.record(mode, md_file, result.assets, complete=all(result.assets.values()))
+        finally:
+            if state is not None:
+                state.save()
+        
+        if errors:
+            verb = 'process' if convert else 'format'
+            raise BatchError(f"Failed to {verb} {len(errors)} of {len(errors) + len(results)} {description}",
+                             errors, [result.path for result in results])
+        return results
+    
+    def _update_recorded_assets(self, state: IncrementalState, file_path: Path, result: FileResult) -> FileResult:
+        """Keep the assets recorded for a converted document and upload those that changed
+        
+        Once converted, a document links its assets by URL, so converting it
+        again finds no local links. Recorded assets whose URL still appears in
+        the content are therefore kept, as in _record_links. Those that changed
+        since they were recorded are uploaded again and their links are
+        pointed to the new URL.
+        
+        Args:
+            state: Incremental state the document was recorded in
+            file_path: Path to the converted document
+            result: Result of converting the document
+            
+        Returns:
+            FileResult: The result with the kept assets added. A changed asset
+            whose upload failed is mapped to None and its links are left as they are.
             
-        processed_files = []
+        Raises:
+            MDCorpusError: If the updated document cannot be written
+        """
+        recorded = {asset: url for asset, url in state.assets('convert', file_path).items()
+                    if url and url in result.content and asset not in result.assets and asset.is_file()}
+        if not recorded:
+            return result
+        changed = state.changed_assets('convert', file_path) & recorded.keys()
+        urls = self._upload_assets(changed) if changed else {}
+        assets = {**recorded, **{asset: urls.get(asset) for asset in changed}, **result.assets}
+        replacements = {recorded[asset]: url for asset, url in urls.items() if url != recorded[asset]}
+        links = [link for link in self._scan_links(result.content) if link.target in replacements]
+        if not links:
+            return FileResult(result.path, result.content, result.changed, assets)
+        content = replace_targets(result.content, links, replacements)
         try:
-            for md_file in dir_path.glob("**/*.md"):
-                self.format_file(md_file)
-                processed_files.append(str(md_file))
-            return processed_files
+            start = time.perf_counter()
+            nbytes = atomic_write_text(file_path, content)
+            self.metrics.observe('write', time.perf_counter() - start, nbytes)
+        except OSError as e:
+            raise MDCorpusError(f"Failed to process file {file_path}: {str(e)}")
+        if not result.changed:
+            self.metrics.increment('files_changed')
+        if self.link_graph is not None:
+            self._record_links(file_path, content, assets)
+        return FileResult(result.path, content, True, assets)
+    
+    def _unfinished(self, md_files: Iterable[Path], mode: str) -> Iterator[Path]:
+        """Skip the documents the journal records as finished and unchanged since
+        
+        Args:
+            md_files: Documents to process
+            mode: Processing mode, "format" or "convert"
+            
+        Yields:
+            Path: Each document that still needs processing
+        """
+        for md_file in md_files:
+            if self.journal.is_done(mode, md_file):
+                self.metrics.increment('files_resumed')
+            else:
+                yield md_file
+    
+    def _shard_files(
+        self,
+        md_files: Iterable[Path],
+        root: Path,
+        other_assets: Optional[Set[Path]] = None
+    ) -> Iterator[Path]:
+        """Keep the documents of this shard
+        
+        Args:
+            md_files: Documents found below root
+            root: Walked directory the document keys are relative to
+            other_assets: If set, the local assets referenced by the documents
+                of other shards are added to it. Unreadable documents are left
+                to the shard that owns them.
+            
+        Yields:
+            Path: Each document owned by this shard
+        """
+        for md_file in md_files:
+            if self.shard.owns(md_file.relative_to(root).as_posix()):
+                yield md_file
+                continue
+            if other_assets is None:
+                continue
+            try:
+                data = md_file.read_bytes()
+                if not has_local_links(data):
+                    continue
+                links = self._scan_links(data.decode('utf-8'))
+            except (OSError, UnicodeDecodeError):
+                continue
+            other_assets.update(self._collect_targets(links, md_file.parent).values())
+    
+    def _process_files(
+        self,
+        md_files: Iterable[Path],
+        convert: bool,
+        workers: int
+    ) -> Iterator[Tuple[Path, Optional[FileResult], Optional[Exception]]]:
+        """Process files in batches, formatting them in a process pool when workers > 1
+        
+        The assets of all documents in a batch are uploaded together with a
+        single upload_many call before the documents are rewritten. Documents
+        the prefilter finds no local links in are not scanned.
+        
+        Args:
+            md_files: Markdown files to process
+            convert: Whether to convert local resource links after formatting
+            workers: Number of worker processes
+            
+        Yields:
+            Tuple[Path, Optional[FileResult], Optional[Exception]]: Each file with its
+            result or the error raised while processing it, in the same order as md_files
+        """
+        for batch in self._format_batches(md_files, workers, convert):
+            urls = None
+            links = {}
+            if convert:
+                assets = set()
+                for md_file, formatted, error in batch:
+                    if error is not None:
+                        continue
+                    content, _, linked = formatted
+                    if not linked:
+                        links[md_file] = []
+                        self.metrics.increment('files_fast_path')
+                        continue
+                    links[md_file] = self._scan_links(content)
+                    assets.update(self._collect_targets(links[md_file], md_file.parent).values())
+                urls = self._upload_assets(assets)
+            for md_file, formatted, error in batch:
+                if error is not None:
+                    yield md_file, None, error
+                    continue
+                try:
+                    content, changed, _ = formatted
+                    yield md_file, self._finish_file(md_file, content, changed, convert, urls, links.get(md_file)), None
+                except Exception as e:
+                    yield md_file, None, e
+    
+    def _format_batches(
+        self,
+        md_files: Iterable[Path],
+        workers: int,
+        convert: bool = False
+    ) -> Iterator[List[Tuple[Path, Optional[Tuple[str, bool, bool]], Optional[Exception]]]]:
+        """Read and format files, yielding them in batches of batch_size
+        
+        With several workers the next batch is submitted to the process pool
+        before the current one is returned, so formatting overlaps with the
+        uploads and writes of the caller.
+        
+        Args:
+            md_files: Markdown files to format, taken one batch at a time
+            workers: Number of worker processes
+            convert: Whether the files are converted; their raw content is then
+                checked for local links
+            
+        Yields:
+            List[Tuple[Path, Optional[Tuple[str, bool, bool]], Optional[Exception]]]: Each
+            file with its formatted content, whether it changed and whether it may
+            have local links, or the formatting error
+        """
+        files = iter(md_files)
+        batches = iter(lambda: list(islice(files, self.batch_size)), [])
+        
+        skip_unlinked = convert and self.skip_unlinked
+        
+        def collect(md_file, fmt):
+            try:
+                formatted, changed, linked, timings = fmt()
+            except Exception as e:
+                return md_file, None, MDCorpusError(f"Failed to format file {md_file}: {str(e)}")
+            self._record_timings(timings)
+            return md_file, (formatted, changed, linked), None
+        
+        first = next(batches, [])
+        second = []
+        if workers <= 1 or (len(first) <= 1 and not (second := next(batches, []))):
+            # A single file is not worth starting a pool for
+            for batch in chain([first] if first else [], batches):
+                yield [collect(md_file, lambda: _read_and_format(md_file, self.formatter, convert, skip_unlinked))
+                       for md_file in batch]
+            return
+        queued = chain([first], [second] if second else [], batches)
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.formatter,)) as executor:
+            def submit(batch):
+                return [(md_file, executor.submit(_read_and_format, md_file, None, convert, skip_unlinked))
+                        for md_file in batch]
+            
+            pending = submit(next(queued))
+            while pending:
+                current = pending
+                pending = submit(next(queued, []))
+                yield [collect(md_file, future.result) for md_file, future in current]
+    
+    def _finish_file(
+        self,
+        file_path: Path,
+        formatted: str,
+        changed: bool,
+        convert: bool,
+        urls: Optional[Dict[Path, str]] = None,
+        links: Optional[List[LinkTarget]] = None
+    ) -> FileResult:
+        """Convert the links of formatted content and write it back if it changed
+        
+        Args:
+            file_path: Path to the Markdown file
+            formatted: Formatted content of the file
+            changed: Whether the formatted content differs from the file
+            convert: Whether to convert local resource links
+            urls: Already uploaded assets (see _rewrite_links)
+            links: Links of the formatted content, if it was already scanned
+            
+        Returns:
+            FileResult: The new content of the file and whether it changed
+            
+        Raises:
+            MDCorpusError: If file operations fail
+        """
+        try:
+            content, assets = formatted, {}
+            if convert:
+                content, assets = self._rewrite_links(formatted, file_path.parent, urls, links)
+                changed = changed or content != formatted
+                if self.link_graph is not None:
+                    self._record_links(file_path, content, assets)
+            if changed:
+                start = time.perf_counter()
+                nbytes = atomic_write_text(file_path, content)
+                self.metrics.observe('write', time.perf_counter() - start, nbytes)
+            self.metrics.increment('files_processed')
+            if changed:
+                self.metrics.increment('files_changed')
+            return FileResult(str(file_path), content, changed, assets)
         except Exception as e:
-            raise MDCorpusError(f"Failed to format directory {dir_path}: {str(e)}")
+            raise MDCorpusError(f"Failed to process file {file_path}: {str(e)}")
+    
+    def refresh_asset(self, asset_path: Union[str, Path], force: bool = False) -> List[FileResult]:
+        """Upload an asset again and update only the documents that reference it
+        
+        The documents are looked up in the link graph, so the work depends on
+        how many documents reference the asset, not on the size of the corpus.
+        Links holding the previous URL of the asset are replaced in place;
+        documents whose earlier upload of the asset failed are converted again.
+        
+        Args:
+            asset_path: Path to the asset
+            force: Upload the asset even if its content was uploaded before,
+                e.g. after the remote object was deleted
+            
+        Returns:
+            List[FileResult]: One result per referencing document, sorted by path
+            
+        Raises:
+            MDCorpusError: If there is no link graph or the upload fails
+            BatchError: If some documents failed; all other documents are still updated
+        """
+        if self.link_graph is None:
+            raise MDCorpusError("Refreshing an asset requires a link graph")
+        asset_path = Path(asset_path)
+        if not asset_path.is_file():
+            raise MDCorpusError(f"File not found: {asset_path}")
+        url = self._upload_assets({asset_path}, force=force).get(asset_path)
+        if url is None:
+            raise MDCorpusError(f"Failed to upload {asset_path}: "
+                                f"{self.upload_errors.get(str(asset_path), 'unknown error')}")
+        
+        results = []
+        errors = {}
+        unconverted = []
+        for doc, old_url in self.link_graph.dependents(asset_path).items():
+            if not doc.is_file():
+                self.link_graph.remove_document(doc)
+            elif old_url is None:
+                unconverted.append(doc)
+            else:
+                try:
+                    results.append(self._replace_url(doc, asset_path, old_url, url))
+                except (OSError, ValueError) as e:
+                    errors[str(doc)] = f"Failed to update {doc}: {str(e)}"
+                    self.metrics.increment('files_failed')
+        for doc, result, error in self._process_files(unconverted, True, 1):
+            if error is None:
+                results.append(result)
+            else:
+                errors[str(doc)] = str(error)
+                self.metrics.increment('files_failed')
+        results.sort(key=lambda result: result.path)
+        
+        if errors:
+            total = len(results) + len(errors)
+            raise BatchError(f"Failed to update {len(errors)} of {total} documents referencing {asset_path}",
+                             errors, [result.path for result in results])
+        return results
+    
+    def refresh_recorded_assets(
+        self,
+        asset_paths: Iterable[Union[str, Path]],
+        state: IncrementalState,
+        force: bool = False
+    ) -> List[FileResult]:
+        """Upload assets again and update the documents the state records them for
+        
+        The counterpart of refresh_asset for corpora without a link graph: the
+        referencing documents are looked up in the assets recorded for converted
+        documents in the state. Links holding the recorded URL of an asset are
+        replaced in place, and every updated document is recorded again.
+        
+        Args:
+            asset_paths: Paths to the assets
+            state: Incremental state the converted documents were recorded in
+            force: Upload the assets even if their content was uploaded before
+            
+        Returns:
+            List[FileResult]: One result per updated document, sorted by path
+            
+        Raises:
+            BatchError: If some uploads or documents failed; all other documents are still updated
+        """
+        assets = {Path(asset_path) for asset_path in asset_paths}
+        urls = self._upload_assets(assets, force=force)
+        errors = {}
+        docs: Dict[Path, Dict[Path, str]] = {}
+        for asset in sorted(assets):
+            if asset not in urls:
+                errors[str(asset)] = self.upload_errors.get(str(asset), "Upload failed")
+                continue
+            for doc in state.dependents('convert', asset):
+                docs.setdefault(doc, {})[asset] = urls[asset]
+        
+        results = []
+        for doc, new_urls in sorted(docs.items()):
+            try:
+                doc_assets = state.assets('convert', doc)
+                replacements = {doc_assets[asset]: url for asset, url in new_urls.items()
+                                if doc_assets.get(asset) and doc_assets[asset] != url}
+                content = original = doc.read_text(encoding='utf-8')
+                # Only link targets are replaced, not the same URL in text or code
+                links = [link for link in self._scan_links(content) if link.target in replacements]
+                if links:
+                    content = replace_targets(content, links, replacements)
+                changed = content != original
+                if changed:
+                    start = time.perf_counter()
+                    nbytes = atomic_write_text(doc, content)
+                    self.metrics.observe('write', time.perf_counter() - start, nbytes)
+                    self.metrics.increment('files_changed')
+            except (OSError, ValueError) as e:
+                errors[str(doc)] = f"Failed to update {doc}: {str(e)}"
+                self.metrics.increment('files_failed')
+                continue
+            self.metrics.increment('files_processed')
+            doc_assets.update(new_urls)
+            state.record('convert', doc, doc_assets)
+            results.append(FileResult(str(doc), content, changed, doc_assets))
+        
+        if errors:
+            raise BatchError(f"Failed to refresh {len(errors)} assets or documents", errors,
+                             [result.path for result in results])
+        return results
+    
+    def _replace_url(self, doc: Path, asset_path: Path, old_url: str, url: str) -> FileResult:
+        """Point the links of a document from the previous URL of an asset to its new one
+        
+        Args:
+            doc: Path to the converted document
+            asset_path: Path to the asset
+            old_url: URL the document currently links the asset with
+            url: New URL of the asset
+            
+        Returns:
+            FileResult: The new content of the document and whether it changed
+        """
+        content = original = doc.read_text(encoding='utf-8')
+        if old_url != url:
+            links = [link for link in self._scan_links(content) if link.target == old_url]
+            if links:
+                content = replace_targets(content, links, {old_url: url})
+                self.link_graph.set_url(asset_path, url, [doc])
+            else:
+                # The link was edited out since the document was converted
+                self.link_graph.remove_link(doc, asset_path)
+        changed = content != original
+        if changed:
+            start = time.perf_counter()
+            nbytes = atomic_write_text(doc, content)
+            self.metrics.observe('write', time.perf_counter() - start, nbytes)
+        self.metrics.increment('files_processed')
+        if changed:
+            self.metrics.increment('files_changed')
+        return FileResult(str(doc), content, changed, self.link_graph.assets(doc))
+    
+    def _record_links(self, file_path: Path, content: str, assets: Dict[Path, Optional[str]]) -> None:
+        """Store the assets of a converted document in the link graph
+        
+        Once converted, a document links its assets by URL, so converting it
+        again finds no local links. Recorded assets whose URL still appears in
+        the content are therefore kept.
+        
+        Args:
+            file_path: Path to the document
+            content: Converted content of the document
+            assets: URL of every local asset found while converting
+        """
+        links = {asset: url for asset, url in self.link_graph.assets(file_path).items()
+                 if url and url in content}
+        links.update(assets)
+        self.link_graph.set_links(file_path, links)
     
     def _process_content(self, content: str, base_path: Path) -> str:
         """Process Markdown content and convert local resource links
@@ -134,36 +797,311 @@ class MDCorpus:
         Returns:
             str: Processed content with cloud storage URLs
         """
-        # Match Markdown image and link syntax
-        pattern = r'(!?\[.*?\]\()([^http].*?)(\))'
-        
-        def replace_match(match):
-            prefix, path, suffix = match.groups()
-            if path.startswith(('http://', 'https://', '#')): # Skip if already a URL
-                return match.group(0)
-                
-            # Resolve and upload the resource
-            resource_path = base_path / path.strip()
-            if not resource_path.exists():
-                return match.group(0)
-                
+        converted, _ = self._rewrite_links(content, base_path)
+        return converted
+    
+    def _rewrite_links(
+        self,
+        content: str,
+        base_path: Path,
+        urls: Optional[Dict[Path, str]] = None,
+        links: Optional[List[LinkTarget]] = None
+    ) -> Tuple[str, Dict[Path, Optional[str]]]:
+        """Convert local resource links and report the assets they point to
+        
+        All local link targets are collected first, the unique set of assets is
+        uploaded in one batch, and the links are then rewritten from the result.
+        
+        Args:
+            content: Markdown content to process
+            base_path: Base path for resolving relative links
+            urls: Result of a previous _upload_assets call covering every asset of
+                the content. Assets missing from it are treated as failed uploads.
+                If not set, the assets are uploaded here.
+            links: Links of the content, if it was already scanned
+            
+        Returns:
+            Tuple[str, Dict[Path, Optional[str]]]: Processed content with cloud storage
+            URLs, and the URL of every referenced local asset (None if its upload failed)
+        """
+        if links is None:
+            links = self._scan_links(content)
+        targets = self._collect_targets(links, base_path)
+        if not targets:
+            return content, {}
+        
+        # Upload the unique assets
+        assets = set(targets.values())
+        if urls is None:
+            urls = self._upload_assets(assets)
+        
+        converted = replace_targets(
+            content,
+            links,
+            {target: urls[path] for target, path in targets.items() if path in urls}
+        )
+        return converted, {asset: urls.get(asset) for asset in assets}
+    
+    def _scan_links(self, content: str) -> List[LinkTarget]:
+        """Find the links of a document, recording the time as the scan stage"""
+        start = time.perf_counter()
+        links = list(scan_links(content))
+        self.metrics.observe('scan', time.perf_counter() - start, len(content))
+        return links
+    
+    def _record_timings(self, timings: Dict[str, Tuple[float, int]]) -> None:
+        """Record the stage timings reported by _read_and_format"""
+        for stage, (seconds, nbytes) in timings.items():
+            self.metrics.observe(stage, seconds, nbytes)
+    
+    def _collect_targets(self, links: Iterable[LinkTarget], base_path: Path) -> Dict[str, Path]:
+        """Resolve the distinct link targets that point to local files
+        
+        Args:
+            links: Links found in a document
+            base_path: Base path for resolving relative links
+            
+        Returns:
+            Dict[str, Path]: The local file of every local link target
+        """
+        resolved: Dict[str, Optional[Path]] = {}
+        for link in links:
+            if link.target not in resolved:
+                resolved[link.target] = self._resolve_target(link.target, base_path)
+        return {target: path for target, path in resolved.items() if path is not None}
+    
+    def _resolve_target(self, path: str, base_path: Path) -> Optional[Path]:
+        """Resolve a link target to an existing local file
+        
+        Args:
+            path: Link target as written in the document
+            base_path: Base path for resolving relative links
+            
+        Returns:
+            Optional[Path]: The local file, or None for URLs, anchors and missing files
+        """
+        if not is_local_target(path): # Skip if already a URL
+            return None
+        # Try the target as written, then percent-decoded (e.g. "my%20image.png")
+        for candidate in dict.fromkeys((path.strip(), unquote(path.strip()))):
+            resource_path = base_path / candidate
             try:
-                cloud_url = self.provider.upload_file(str(resource_path))
-                # Handle HTML img tags
-                if '<img' in prefix:
-                    return f'{prefix}{cloud_url}{suffix}'
-                # Handle Markdown image links with URL encoding
-                return f'{prefix}{cloud_url}{suffix}'
-            except Exception:
-                return match.group(0)
-        
-        # Process Markdown image links
-        content = re.sub(pattern, replace_match, content)
-        
-        # Process HTML img tags
-        html_pattern = r'(<img\s+[^>]*src=")([^"]+)(")'
-        content = re.sub(html_pattern, replace_match, content)
-        
-        return content
+                if resource_path.is_file():
+                    return resource_path
+            except OSError:
+                pass
+        return None
+    
+    def _upload_assets(self, resource_paths: Set[Path], force: bool = False) -> Dict[Path, str]:
+        """Upload the assets whose content was not uploaded before
+        
+        Assets are looked up in the per-instance cache, the journal and the
+        manifest by content digest and name; the rest are optimized if an optimizer is set
+        and uploaded with a single upload_many call, one file per distinct
+        digest and name. With a shard, assets owned by other shards are not
+        uploaded; their URL is derived from the object key they are uploaded
+        under by their owner.
+        
+        Args:
+            resource_paths: Local assets to upload
+            force: Skip the cache and manifest lookups and upload every asset
+            
+        Returns:
+            Dict[Path, str]: Remote URL of every asset that was uploaded successfully.
+            Failed uploads are left out so that their links stay unchanged.
+        """
+        urls = {}
+        pending: Dict[Tuple[str, str], List[Path]] = {}
+        for resource_path in resource_paths:
+            try:
+                digest = file_sha256(resource_path)
+            except OSError:
+                continue
+            cache_key = (digest, resource_path.name)
+            cloud_url = None if force else self._uploaded.get(cache_key)
+            if cloud_url is None and self.journal is not None and not force:
+                cloud_url = self.journal.uploads.get((*cache_key, self.upload_scope))
+            if cloud_url is None and self.manifest is not None and not force:
+                cloud_url = self.manifest.get(digest, resource_path.name, self.upload_scope)
+                if cloud_url is not None:
+                    self._cache_upload(digest, resource_path.name, cloud_url)
+            if cloud_url is None:
+                pending.setdefault(cache_key, []).append(resource_path)
+            else:
+                urls[resource_path] = cloud_url
+                self.metrics.increment('assets_cached')
+        if not pending:
+            return urls
+        
+        sources = {paths[0]: digest for (digest, name), paths in pending.items()}
+        uploads = self._optimize(sources) if self.optimizer is not None else {path: path for path in sources}
+        owned = {key for key in pending if self.shard is None or self.shard.owns_asset(*key)}
+        upload_keys = {str(uploads[pending[key][0]]): key for key in owned}
+        journaled: Set[Tuple[str, str]] = set()
+        
+        def record_upload(upload_path: str, cloud_url: str) -> None:
+            # Journal every upload as soon as it finishes, so that a crash in the
+            # middle of a batch does not upload the finished files again
+            digest, name = upload_keys[upload_path]
+            self.journal.record_upload(digest, name, cloud_url, self.upload_scope, self._name_keyed)
+            journaled.add((digest, name))
+        
+        results = self._upload_many([uploads[pending[key][0]] for key in owned],
+                                    record_upload if self.journal is not None else None)
+        for (digest, name), paths in pending.items():
+            upload_path = uploads[paths[0]]
+            if (digest, name) not in owned:
+                cloud_url = self._shared_url(upload_path)
+                self.metrics.increment('assets_other_shard')
+                self._cache_upload(digest, name, cloud_url)
+                for resource_path in paths:
+                    urls[resource_path] = cloud_url
+                continue
+            cloud_url = results.get(str(upload_path))
+            if not isinstance(cloud_url, str):
+                for resource_path in paths:
+                    self.upload_errors[str(resource_path)] = str(cloud_url)
+                self.metrics.increment('uploads_failed')
+                continue
+            self.metrics.increment('assets_uploaded')
+            self._cache_upload(digest, name, cloud_url)
+            if self.journal is not None and (digest, name) not in journaled:
+                # Providers that do not report finished uploads are journaled per batch
+                self.journal.record_upload(digest, name, cloud_url, self.upload_scope, self._name_keyed)
+            if self.manifest is not None:
+                self.manifest.put(digest, name, cloud_url, upload_path.stat().st_size, str(paths[0]),
+                                  self.upload_scope, self._name_keyed)
+            for resource_path in paths:
+                urls[resource_path] = cloud_url
+        return urls
+    
+    def _cache_upload(self, digest: str, name: str, cloud_url: str) -> None:
+        """Cache the URL of an asset, dropping the entry its upload overwrote under a name-derived key"""
+        if self._name_keyed:
+            previous = self._uploaded_names.get(name)
+            if previous is not None and previous != digest:
+                self._uploaded.pop((previous, name), None)
+            self._uploaded_names[name] = digest
+        self._uploaded[(digest, name)] = cloud_url
+    
+    def _upload_scope(self) -> str:
+        """Identify where assets are uploaded to
+        
+        Manifest and journal entries are only reused within the same scope, so
+        switching to another provider, bucket, base URL, key strategy or image
+        optimizer settings uploads the assets again.
+        
+        Returns:
+            str: The provider's destination (its class for providers without one),
+            key strategy and optimizer settings fingerprint
+        """
+        provider_class = type(self.provider)
+        destination = getattr(self.provider, 'destination', None) or f"{provider_class.__module__}.{provider_class.__qualname__}"
+        scope = f"{destination} keys={getattr(self.provider, 'key_strategy', 'name')}"
+        if self.optimizer is not None:
+            scope += f" images={self.optimizer.fingerprint}"
+        return scope
+    
+    def _shared_url(self, upload_path: Path) -> str:
+        """Derive the URL of an asset another shard uploads
+        
+        Args:
+            upload_path: File the owning shard uploads for the asset
+            
+        Returns:
+            str: Public URL of the object the file is uploaded as
+        """
+        return self.provider.get_file_url(object_key(upload_path, getattr(self.provider, 'key_strategy', 'name')))
+    
+    def _optimize(self, sources: Dict[Path, str]) -> Dict[Path, Path]:
+        """Optimize assets before upload, recording the time as the optimize stage
+        
+        Args:
+            sources: Digest of every asset to upload, keyed by path
+            
+        Returns:
+            Dict[Path, Path]: The file to upload for every asset
+        """
+        start = time.perf_counter()
+        uploads = self.optimizer.optimize_many(sources)
+        source_bytes = sum(source.stat().st_size for source in sources)
+        upload_bytes = sum(upload.stat().st_size for upload in uploads.values())
+        self.metrics.observe('optimize', time.perf_counter() - start, source_bytes)
+        self.metrics.increment('optimize_bytes_saved', source_bytes - upload_bytes)
+        return uploads
+    
+    def _upload_many(
+        self,
+        resource_paths: List[Path],
+        on_done: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Union[str, Exception]]:
+        """Upload files through the provider's batch API
+        
+        Providers that only implement upload_file are called from a thread pool.
+        Either way every upload goes through the limiter and is timed as the
+        upload stage.
+        
+        Args:
+            resource_paths: Local files to upload
+            on_done: Optional function called with the path and URL of every file
+                as soon as it is uploaded. Not called by providers whose
+                upload_many has no on_done parameter.
+            
+        Returns:
+            Dict[str, Union[str, Exception]]: URL or upload error of every file
+        """
+        paths = [str(resource_path) for resource_path in resource_paths]
+        upload_many = getattr(self.provider, 'upload_many', None)
+        if upload_many is not None:
+            options = {'max_workers': self.upload_workers, 'limiter': self.limiter, 'metrics': self.metrics}
+            if on_done is not None and 'on_done' in inspect.signature(upload_many).parameters:
+                options['on_done'] = on_done
+            return upload_many(paths, **options)
+        return upload_concurrently(
+            self.provider.upload_file, paths, self.upload_workers, self.limiter, self.metrics, on_done)
+
+# Formatter of a worker process, set up once by _init_worker
+_worker_formatter: Optional[Formatter] = None
+
+def _init_worker(formatter: Formatter) -> None:
+    """Install the formatter used by a worker process"""
+    global _worker_formatter
+    _worker_formatter = formatter
+
+def _read_and_format(
+    file_path: Path,
+    formatter: Optional[Formatter] = None,
+    check_links: bool = False,
+    skip_unlinked: bool = False
+) -> Tuple[str, bool, bool, Dict[str, Tuple[float, int]]]:
+    """Read and format a Markdown file, also used in worker processes
+    
+    Args:
+        file_path: Path to the Markdown file
+        formatter: Formatter to use (the worker's formatter if not set)
+        check_links: Check the raw content for local links with has_local_links
+        skip_unlinked: Return content without local links unformatted
+        
+    Returns:
+        Tuple[str, bool, bool, Dict[str, Tuple[float, int]]]: The formatted content,
+        whether it differs from the file, whether it may have local links (always
+        True if not checked), and the seconds and bytes of the read, prefilter and
+        format stages
+    """
+    start = time.perf_counter()
+    data = file_path.read_bytes()
+    read_done = time.perf_counter()
+    timings = {'read': (read_done - start, len(data))}
+    linked = True
+    if check_links:
+        linked = has_local_links(data)
+        timings['prefilter'] = (time.perf_counter() - read_done, len(data))
+    original = data.decode('utf-8')
+    if skip_unlinked and not linked:
+        return original, False, False, timings
+    format_start = time.perf_counter()
+    formatted = (formatter or _worker_formatter).format(original)
+    timings['format'] = (time.perf_counter() - format_start, len(data))
+    return formatted, formatted != original, linked, timings
 
 __version__ = "0.1.0" 
\ No newline at end of file
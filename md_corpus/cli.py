@@ -1,11 +1,19 @@
 """Command line interface for md-corpus"""
 
 import os
+import sys
 import click
 from pathlib import Path
 from . import MDCorpus, __version__
-from .providers import AliyunProvider, AWSProvider
-from .exceptions import MDCorpusError
+from .exceptions import BatchError, MDCorpusError
+from .journal import default_journal_path
+from .ratelimit import AdaptiveLimiter
+from .shard import Shard
+from .state import IncrementalState, default_state_path
+from .walker import IGNORE_FILES, CorpusWalker
+
+# Default image cache directory of --optimize-images, created in the converted directory
+DEFAULT_IMAGE_CACHE = ".md-corpus-images"
 
 @click.group()
 @click.version_option(version=__version__, prog_name="md-corpus")
@@ -13,74 +21,475 @@ def cli():
     """md-corpus - A tool for integrating Markdown files with cloud storage"""
     pass
 
+def _report_error(error: MDCorpusError):
+    """Print an error, including every failed file of a batch run, and exit"""
+    if isinstance(error, BatchError):
+        for failed_file, message in error.errors.items():
+            click.echo(f"Failed: {failed_file}: {message}", err=True)
+    click.echo(f"Error: {str(error)}", err=True)
+    exit(1)
+
+def _report_uploads(corpus: MDCorpus):
+    """Print every failed upload and the throttling counters of a conversion"""
+    for asset, message in corpus.upload_errors.items():
+        click.echo(f"Upload failed: {asset}: {message}", err=True)
+    stats = corpus.limiter.stats()
+    if corpus.upload_errors or stats['throttled'] or stats['retries']:
+        click.echo(f"Uploads: {len(corpus.upload_errors)} failed, {stats['throttled']} throttled, "
+                   f"{stats['retries']} retried")
+
+def _start_profile(profile: str = None):
+    """Start profiling the calling process when a profile output path is given"""
+    if not profile:
+        return None
+    import cProfile
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def _finish_run(corpus: MDCorpus, metrics_out: str = None, profiler=None, profile: str = None):
+    """Write the profile and metrics of a run"""
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile)
+        click.echo(f"Wrote profile to {profile}")
+    if metrics_out:
+        for name, value in corpus.limiter.stats().items():
+            corpus.metrics.increment(f'uploads_{name}', value)
+        corpus.metrics.write(metrics_out)
+        click.echo(f"Wrote metrics to {metrics_out}")
+
+def _load_state(path: Path, state_file: str = None) -> IncrementalState:
+    """Load the incremental state for a directory run"""
+    return IncrementalState(state_file or default_state_path(path), root=path)
+
 @cli.command()
 def version():
     """Show version information"""
     click.echo(f"md-corpus version {__version__}")
 
+PROVIDER_OPTIONS = [
+    click.option('--provider', type=click.Choice(['aliyun', 'aws', 'local']), required=True,
+                 help='Cloud storage provider to use'),
+    click.option('--bucket', help='Storage bucket name'),
+    click.option('--access-key', help='Provider access key'),
+    click.option('--secret-key', help='Provider secret key'),
+    click.option('--endpoint', help='Aliyun OSS endpoint'),
+    click.option('--region', help='AWS region'),
+    click.option('--root', type=click.Path(file_okay=False), help='Local storage directory'),
+    click.option('--base-url', help='Public URL of the local storage directory'),
+    click.option('--link-mode', type=click.Choice(['auto', 'reflink', 'hardlink', 'copy']), default='auto',
+                 show_default=True, help='How the local provider places files'),
+    click.option('--compress', type=click.Choice(['gzip', 'br']),
+                 help='Pre-compress text-based assets (SVG, JSON, CSV, ...) and upload them with Content-Encoding'),
+    click.option('--key-strategy', type=click.Choice(['name', 'hash']), default='name', show_default=True,
+                 help='Derive object keys from the file name, or from the content hash and name '
+                      '(cached forever with an immutable Cache-Control header)'),
+    click.option('--skip-existing', is_flag=True,
+                 help='Skip uploads of assets that already exist remotely with identical content'),
+    click.option('--max-pool-connections', type=click.IntRange(min=1),
+                 help='Size of the HTTP connection pool shared by upload threads'),
+    click.option('--multipart-threshold', type=click.IntRange(min=1),
+                 help='Upload files of at least this many bytes in parts'),
+    click.option('--part-size', type=click.IntRange(min=1), help='Multipart part size in bytes'),
+    click.option('--part-concurrency', type=click.IntRange(min=1),
+                 help='Number of parts uploaded in parallel per file'),
+]
+
+UPLOAD_OPTIONS = [
+    click.option('--manifest', type=click.Path(dir_okay=False),
+                 help='SQLite asset manifest used to skip re-uploading known assets'),
+    click.option('--upload-workers', type=click.IntRange(min=1), default=8, show_default=True,
+                 help='Maximum number of concurrent uploads'),
+    click.option('--max-rate', type=click.FloatRange(min=0, min_open=True),
+                 help='Maximum number of uploads started per second'),
+    click.option('--max-retries', type=click.IntRange(min=0), default=5, show_default=True,
+                 help='Number of times a throttled upload is retried'),
+    click.option('--optimize-images', is_flag=True,
+                 help='Recompress PNG and JPEG assets before upload (requires Pillow)'),
+    click.option('--image-quality', type=click.IntRange(1, 100),
+                 help='Lossy image quality (default: lossless recompression)'),
+    click.option('--image-format', type=click.Choice(['webp', 'avif']),
+                 help='Convert optimized images to this format'),
+    click.option('--image-cache', type=click.Path(file_okay=False),
+                 help='Cache of optimized images (default: .md-corpus-images in PATH)'),
+    click.option('--skip-unlinked', is_flag=True,
+                 help='Leave documents without local links unformatted'),
+    click.option('--link-graph', type=click.Path(dir_okay=False),
+                 help='SQLite graph of the assets referenced by each document, used by refresh'),
+]
+
+WALK_OPTIONS = [
+    click.option('--include', multiple=True,
+                 help='gitignore-style pattern of the files to process (repeatable, default: *.md)'),
+    click.option('--exclude', multiple=True,
+                 help='gitignore-style pattern of files and directories to skip (repeatable)'),
+    click.option('--no-ignore-files', is_flag=True,
+                 help='Do not read .gitignore and .mdcorpusignore files'),
+    click.option('--walk-workers', type=click.IntRange(min=1), default=1, show_default=True,
+                 help='Number of threads scanning directories'),
+]
+
+SHARD_OPTION = click.option(
+    '--shard', help='Only process shard i of N (e.g. 2/8) of a directory, partitioned by a stable path hash')
+
+def _options(options):
+    """Apply a list of click options to a command"""
+    def decorator(func):
+        for option in reversed(options):
+            func = option(func)
+        return func
+    return decorator
+
+def _create_walker(include=(), exclude=(), no_ignore_files=False, walk_workers=1) -> CorpusWalker:
+    """Create the directory walker selected by the walk options"""
+    ignore_files = () if no_ignore_files else IGNORE_FILES
+    return CorpusWalker(include=include, exclude=exclude, ignore_files=ignore_files, workers=walk_workers)
+
+def _create_provider(provider, bucket=None, access_key=None, secret_key=None, endpoint=None, region=None,
+                     root=None, base_url=None, link_mode='auto', compress=None, key_strategy='name',
+                     skip_existing=False, max_pool_connections=None, multipart_threshold=None, part_size=None,
+                     part_concurrency=None):
+    """Create the storage provider selected by the provider options"""
+    # Get credentials from environment if not provided
+    bucket = bucket or os.getenv(f"{provider.upper()}_BUCKET")
+    access_key = access_key or os.getenv(f"{provider.upper()}_ACCESS_KEY_ID")
+    secret_key = secret_key or os.getenv(f"{provider.upper()}_ACCESS_KEY_SECRET")
+    
+    # Provider SDKs are slow to import, so only load the one in use
+    if provider == 'local':
+        from .providers.local import LocalProvider
+        
+        if compress:
+            raise MDCorpusError("--compress is not supported by the local provider")
+        root = root or os.getenv("LOCAL_ROOT")
+        base_url = base_url or os.getenv("LOCAL_BASE_URL")
+        return LocalProvider(root, base_url, link_mode=link_mode, key_strategy=key_strategy)
+    elif provider == 'aliyun':
+        from .providers.aliyun import AliyunProvider
+        
+        endpoint = endpoint or os.getenv("ALI_OSS_ENDPOINT")
+        tuning = {
+            'pool_size': max_pool_connections,
+            'multipart_threshold': multipart_threshold,
+            'part_size': part_size,
+            'multipart_threads': part_concurrency,
+            'compression': compress,
+        }
+        return AliyunProvider(bucket, access_key, secret_key, endpoint, skip_existing=skip_existing,
+                              key_strategy=key_strategy,
+                              **{k: v for k, v in tuning.items() if v is not None})
+    else:
+        from .providers.aws import AWSProvider
+        
+        region = region or os.getenv("AWS_REGION", "us-east-1")
+        tuning = {
+            'max_pool_connections': max_pool_connections,
+            'multipart_threshold': multipart_threshold,
+            'multipart_chunksize': part_size,
+            'max_concurrency': part_concurrency,
+            'compression': compress,
+        }
+        return AWSProvider(bucket, access_key, secret_key, region, skip_existing=skip_existing,
+                           key_strategy=key_strategy,
+                           **{k: v for k, v in tuning.items() if v is not None})
+
+def _create_corpus(path: Path, jobs: int = 1, manifest=None, upload_workers=8, max_rate=None, max_retries=5,
+                   optimize_images=False, image_quality=None, image_format=None, image_cache=None,
+                   link_graph=None, skip_unlinked=False, shard=None,
+                   **provider_options) -> MDCorpus:
+    """Create an MDCorpus from the provider and upload options
+    
+    The caller releases the manifest, link graph and journal with _close_corpus.
+    """
+    storage = _create_provider(**provider_options)
+    optimizer = None
+    if optimize_images:
+        from .images import ImageOptimizer
+        
+        default_cache = (path if path.is_dir() else path.parent) / DEFAULT_IMAGE_CACHE
+        optimizer = ImageOptimizer(image_cache or default_cache, quality=image_quality,
+                                   target_format=image_format, workers=jobs)
+    asset_manifest = None
+    if manifest:
+        from .manifest import AssetManifest
+        
+        asset_manifest = AssetManifest(manifest)
+    graph = None
+    if link_graph:
+        from .linkgraph import LinkGraph
+        
+        graph = LinkGraph(link_graph)
+    limiter = AdaptiveLimiter(max_concurrency=upload_workers, rate=max_rate, max_retries=max_retries)
+    return MDCorpus(storage, manifest=asset_manifest, upload_workers=upload_workers, limiter=limiter,
+                    optimizer=optimizer, link_graph=graph, skip_unlinked=skip_unlinked,
+                    shard=Shard.parse(shard) if shard else None)
+
+def _close_corpus(corpus: MDCorpus):
+    """Close the manifest, link graph and journal of a corpus created by _create_corpus"""
+    if corpus.journal is not None:
+        corpus.journal.close()
+    if corpus.manifest is not None:
+        corpus.manifest.close()
+    if corpus.link_graph is not None:
+        corpus.link_graph.close()
+
 @cli.command()
 @click.argument('path', type=click.Path(exists=True))
-@click.option('--provider', type=click.Choice(['aliyun', 'aws']), required=True,
-              help='Cloud storage provider to use')
-@click.option('--bucket', help='Storage bucket name')
-@click.option('--access-key', help='Provider access key')
-@click.option('--secret-key', help='Provider secret key')
-@click.option('--endpoint', help='Aliyun OSS endpoint')
-@click.option('--region', help='AWS region')
-def convert(path, provider, bucket, access_key, secret_key, endpoint=None, region=None):
+@_options(PROVIDER_OPTIONS)
+@_options(UPLOAD_OPTIONS)
+@_options(WALK_OPTIONS)
+@SHARD_OPTION
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of worker processes used for formatting')
+@click.option('--incremental', is_flag=True,
+              help='Only process files that changed since the last run')
+@click.option('--state-file', type=click.Path(dir_okay=False),
+              help='State file for --incremental (default: .md-corpus-state.json in PATH)')
+@click.option('--resume', is_flag=True,
+              help='Continue an interrupted directory run from its journal')
+@click.option('--journal-file', type=click.Path(dir_okay=False),
+              help='Journal of directory runs (default: .md-corpus-journal.jsonl in PATH)')
+@click.option('--no-journal', is_flag=True,
+              help='Do not keep a journal; an interrupted run then starts over')
+@click.option('--metrics-out', type=click.Path(dir_okay=False),
+              help='Write per-stage metrics to this file (Prometheus text format if it ends in .prom, else JSON)')
+@click.option('--profile', type=click.Path(dir_okay=False),
+              help='Write cProfile statistics of the main process to this file')
+def convert(path, jobs=1, incremental=False, state_file=None, resume=False, journal_file=None, no_journal=False,
+            metrics_out=None, profile=None, include=(), exclude=(), no_ignore_files=False, walk_workers=1,
+            shard=None, **options):
     """Convert local resource links to cloud storage URLs"""
+    profiler = _start_profile(profile)
     try:
-        # Get credentials from environment if not provided
-        bucket = bucket or os.getenv(f"{provider.upper()}_BUCKET")
-        access_key = access_key or os.getenv(f"{provider.upper()}_ACCESS_KEY_ID")
-        secret_key = secret_key or os.getenv(f"{provider.upper()}_ACCESS_KEY_SECRET")
-        
-        if provider == 'aliyun':
-            endpoint = endpoint or os.getenv("ALI_OSS_ENDPOINT")
-            storage = AliyunProvider(bucket, access_key, secret_key, endpoint)
-        else:
-            region = region or os.getenv("AWS_REGION", "us-east-1")
-            storage = AWSProvider(bucket, access_key, secret_key, region)
-            
-        corpus = MDCorpus(storage)
         path = Path(path)
+        walker = _create_walker(include, exclude, no_ignore_files, walk_workers)
+        if resume and no_journal:
+            raise MDCorpusError("--resume cannot be combined with --no-journal")
+        corpus = _create_corpus(path, jobs, shard=shard, **options)
         
-        if path.is_file():
-            click.echo(f"Processing file: {path}")
-            corpus.convert_file(path)
-        else:
-            click.echo(f"Processing directory: {path}")
-            processed = corpus.convert_directory(path)
-            click.echo(f"Processed {len(processed)} files")
+        try:
+            # Opened once the provider exists, so that a run failing at startup
+            # leaves the journal of an interrupted run untouched
+            journal = corpus.journal = _open_journal(path, journal_file, resume, no_journal)
+            if path.is_file():
+                click.echo(f"Processing file: {path}")
+                result = corpus.process_file(path)
+                click.echo("Updated" if result.changed else "Unchanged")
+            else:
+                click.echo(f"Processing directory: {path}" + (f" (shard {corpus.shard})" if corpus.shard else ""))
+                state = _load_state(path, state_file) if incremental else None
+                results = corpus.process_directory(path, workers=jobs, state=state, walker=walker)
+                if journal is not None:
+                    journal.complete()
+                changed = sum(result.changed for result in results)
+                counters = corpus.metrics.snapshot()['counters']
+                fast = counters.get('files_fast_path', 0)
+                click.echo(f"Processed {len(results)} files ({changed} changed, {fast} without local links)")
+                if counters.get('files_resumed'):
+                    click.echo(f"Skipped {counters['files_resumed']} files finished before the interruption")
+        finally:
+            _close_corpus(corpus)
+            _report_uploads(corpus)
+            _finish_run(corpus, metrics_out, profiler, profile)
             
         click.echo("Done!")
         
     except MDCorpusError as e:
-        click.echo(f"Error: {str(e)}", err=True)
-        exit(1)
+        _report_error(e)
+
+def _open_journal(path: Path, journal_file: str = None, resume: bool = False, no_journal: bool = False):
+    """Open the journal of a directory run, or return None for files and --no-journal"""
+    if no_journal or not path.is_dir():
+        return None
+    from .journal import ConversionJournal
+    
+    journal_path = Path(journal_file) if journal_file else default_journal_path(path)
+    if resume and not journal_path.exists():
+        click.echo(f"No journal at {journal_path}, starting from the beginning")
+    elif not resume and journal_path.exists() and journal_path.stat().st_size:
+        click.echo(f"Warning: discarding the journal of an unfinished run at {journal_path} "
+                   f"(use --resume to continue it)", err=True)
+    journal = ConversionJournal(journal_path, root=path, resume=resume)
+    if resume and (journal.document_count or journal.uploads):
+        click.echo(f"Resuming from {journal_path}: {journal.document_count} documents and "
+                   f"{len(journal.uploads)} uploads finished")
+    return journal
 
 @cli.command()
-@click.argument('path', type=click.Path(exists=True))
-def format(path):
-    """Format Markdown files"""
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@_options(PROVIDER_OPTIONS)
+@_options(UPLOAD_OPTIONS)
+@_options(WALK_OPTIONS)
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of worker processes used for formatting')
+@click.option('--state-file', type=click.Path(dir_okay=False),
+              help='State file (default: .md-corpus-state.json in PATH)')
+@click.option('--debounce', type=click.FloatRange(min=0), default=0.5, show_default=True,
+              help='Seconds without changes before a burst of changes is processed')
+@click.option('--backend', type=click.Choice(['auto', 'native', 'polling']), default='auto', show_default=True,
+              help='File change detection: native events (requires watchdog) or polling')
+@click.option('--poll-interval', type=click.FloatRange(min=0.01), default=1.0, show_default=True,
+              help='Seconds between two scans of the polling backend')
+def watch(path, jobs=1, state_file=None, debounce=0.5, backend='auto', poll_interval=1.0, include=(), exclude=(),
+          no_ignore_files=False, walk_workers=1, **options):
+    """Convert a directory, then re-convert documents as they or their assets change"""
+    from .linkgraph import default_link_graph_path
+    from .watch import Watcher
+    
     try:
-        # We don't need a real provider for formatting
-        corpus = MDCorpus(None)
         path = Path(path)
+        walker = _create_walker(include, exclude, no_ignore_files, walk_workers)
+        options['link_graph'] = options.get('link_graph') or default_link_graph_path(path)
+        corpus = _create_corpus(path, jobs, **options)
+        try:
+            state = _load_state(path, state_file)
+            click.echo(f"Processing directory: {path}")
+            try:
+                results = corpus.process_directory(path, workers=jobs, state=state, walker=walker)
+                click.echo(f"Processed {len(results)} files ({sum(r.changed for r in results)} changed)")
+            except BatchError as e:
+                _print_batch([], e.errors)
+            
+            watcher = Watcher(corpus, path, state, workers=jobs, debounce=debounce, backend=backend,
+                              poll_interval=poll_interval, walker=walker)
+            try:
+                watcher.run(on_batch=_print_batch,
+                            on_ready=lambda: click.echo(f"Watching {path} (press Ctrl+C to stop)"))
+            except KeyboardInterrupt:
+                pass
+        finally:
+            _close_corpus(corpus)
+            _report_uploads(corpus)
+    except MDCorpusError as e:
+        _report_error(e)
+
+def _print_batch(results, errors):
+    """Print the outcome of a batch processed by watch"""
+    for result in results:
+        if result.changed:
+            click.echo(f"Updated: {result.path}")
+    for failed, message in errors.items():
+        click.echo(f"Failed: {failed}: {message}", err=True)
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, allow_dash=True))
+@_options(WALK_OPTIONS)
+@SHARD_OPTION
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of worker processes used for formatting')
+@click.option('--incremental', is_flag=True,
+              help='Only process files that changed since the last run')
+@click.option('--state-file', type=click.Path(dir_okay=False),
+              help='State file for --incremental (default: .md-corpus-state.json in PATH)')
+@click.option('--metrics-out', type=click.Path(dir_okay=False),
+              help='Write per-stage metrics to this file (Prometheus text format if it ends in .prom, else JSON)')
+@click.option('--profile', type=click.Path(dir_okay=False),
+              help='Write cProfile statistics of the main process to this file')
+def format(path, jobs, incremental, state_file, metrics_out=None, profile=None, include=(), exclude=(),
+           no_ignore_files=False, walk_workers=1, shard=None):
+    """Format Markdown files (use - to format stdin to stdout)"""
+    try:
+        # We don't need a real provider for formatting
+        corpus = MDCorpus(None, shard=Shard.parse(shard) if shard else None)
+        
+        if path == '-':
+            click.echo(corpus.format_text(sys.stdin.read()), nl=False)
+            return
         
-        if path.is_file():
-            click.echo(f"Formatting file: {path}")
-            corpus.format_file(path)
-        else:
-            click.echo(f"Formatting directory: {path}")
-            processed = corpus.format_directory(path)
-            click.echo(f"Formatted {len(processed)} files")
+        path = Path(path)
+        profiler = _start_profile(profile)
+        try:
+            if path.is_file():
+                click.echo(f"Formatting file: {path}")
+                result = corpus.process_file(path, convert=False)
+                click.echo("Updated" if result.changed else "Unchanged")
+            else:
+                click.echo(f"Formatting directory: {path}" + (f" (shard {corpus.shard})" if corpus.shard else ""))
+                state = _load_state(path, state_file) if incremental else None
+                walker = _create_walker(include, exclude, no_ignore_files, walk_workers)
+                results = corpus.process_directory(path, convert=False, workers=jobs, state=state, walker=walker)
+                changed = sum(result.changed for result in results)
+                click.echo(f"Formatted {len(results)} files ({changed} changed)")
+        finally:
+            _finish_run(corpus, metrics_out, profiler, profile)
             
         click.echo("Done!")
         
+    except MDCorpusError as e:
+        _report_error(e)
+
+@cli.command()
+@click.argument('assets', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@_options(PROVIDER_OPTIONS)
+@_options(UPLOAD_OPTIONS)
+@click.option('--force', is_flag=True, help='Upload the assets even if their content was uploaded before')
+def refresh(assets, force=False, **options):
+    """Upload assets again and update only the documents that reference them"""
+    try:
+        if not options.get('link_graph'):
+            raise MDCorpusError("refresh requires --link-graph")
+        corpus = _create_corpus(Path(assets[0]).parent, **options)
+        try:
+            for asset in assets:
+                try:
+                    results = corpus.refresh_asset(asset, force=force)
+                except BatchError as e:
+                    _print_batch([], e.errors)
+                    continue
+                _print_batch(results, {})
+                click.echo(f"Refreshed {asset}: {len(results)} documents "
+                           f"({sum(result.changed for result in results)} changed)")
+        finally:
+            _close_corpus(corpus)
+            _report_uploads(corpus)
+    except MDCorpusError as e:
+        _report_error(e)
+
+@cli.command()
+@click.argument('link_graph', type=click.Path(exists=True, dir_okay=False))
+@click.argument('asset', type=click.Path())
+def dependents(link_graph, asset):
+    """List the documents that reference an asset"""
+    from .linkgraph import LinkGraph
+    
+    try:
+        with LinkGraph(link_graph) as graph:
+            for doc in graph.dependents(asset):
+                click.echo(str(doc))
+    except MDCorpusError as e:
+        _report_error(e)
+
+@cli.command(name='export-manifest')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output', type=click.Path(dir_okay=False))
+def export_manifest(manifest, output):
+    """Export an asset manifest as JSON"""
+    from .manifest import AssetManifest
+    
+    try:
+        with AssetManifest(manifest) as asset_manifest:
+            count = asset_manifest.export_json(output)
+        click.echo(f"Exported {count} assets to {output}")
     except MDCorpusError as e:
         click.echo(f"Error: {str(e)}", err=True)
         exit(1)
 
+@cli.command()
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.argument('manifests', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def merge(output, manifests):
+    """Merge the partial asset manifests of sharded runs into one"""
+    from .manifest import AssetManifest
+    
+    try:
+        with AssetManifest(output) as merged:
+            added = sum(merged.merge(manifest) for manifest in manifests)
+            total = len(merged)
+        click.echo(f"Merged {added} assets from {len(manifests)} manifests into {output} ({total} assets)")
+    except MDCorpusError as e:
+        _report_error(e)
+
 def main():
     cli() 
\ No newline at end of file
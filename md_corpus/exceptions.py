@@ -1,5 +1,25 @@
 """Exceptions for md-corpus"""
 
+from typing import Dict, List
+
 class MDCorpusError(Exception):
     """Base exception for md-corpus errors"""
-    pass 
\ No newline at end of file
+    pass
+
+class BatchError(MDCorpusError):
+    """Raised when some files of a directory run failed
+
+    Attributes:
+        errors: Mapping of file path to error message for every failed file
+        processed: File paths that were processed successfully
+    """
+
+    def __init__(self, message: str, errors: Dict[str, str], processed: List[str]):
+        super().__init__(message)
+        self.errors = errors
+        self.processed = processed
+
+class ThrottlingError(MDCorpusError):
+    """Raised by providers when the storage service asks the client to slow down
+    (for example S3 SlowDown or HTTP 503). Such requests can be retried later."""
+    pass
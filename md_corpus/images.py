@@ -0,0 +1,224 @@
+"""Optional image optimization before upload (requires Pillow)"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .exceptions import MDCorpusError
+
+# Source formats that are recompressed; everything else is uploaded as is
+OPTIMIZED_SUFFIXES = {'.png', '.jpg', '.jpeg'}
+TARGET_FORMATS = ('webp', 'avif')
+
+# Bumped when the optimization output changes, so that cached results are redone
+CACHE_VERSION = 1
+# EXIF tag holding the image orientation
+ORIENTATION_TAG = 0x0112
+# Marker stored in a cache entry when optimizing did not make the file smaller
+KEEP_ORIGINAL = '.original'
+
+
+class ImageOptimizer:
+    """Recompress PNG and JPEG assets, optionally converting them to WebP or AVIF
+
+    Optimized files are cached on disk by the SHA-256 digest of the source
+    and the optimizer settings, so each asset is optimized once. A result is
+    only used if it is smaller than the source. Images keep their file stem;
+    when converting, the suffix changes to the target format.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        quality: Optional[int] = None,
+        target_format: Optional[str] = None,
+        strip_metadata: bool = True,
+        workers: int = 1
+    ):
+        """Initialize the optimizer
+
+        Args:
+            cache_dir: Directory holding the optimized files
+            quality: Lossy encoder quality (1-100). If not set, PNG and WebP are
+                compressed losslessly and JPEG keeps its quantization tables.
+            target_format: Convert images to 'webp' or 'avif' (keep the format if not set)
+            strip_metadata: Drop EXIF and other metadata. The orientation is applied
+                to the pixels first and ICC color profiles are kept.
+            workers: Number of worker processes used by optimize_many
+
+        Raises:
+            MDCorpusError: If Pillow is missing or cannot write the target format
+        """
+        try:
+            from PIL import features
+        except ImportError:
+            raise MDCorpusError("Image optimization requires Pillow: pip install 'md-corpus[images]'")
+        if target_format is not None:
+            target_format = target_format.lower()
+            if target_format not in TARGET_FORMATS:
+                raise MDCorpusError(f"Unsupported image format: {target_format}")
+            if not features.check(target_format):
+                raise MDCorpusError(f"Pillow was built without {target_format} support")
+        if quality is not None and not 1 <= quality <= 100:
+            raise MDCorpusError(f"Image quality must be between 1 and 100: {quality}")
+        self.cache_dir = Path(cache_dir)
+        self.quality = quality
+        self.target_format = target_format
+        self.strip_metadata = strip_metadata
+        self.workers = workers
+        settings = json.dumps([CACHE_VERSION, quality, target_format, strip_metadata])
+        # Identifies the settings in cache entry names and in the upload scope of MDCorpus
+        self.fingerprint = hashlib.sha256(settings.encode()).hexdigest()[:12]
+
+    def optimize(self, source: Union[str, Path], digest: str) -> Path:
+        """Return the file to upload for an asset, optimizing it if not cached
+
+        Args:
+            source: Path to the asset
+            digest: SHA-256 digest of the asset content
+
+        Returns:
+            Path: The optimized file, or source if it is not an optimizable
+            image, optimizing did not make it smaller, or it failed
+        """
+        source = Path(source)
+        if source.suffix.lower() not in OPTIMIZED_SUFFIXES:
+            return source
+        cached = self._cached(source, digest)
+        if cached is not None:
+            return cached
+        entry = self._entry(digest)
+        return _optimize_image(source, entry, self._settings()) or source
+
+    def optimize_many(self, assets: Dict[Path, str]) -> Dict[Path, Path]:
+        """Optimize several assets, in a process pool when workers > 1
+
+        Args:
+            assets: Digest of every asset to optimize, keyed by path
+
+        Returns:
+            Dict[Path, Path]: The file to upload for every asset (see optimize)
+        """
+        results = {}
+        todo = []
+        for source, digest in assets.items():
+            source = Path(source)
+            cached = self._cached(source, digest) if source.suffix.lower() in OPTIMIZED_SUFFIXES else source
+            if cached is None:
+                todo.append((source, self._entry(digest)))
+            else:
+                results[source] = cached
+        if self.workers <= 1 or len(todo) <= 1:
+            for source, entry in todo:
+                results[source] = _optimize_image(source, entry, self._settings()) or source
+            return results
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(todo))) as executor:
+            futures = [(source, executor.submit(_optimize_image, source, entry, self._settings()))
+                       for source, entry in todo]
+            for source, future in futures:
+                results[source] = future.result() or source
+        return results
+
+    def _settings(self) -> Dict:
+        """Return the settings passed to _optimize_image"""
+        return {
+            'quality': self.quality,
+            'target_format': self.target_format,
+            'strip_metadata': self.strip_metadata,
+        }
+
+    def _entry(self, digest: str) -> Path:
+        """Return the cache directory of an asset"""
+        return self.cache_dir / digest[:2] / f'{digest}-{self.fingerprint}'
+
+    def _cached(self, source: Path, digest: str) -> Optional[Path]:
+        """Return the cached result for an asset, or None if it was not optimized yet"""
+        entry = self._entry(digest)
+        if (entry / KEEP_ORIGINAL).exists():
+            return source
+        suffix = f'.{self.target_format}' if self.target_format else source.suffix
+        optimized = entry / f'{source.stem}{suffix}'
+        return optimized if optimized.exists() else None
+
+
+def _optimize_image(source: Path, entry: Path, settings: Dict) -> Optional[Path]:
+    """Optimize one image into a cache entry, also used in worker processes
+
+    Args:
+        source: Path to the image
+        entry: Cache directory of the image
+        settings: Optimizer settings (quality, target_format, strip_metadata)
+
+    Returns:
+        Optional[Path]: The optimized file, or None if the source should be uploaded as is
+    """
+    from PIL import Image, ImageOps
+
+    entry.mkdir(parents=True, exist_ok=True)
+    quality = settings['quality']
+    try:
+        with Image.open(source) as image:
+            if getattr(image, 'is_animated', False):
+                return _keep_original(entry)
+            source_format = image.format
+            icc_profile = image.info.get('icc_profile')
+            exif = image.getexif()
+            if settings['strip_metadata'] and exif.get(ORIENTATION_TAG, 1) != 1:
+                image = ImageOps.exif_transpose(image)
+            target_format = (settings['target_format'] or source_format).upper()
+            options = {'icc_profile': icc_profile} if icc_profile else {}
+            if not settings['strip_metadata'] and exif:
+                options['exif'] = exif
+            if target_format == 'PNG':
+                options['optimize'] = True
+                if quality is not None and image.mode in ('RGB', 'RGBA'):
+                    # Lossy PNG: reduce to a 256 color palette
+                    image = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+            elif target_format == 'JPEG':
+                options.update(optimize=True, progressive=True)
+                if quality is not None:
+                    options['quality'] = quality
+                elif getattr(image, 'format', None) == 'JPEG':
+                    # Reuse the source quantization tables, so quality does not degrade
+                    options['quality'] = 'keep'
+                else:
+                    options['quality'] = 95
+                if image.mode not in ('RGB', 'L', 'CMYK'):
+                    image = image.convert('RGB')
+            elif target_format == 'WEBP':
+                if quality is not None:
+                    options.update(quality=quality, method=6)
+                else:
+                    options['lossless'] = True
+            elif target_format == 'AVIF':
+                options['quality'] = quality if quality is not None else 90
+            suffix = f".{settings['target_format']}" if settings['target_format'] else source.suffix
+            fd, tmp_path = tempfile.mkstemp(dir=entry, suffix=suffix)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, format=target_format, **options)
+                if os.path.getsize(tmp_path) >= source.stat().st_size:
+                    os.unlink(tmp_path)
+                    return _keep_original(entry)
+                target = entry / f'{source.stem}{suffix}'
+                os.replace(tmp_path, target)
+                return target
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        # Corrupt or unsupported images are uploaded unchanged
+        return None
+
+
+def _keep_original(entry: Path) -> None:
+    """Record that the source of a cache entry is uploaded unchanged"""
+    (entry / KEEP_ORIGINAL).touch()
+    return None
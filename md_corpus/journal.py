@@ -0,0 +1,227 @@
+"""Write-ahead journal making interrupted directory runs resumable"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+from .exceptions import MDCorpusError
+from .utils import file_sha256
+
+DEFAULT_JOURNAL_FILE = ".md-corpus-journal.jsonl"
+
+
+class ConversionJournal:
+    """Append-only log of the uploads and documents completed by a run
+
+    Every record is one JSON line, written and fsynced before the call
+    returns, so the journal survives the process being killed at any point.
+    Records can be written from several threads, e.g. as concurrent uploads
+    finish.
+    A torn last line from a crash while appending is dropped on replay.
+
+    Documents are recorded after they were written; atomic writes guarantee
+    that a document is either fully rewritten or untouched, and its directory
+    is synced before the record is appended. Replaying a journal restores the
+    URLs of the uploaded assets and the fingerprints (mtime, size and content
+    hash) of the finished documents, so a resumed run neither uploads nor
+    processes them again unless they changed in the meantime.
+    """
+
+    def __init__(self, path: Union[str, Path], root: Union[str, Path] = None, resume: bool = False):
+        """Open a journal, replaying it or starting it over
+
+        Args:
+            path: Path to the journal file
+            root: Directory that recorded paths are relative to
+                (defaults to the directory containing the journal)
+            resume: Replay an existing journal and append to it. Otherwise an
+                existing journal is discarded.
+
+        Raises:
+            MDCorpusError: If the journal cannot be read or opened
+        """
+        self.path = Path(path)
+        self.root = Path(root) if root is not None else self.path.parent
+        # URL of every recorded upload, keyed by (content digest, file name, scope)
+        self.uploads: Dict[Tuple[str, str, str], str] = {}
+        # Digest last uploaded under every (file name, scope) with a name-derived key
+        self._name_digests: Dict[Tuple[str, str], str] = {}
+        self._documents: Dict[str, Dict[str, Dict]] = {}
+        self._fd = None
+        self._lock = threading.Lock()
+        valid_size = self._replay() if resume and self.path.exists() else 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.truncate(self.path, valid_size)
+            os.fsync(self._fd)
+        except OSError as e:
+            raise MDCorpusError(f"Failed to open journal {self.path}: {str(e)}")
+        _sync_directory(self.path.parent)
+
+    @property
+    def document_count(self) -> int:
+        """Number of documents recorded in all modes"""
+        return sum(len(entries) for entries in self._documents.values())
+
+    def record_upload(self, digest: str, name: str, url: str, scope: str = '', replace_name: bool = False) -> None:
+        """Record an uploaded asset
+
+        Args:
+            digest: SHA-256 hex digest of the asset content
+            name: File name of the asset
+            url: Remote URL returned by the storage provider
+            scope: Destination the asset was uploaded to, see AssetManifest
+            replace_name: Drop the uploads of other digests with the same name
+                and scope, whose object this upload overwrote
+        """
+        self._add_upload(digest, name, scope, url, replace_name)
+        record = {'op': 'upload', 'digest': digest, 'name': name, 'scope': scope, 'url': url}
+        if replace_name:
+            record['replace_name'] = True
+        self._append(record)
+
+    def record_document(self, mode: str, file_path: Union[str, Path], content: str) -> None:
+        """Record a document as finished
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the processed Markdown file
+            content: Content of the file after processing
+        """
+        file_path = Path(file_path)
+        stat = file_path.stat()
+        entry = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': hashlib.sha256(content.encode('utf-8')).hexdigest()
+        }
+        key = self._key(file_path)
+        self._documents.setdefault(mode, {})[key] = entry
+        _sync_directory(file_path.parent)
+        self._append({'op': 'document', 'mode': mode, 'path': key, **entry})
+
+    def is_done(self, mode: str, file_path: Union[str, Path]) -> bool:
+        """Check whether a document was finished and has not changed since
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the Markdown file
+
+        Returns:
+            bool: True if the document matches its recorded fingerprint
+        """
+        entry = self._documents.get(mode, {}).get(self._key(file_path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns'] and stat.st_size == entry['size']:
+            return True
+        return stat.st_size == entry['size'] and file_sha256(file_path) == entry['sha256']
+
+    def complete(self) -> None:
+        """Close and delete the journal of a run that finished"""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """Close the journal file"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _append(self, record: Dict) -> None:
+        """Write one record and wait for it to reach the disk"""
+        data = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        try:
+            with self._lock:
+                os.write(self._fd, data)
+                os.fsync(self._fd)
+        except OSError as e:
+            raise MDCorpusError(f"Failed to write journal {self.path}: {str(e)}")
+
+    def _replay(self) -> int:
+        """Load the records of an existing journal
+
+        Returns:
+            int: Size in bytes of the complete records; anything after them is
+            the torn tail of an interrupted append
+        """
+        try:
+            data = self.path.read_bytes()
+        except OSError as e:
+            raise MDCorpusError(f"Failed to read journal {self.path}: {str(e)}")
+        valid_size = 0
+        for line in data.splitlines(keepends=True):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("incomplete record")
+                record = json.loads(line)
+                if record['op'] == 'upload':
+                    self._add_upload(record['digest'], record['name'], record.get('scope', ''), record['url'],
+                                     record.get('replace_name', False))
+                elif record['op'] == 'document':
+                    self._documents.setdefault(record['mode'], {})[record['path']] = {
+                        'mtime_ns': record['mtime_ns'], 'size': record['size'], 'sha256': record['sha256']
+                    }
+            except (ValueError, KeyError, TypeError):
+                break
+            valid_size += len(line)
+        return valid_size
+
+    def _add_upload(self, digest: str, name: str, scope: str, url: str, replace_name: bool) -> None:
+        """Store an upload, dropping the one it overwrote under a name-derived key"""
+        if replace_name:
+            previous = self._name_digests.get((name, scope))
+            if previous is not None and previous != digest:
+                self.uploads.pop((previous, name, scope), None)
+            self._name_digests[(name, scope)] = digest
+        self.uploads[(digest, name, scope)] = url
+
+    def _key(self, file_path: Union[str, Path]) -> str:
+        """Return the path of a file relative to the journal root"""
+        return os.path.relpath(os.path.abspath(file_path), os.path.abspath(self.root))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _sync_directory(path: Path) -> None:
+    """Make the entries of a directory (new files, renames) durable
+
+    Directories cannot be opened on some platforms, where this does nothing.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def default_journal_path(path: Union[str, Path]) -> Path:
+    """Return the default journal location for a directory
+
+    Args:
+        path: Directory being converted
+
+    Returns:
+        Path: The journal file inside the directory
+    """
+    return Path(path) / DEFAULT_JOURNAL_FILE
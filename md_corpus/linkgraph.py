@@ -0,0 +1,209 @@
+"""Persistent graph of the assets referenced by each document"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Union
+
+from .exceptions import MDCorpusError
+
+DEFAULT_LINK_GRAPH_FILE = ".md-corpus-links.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS links (
+    doc INTEGER NOT NULL,
+    asset INTEGER NOT NULL,
+    url TEXT,
+    PRIMARY KEY (doc, asset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS links_by_asset ON links (asset, doc);
+"""
+
+
+class LinkGraph:
+    """SQLite backed document to asset graph with a reverse index
+
+    Every edge links a document to a local asset it references, together
+    with the URL the asset was uploaded to (None if the upload failed). Paths
+    are stored once and referenced by integer id; edges are keyed by
+    (document, asset) with a covering (asset, document) index, so the
+    documents referencing an asset are found in time proportional to their
+    number. Paths are stored relative to root.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:", root: Union[str, Path] = None):
+        """Open (or create) a link graph database
+
+        Args:
+            path: Path to the SQLite database file, or ":memory:"
+            root: Directory that stored paths are relative to (defaults to the
+                directory containing the database, or the current directory)
+        """
+        self.path = str(path)
+        if root is None:
+            root = Path(self.path).parent if self.path != ":memory:" else Path.cwd()
+        self.root = Path(root)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise MDCorpusError(f"Failed to open link graph {self.path}: {str(e)}")
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+
+    def set_links(self, doc: Union[str, Path], assets: Mapping[Union[str, Path], Optional[str]]) -> None:
+        """Replace the assets referenced by a document
+
+        Args:
+            doc: Path to the document
+            assets: URL of every referenced asset (None if its upload failed).
+                If several paths name the same file, the last one wins.
+        """
+        with self._lock, self._conn:
+            doc_id = self._id(doc)
+            edges = {self._id(asset): url for asset, url in assets.items()}
+            self._conn.execute("DELETE FROM links WHERE doc = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT INTO links (doc, asset, url) VALUES (?, ?, ?)",
+                [(doc_id, asset_id, url) for asset_id, url in edges.items()]
+            )
+
+    def remove_link(self, doc: Union[str, Path], asset: Union[str, Path]) -> None:
+        """Drop the edge between a document and an asset
+
+        Args:
+            doc: Path to the document
+            asset: Path to the asset
+        """
+        with self._lock, self._conn:
+            doc_id, asset_id = self._lookup(doc), self._lookup(asset)
+            if doc_id is not None and asset_id is not None:
+                self._conn.execute("DELETE FROM links WHERE doc = ? AND asset = ?", (doc_id, asset_id))
+
+    def remove_document(self, doc: Union[str, Path]) -> None:
+        """Drop all edges of a document, e.g. after it was deleted
+
+        Args:
+            doc: Path to the document
+        """
+        with self._lock, self._conn:
+            doc_id = self._lookup(doc)
+            if doc_id is not None:
+                self._conn.execute("DELETE FROM links WHERE doc = ?", (doc_id,))
+
+    def assets(self, doc: Union[str, Path]) -> Dict[Path, Optional[str]]:
+        """Return the assets referenced by a document
+
+        Args:
+            doc: Path to the document
+
+        Returns:
+            Dict[Path, Optional[str]]: URL of every referenced asset
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.path, l.url FROM links l JOIN paths p ON p.id = l.asset "
+                "WHERE l.doc = (SELECT id FROM paths WHERE path = ?)", (self._key(doc),)
+            ).fetchall()
+        return {self.root / path: url for path, url in rows}
+
+    def dependents(self, asset: Union[str, Path]) -> Dict[Path, Optional[str]]:
+        """Return the documents that reference an asset
+
+        Args:
+            asset: Path to the asset
+
+        Returns:
+            Dict[Path, Optional[str]]: The URL each document links the asset with,
+            keyed by document path and sorted
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.path, l.url FROM links l JOIN paths p ON p.id = l.doc "
+                "WHERE l.asset = (SELECT id FROM paths WHERE path = ?) ORDER BY p.path", (self._key(asset),)
+            ).fetchall()
+        return {self.root / path: url for path, url in rows}
+
+    def set_url(self, asset: Union[str, Path], url: str, docs: List[Union[str, Path]] = None) -> None:
+        """Record the new URL of an asset
+
+        Args:
+            asset: Path to the asset
+            url: New URL of the asset
+            docs: Documents to update (all documents referencing the asset if not set)
+        """
+        with self._lock, self._conn:
+            asset_id = self._lookup(asset)
+            if asset_id is None:
+                return
+            if docs is None:
+                self._conn.execute("UPDATE links SET url = ? WHERE asset = ?", (url, asset_id))
+            else:
+                self._conn.executemany(
+                    "UPDATE links SET url = ? WHERE asset = ? AND doc = (SELECT id FROM paths WHERE path = ?)",
+                    [(url, asset_id, self._key(doc)) for doc in docs]
+                )
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        """Return the number of edges"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def __enter__(self) -> 'LinkGraph':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _key(self, path: Union[str, Path]) -> str:
+        """Return the stored form of a path"""
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+
+    def _lookup(self, path: Union[str, Path]) -> Optional[int]:
+        """Return the id of a stored path, or None (caller holds the lock)"""
+        key = self._key(path)
+        path_id = self._ids.get(key)
+        if path_id is None:
+            row = self._conn.execute("SELECT id FROM paths WHERE path = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path_id = self._ids[key] = row[0]
+        return path_id
+
+    def _id(self, path: Union[str, Path]) -> int:
+        """Return the id of a path, storing it if needed (caller holds the lock)"""
+        path_id = self._lookup(path)
+        if path_id is None:
+            key = self._key(path)
+            path_id = self._ids[key] = self._conn.execute(
+                "INSERT INTO paths (path) VALUES (?)", (key,)
+            ).lastrowid
+        return path_id
+
+
+def default_link_graph_path(path: Union[str, Path]) -> Path:
+    """Return the default link graph location for a file or directory
+
+    Args:
+        path: Markdown file or directory being processed
+
+    Returns:
+        Path: The database inside the directory (or next to the file)
+    """
+    path = Path(path)
+    return (path if path.is_dir() else path.parent) / DEFAULT_LINK_GRAPH_FILE
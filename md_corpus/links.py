@@ -0,0 +1,127 @@
+"""Single-pass scanner for link targets in Markdown content"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple
+
+# One compiled pattern for Markdown links/images and HTML <img> tags, so a
+# document is scanned in a single sweep. Both branches start with a literal
+# character ("[" or "<"), which keeps the scan fast; the "!" of an image is
+# not part of the target and is not matched.
+LINK_PATTERN = re.compile(
+    r"""
+    # Markdown link or image: [text](target "title") or ![alt](<target>)
+    \[[^\]\n]*\]\(
+    [ \t]*
+    (?:
+        <(?P<angle>[^<>\n]*)>
+      | (?P<bare>(?:[^()\n]|\([^()\n]*\))+?)
+    )
+    (?:[ \t]+(?:"[^"\n]*"|'[^'\n]*'))?
+    [ \t]*\)
+    |
+    # HTML image: <img ... src="target">
+    <[iI][mM][gG]\s[^>]*?(?<![\w-])[sS][rR][cC][ \t]*=[ \t]*(?P<quote>["'])(?P<src>[^"'>]*?)(?P=quote)
+    """,
+    re.VERBOSE,
+)
+
+# Targets with a URL scheme (http:, https:, data:, mailto:, ...) or protocol-relative URLs
+URL_PATTERN = re.compile(r'^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)')
+
+# Byte-level hint that a document may have a local link target: "](" or an
+# <img src=" followed by something other than a URL, an anchor or an empty
+# target. Blanks after the "<" of an angle-bracketed target or the opening
+# quote of src are skipped, as the target is stripped before it is resolved.
+# It can match where scan_links finds no local target, never the other way
+# around, and runs over the raw bytes without decoding them.
+LOCAL_LINK_HINT = re.compile(
+    rb"""
+    (?:
+        \]\([ \t]*(?:<[ \t]*|(?!<))
+      | <[iI][mM][gG]\s[^>]*?[sS][rR][cC][ \t]*=[ \t]*["'][ \t]*
+    )
+    (?![a-zA-Z][a-zA-Z0-9+.-]*:|//|[\#)>"'\s])
+    """,
+    re.VERBOSE,
+)
+
+
+class LinkTarget(NamedTuple):
+    """Location of a link target inside a document
+
+    Attributes:
+        start: Offset of the first character of the target
+        end: Offset just past the last character of the target
+        target: The target as written in the document
+    """
+    start: int
+    end: int
+    target: str
+
+
+def scan_links(content: str) -> Iterator[LinkTarget]:
+    """Find the targets of all Markdown links, images and <img> tags
+
+    Args:
+        content: Markdown content to scan
+
+    Yields:
+        LinkTarget: Every link target, in document order
+    """
+    for match in LINK_PATTERN.finditer(content):
+        for group in ('angle', 'bare', 'src'):
+            if match.start(group) != -1:
+                break
+        yield LinkTarget(match.start(group), match.end(group), match.group(group))
+
+
+def is_local_target(target: str) -> bool:
+    """Check whether a link target may refer to a local file
+
+    Args:
+        target: Link target as written in the document
+
+    Returns:
+        bool: False for URLs and in-page anchors, True otherwise. Surrounding
+        blanks are ignored, as they are when the target is resolved.
+    """
+    target = target.strip()
+    return bool(target) and not target.startswith('#') and not URL_PATTERN.match(target)
+
+
+def has_local_links(data: bytes) -> bool:
+    """Cheaply check whether Markdown content may link to local files
+
+    Args:
+        data: Raw (UTF-8) content of a document
+
+    Returns:
+        bool: False only if scan_links finds no local link target in the content
+    """
+    return LOCAL_LINK_HINT.search(data) is not None
+
+
+def replace_targets(content: str, links: Iterable[LinkTarget], urls: Dict[str, str]) -> str:
+    """Replace link targets in content, building the result from slices
+
+    Args:
+        content: The scanned content
+        links: Links found by scan_links, in document order
+        urls: Replacement for each target; targets that are missing are kept
+
+    Returns:
+        str: The content with the targets replaced
+    """
+    parts: List[str] = []
+    position = 0
+    for link in links:
+        url = urls.get(link.target)
+        if url is None:
+            continue
+        parts.append(content[position:link.start])
+        parts.append(url)
+        position = link.end
+    if not parts:
+        return content
+    parts.append(content[position:])
+    return ''.join(parts)
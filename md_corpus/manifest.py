@@ -0,0 +1,203 @@
+"""Persistent content-hash to remote URL manifest for uploaded assets"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from .exceptions import MDCorpusError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    scope TEXT NOT NULL DEFAULT '',
+    digest TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    source TEXT,
+    PRIMARY KEY (scope, digest, name)
+)
+"""
+
+# Manifests written before entries were scoped; their rows get the empty scope
+MIGRATION = """
+ALTER TABLE assets RENAME TO assets_unscoped;
+""" + SCHEMA + """;
+INSERT INTO assets (scope, digest, name, url, size, source)
+    SELECT '', digest, name, url, size, source FROM assets_unscoped;
+DROP TABLE assets_unscoped;
+"""
+
+# Finds the entries sharing an object key derived from the file name
+NAME_INDEX = "CREATE INDEX IF NOT EXISTS assets_by_name ON assets (scope, name)"
+
+
+class AssetManifest:
+    """SQLite backed manifest mapping asset content to uploaded URLs
+
+    Entries are keyed by the SHA-256 digest of the asset content together with
+    the file name, because providers derive the object key from the name, and
+    by a scope identifying the upload destination (provider, bucket or root and
+    public URL), since a URL is only valid for the destination it was uploaded
+    to. An asset that was uploaded once is never uploaded again to the same
+    destination while its entry exists. When objects are keyed by file name,
+    an upload overwrites the object of every other digest with that name, so
+    their entries are replaced (see put).
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        """Open (or create) a manifest database
+
+        Args:
+            path: Path to the SQLite database file, or ":memory:" for a
+                manifest that only lives for the current process
+        """
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(SCHEMA)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(assets)")]
+            if 'scope' not in columns:
+                self._conn.executescript(MIGRATION)
+            self._conn.execute(NAME_INDEX)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise MDCorpusError(f"Failed to open manifest {self.path}: {str(e)}")
+        self._lock = threading.Lock()
+
+    def get(self, digest: str, name: str, scope: str = '') -> Optional[str]:
+        """Look up the URL of an uploaded asset
+
+        Args:
+            digest: SHA-256 hex digest of the asset content
+            name: File name of the asset
+            scope: Destination the asset was uploaded to
+
+        Returns:
+            Optional[str]: The remote URL, or None if the asset is unknown
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url FROM assets WHERE scope = ? AND digest = ? AND name = ?", (scope, digest, name)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        digest: str,
+        name: str,
+        url: str,
+        size: int,
+        source: str = None,
+        scope: str = '',
+        replace_name: bool = False
+    ) -> None:
+        """Record the URL of an uploaded asset
+
+        Args:
+            digest: SHA-256 hex digest of the asset content
+            name: File name of the asset
+            url: Remote URL returned by the storage provider
+            size: Size of the asset in bytes
+            source: Local path the asset was uploaded from
+            scope: Destination the asset was uploaded to
+            replace_name: Drop the entries of other digests with the same name
+                and scope, because the asset was uploaded under a key derived
+                from its name and overwrote their object
+        """
+        with self._lock:
+            if replace_name:
+                self._conn.execute(
+                    "DELETE FROM assets WHERE scope = ? AND name = ? AND digest != ?", (scope, name, digest)
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO assets (scope, digest, name, url, size, source) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, digest, name, url, size, source)
+            )
+            self._conn.commit()
+
+    def entries(self) -> List[Dict]:
+        """Return all manifest entries ordered by scope, digest and name
+
+        Returns:
+            List[Dict]: One dict per asset with scope, digest, name, url, size and source keys
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT scope, digest, name, url, size, source FROM assets ORDER BY scope, digest, name"
+            ).fetchall()
+        return [
+            {'scope': scope, 'digest': digest, 'name': name, 'url': url, 'size': size, 'source': source}
+            for scope, digest, name, url, size, source in rows
+        ]
+
+    def merge(self, path: Union[str, Path]) -> int:
+        """Add the entries of another manifest, e.g. the partial manifest of a shard
+
+        Entries already present are kept, so merging the same manifest twice
+        changes nothing.
+
+        Args:
+            path: Path to the SQLite database of the manifest to merge
+
+        Returns:
+            int: Number of entries added
+
+        Raises:
+            MDCorpusError: If the manifest cannot be read
+        """
+        if not Path(path).is_file():
+            raise MDCorpusError(f"Manifest not found: {path}")
+        # Bring a manifest written before entries were scoped up to date
+        AssetManifest(path).close()
+        with self._lock:
+            before = self._conn.total_changes
+            try:
+                self._conn.execute("ATTACH DATABASE ? AS part", (str(path),))
+                try:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO assets (scope, digest, name, url, size, source) "
+                        "SELECT scope, digest, name, url, size, source FROM part.assets"
+                    )
+                    self._conn.commit()
+                except sqlite3.Error:
+                    self._conn.rollback()
+                    raise
+                finally:
+                    self._conn.execute("DETACH DATABASE part")
+            except sqlite3.Error as e:
+                raise MDCorpusError(f"Failed to merge manifest {path}: {str(e)}")
+            return self._conn.total_changes - before
+
+    def export_json(self, output_path: Union[str, Path]) -> int:
+        """Export the manifest as a JSON document
+
+        Args:
+            output_path: Path of the JSON file to write
+
+        Returns:
+            int: Number of exported entries
+        """
+        entries = self.entries()
+        Path(output_path).write_text(
+            json.dumps({'version': 1, 'assets': entries}, indent=2, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        return len(entries)
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
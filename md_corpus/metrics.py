@@ -0,0 +1,157 @@
+"""Per-stage timing metrics for conversion runs"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Union
+
+from .utils import atomic_write_text
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported Prometheus metric
+PROMETHEUS_PREFIX = 'md_corpus'
+
+
+class StageStats:
+    """Call count, bytes and latency histogram of one processing stage"""
+
+    __slots__ = ('count', 'bytes', 'seconds', 'max_seconds', 'buckets')
+
+    def __init__(self, num_buckets: int):
+        self.count = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # Non-cumulative counts; the last bucket collects everything above the largest bound
+        self.buckets = [0] * (num_buckets + 1)
+
+
+class Metrics:
+    """Thread-safe collector of per-stage counts, bytes and latencies
+
+    Stages are named after the step they time, e.g. "read", "format",
+    "scan", "upload" and "write". Counters hold plain event counts such as
+    the number of processed files.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize an empty collector
+
+        Args:
+            buckets: Increasing upper bounds in seconds of the latency histogram buckets
+        """
+        self.bounds = tuple(buckets)
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, nbytes: int = 0) -> None:
+        """Record one execution of a stage
+
+        Args:
+            stage: Name of the stage
+            seconds: Time the stage took
+            nbytes: Number of bytes the stage handled
+        """
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats(len(self.bounds))
+            stats.count += 1
+            stats.bytes += nbytes
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.buckets[index] += 1
+
+    @contextmanager
+    def time(self, stage: str, nbytes: int = 0) -> Iterator[None]:
+        """Time the enclosed block as one execution of a stage
+
+        Args:
+            stage: Name of the stage
+            nbytes: Number of bytes the stage handles
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, nbytes)
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Add to a counter
+
+        Args:
+            name: Name of the counter
+            value: Amount to add
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict:
+        """Return all metrics as a JSON serializable dict"""
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        with self._lock:
+            return {
+                'version': 1,
+                'stages': {
+                    name: {
+                        'count': stats.count,
+                        'bytes': stats.bytes,
+                        'seconds': stats.seconds,
+                        'max_seconds': stats.max_seconds,
+                        'buckets': dict(zip(labels, stats.buckets)),
+                    }
+                    for name, stats in sorted(self.stages.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format
+
+        Stage latencies become one histogram labelled by stage, stage bytes one
+        counter, and every counter a separate metric with a _total suffix.
+        """
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        seconds = f'{PROMETHEUS_PREFIX}_stage_seconds'
+        lines.append(f'# HELP {seconds} Time spent per processing stage')
+        lines.append(f'# TYPE {seconds} histogram')
+        for name, stats in snapshot['stages'].items():
+            cumulative = 0
+            for label, count in stats['buckets'].items():
+                cumulative += count
+                lines.append(f'{seconds}_bucket{{stage="{name}",le="{label}"}} {cumulative}')
+            lines.append(f'{seconds}_sum{{stage="{name}"}} {stats["seconds"]}')
+            lines.append(f'{seconds}_count{{stage="{name}"}} {stats["count"]}')
+        nbytes = f'{PROMETHEUS_PREFIX}_stage_bytes_total'
+        lines.append(f'# HELP {nbytes} Bytes handled per processing stage')
+        lines.append(f'# TYPE {nbytes} counter')
+        for name, stats in snapshot['stages'].items():
+            lines.append(f'{nbytes}{{stage="{name}"}} {stats["bytes"]}')
+        for name, value in snapshot['counters'].items():
+            counter = f'{PROMETHEUS_PREFIX}_{name}_total'
+            lines.append(f'# TYPE {counter} counter')
+            lines.append(f'{counter} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Write the metrics to a file
+
+        Files ending in .prom are written in the Prometheus text format (for the
+        node exporter textfile collector), everything else as JSON.
+
+        Args:
+            path: Path of the output file
+        """
+        path = Path(path)
+        if path.suffix == '.prom':
+            atomic_write_text(path, self.to_prometheus())
+        else:
+            atomic_write_text(path, json.dumps(self.snapshot(), indent=2) + '\n')
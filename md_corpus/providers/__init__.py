@@ -1,7 +1,28 @@
-"""Storage providers for md-corpus"""
+"""Storage providers for md-corpus
+
+Provider implementations are imported on first access, so that importing
+md-corpus does not pay for loading boto3/botocore or oss2.
+"""
+
+import importlib
 
 from .base import StorageProvider
-from .aws import AWSProvider
-from .aliyun import AliyunProvider
 
-__all__ = ['StorageProvider', 'AWSProvider', 'AliyunProvider'] 
\ No newline at end of file
+_LAZY_PROVIDERS = {
+    'AWSProvider': '.aws',
+    'AliyunProvider': '.aliyun',
+    'LocalProvider': '.local',
+}
+
+__all__ = ['StorageProvider', 'AWSProvider', 'AliyunProvider', 'LocalProvider']
+
+def __getattr__(name):
+    module_name = _LAZY_PROVIDERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    provider = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = provider
+    return provider
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_PROVIDERS))
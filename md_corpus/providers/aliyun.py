@@ -3,11 +3,22 @@
 import os
 from pathlib import Path
 import mimetypes
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
 import oss2
 from urllib.parse import quote
 
-from .base import StorageProvider
-from ..exceptions import MDCorpusError
+from .base import (IMMUTABLE_CACHE_CONTROL, RemoteObjectIndex, StorageProvider, check_key_strategy, etag_matches,
+                   object_key, upload_concurrently)
+from ..compression import check_encoding, compressed_upload
+from ..exceptions import MDCorpusError, ThrottlingError
+
+if TYPE_CHECKING:
+    from ..metrics import Metrics
+    from ..ratelimit import AdaptiveLimiter
+
+# HTTP statuses and error codes OSS uses to reject requests over the QPS or bandwidth limits
+THROTTLING_STATUSES = {429, 503}
+THROTTLING_CODES = {'SlowDown', 'ServerBusy', 'QpsLimitExceeded', 'RequestThrottled'}
 
 class AliyunProvider(StorageProvider):
     """Aliyun OSS storage provider"""
@@ -19,7 +30,15 @@ class AliyunProvider(StorageProvider):
         secret_key: str = None,
         endpoint: str = None,
         internal: bool = False,
-        cname: str = None
+        cname: str = None,
+        skip_existing: bool = False,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        part_size: int = None,
+        multipart_threads: int = 4,
+        checkpoint_dir: str = None,
+        pool_size: int = 32,
+        compression: Optional[str] = None,
+        key_strategy: str = 'name'
     ):
         """Initialize Aliyun OSS provider
         
@@ -30,10 +49,33 @@ class AliyunProvider(StorageProvider):
             endpoint: OSS endpoint (optional, can be set via ALI_OSS_ENDPOINT env var)
             internal: Whether to use internal endpoint
             cname: Custom domain name (CNAME) for the bucket
+            skip_existing: Skip uploads when an identical object (same size and
+                ETag) already exists under the key. Content-hashed keys only need
+                to exist.
+            multipart_threshold: Files of at least this many bytes are uploaded with
+                resumable multipart upload
+            part_size: Preferred multipart part size in bytes (chosen by oss2 if not set)
+            multipart_threads: Number of parts uploaded in parallel per file
+            checkpoint_dir: Directory for resumable upload checkpoints
+                (defaults to the oss2 location in the home directory)
+            pool_size: Size of the HTTP connection pool shared by all threads using this provider
+            compression: Pre-compress text-based assets with 'gzip' or 'br' and
+                upload them with the matching Content-Encoding
+            key_strategy: Derive object keys from the file 'name', or from the content
+                'hash' and the name. Content-hashed objects are uploaded with an
+                immutable Cache-Control header.
         """
         self.bucket_name = bucket
         self.internal = internal
         self.cname = cname
+        self.compression = check_encoding(compression)
+        self.key_strategy = check_key_strategy(key_strategy)
+        self.skip_existing = skip_existing
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.multipart_threads = multipart_threads
+        self.checkpoint_dir = checkpoint_dir
+        self._remote = RemoteObjectIndex(self._list_prefix, self._head_object)
         
         # Get credentials from env vars if not provided
         access_key = access_key or os.getenv('ALI_OSS_ACCESS_KEY_ID')
@@ -49,9 +91,16 @@ class AliyunProvider(StorageProvider):
         if internal and not endpoint.startswith('oss-internal.'):
             endpoint = endpoint.replace('oss.', 'oss-internal.')
         
-        # Initialize OSS auth and bucket
+        # Initialize OSS auth and bucket. The session holds a connection pool
+        # that is safe to share between the threads uploading through this provider.
         auth = oss2.Auth(access_key, secret_key)
-        self.bucket = oss2.Bucket(auth, endpoint, bucket)
+        self.pool_size = pool_size
+        self.bucket = oss2.Bucket(auth, endpoint, bucket, session=oss2.Session(pool_size=pool_size))
+    
+    @property
+    def destination(self) -> str:
+        """Identity of the bucket and endpoint files are uploaded to, and their URL prefix"""
+        return f"oss://{self.bucket_name} {self.bucket.endpoint} {self.get_file_url('')}"
     
     def upload_file(self, file_path: str) -> str:
         """Upload a file to OSS
@@ -69,21 +118,114 @@ class AliyunProvider(StorageProvider):
         if not file_path.exists():
             raise MDCorpusError(f"File not found: {file_path}")
         
-        # Generate OSS key from file path
-        key = str(file_path.name)
+        key = object_key(file_path, self.key_strategy)
         
-        # Detect content type
+        # Detect content type and make the object public in the same request
         content_type = mimetypes.guess_type(file_path)[0]
-        headers = {'Content-Type': content_type} if content_type else {}
+        headers = {oss2.headers.OSS_OBJECT_ACL: oss2.OBJECT_ACL_PUBLIC_READ}
+        if content_type:
+            headers['Content-Type'] = content_type
+        if self.key_strategy == 'hash':
+            headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
         
         try:
-            with open(file_path, 'rb') as f:
-                self.bucket.put_object(key, f, headers=headers)
-                self.bucket.put_object_acl(key, 'public-read')
+            with compressed_upload(file_path, content_type, self.compression) as (upload_path, encoding):
+                if self.skip_existing and self._exists_identical(key, upload_path):
+                    return self.get_file_url(key)
+                if encoding:
+                    headers['Content-Encoding'] = encoding
+                if upload_path.stat().st_size >= self.multipart_threshold:
+                    oss2.resumable_upload(
+                        self.bucket,
+                        key,
+                        str(upload_path),
+                        store=oss2.ResumableStore(root=self.checkpoint_dir),
+                        headers=headers,
+                        multipart_threshold=self.multipart_threshold,
+                        part_size=self.part_size,
+                        num_threads=self.multipart_threads
+                    )
+                else:
+                    with open(upload_path, 'rb') as f:
+                        self.bucket.put_object(key, f, headers=headers)
             return self.get_file_url(key)
         except oss2.exceptions.OssError as e:
+            if e.status in THROTTLING_STATUSES or e.code in THROTTLING_CODES:
+                raise ThrottlingError(f"OSS throttled upload of {file_path}: {str(e)}")
             raise MDCorpusError(f"Failed to upload file to OSS: {str(e)}")
     
+    def upload_many(
+        self,
+        file_paths: Iterable[str],
+        max_workers: int = 8,
+        limiter: Optional['AdaptiveLimiter'] = None,
+        metrics: Optional['Metrics'] = None,
+        on_done: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Union[str, Exception]]:
+        """Upload several files to OSS
+        
+        OSS has no batch upload request, so files are uploaded concurrently
+        with the number of threads sized to the session's connection pool.
+        Small files hold one connection each; files above the multipart
+        threshold hold up to multipart_threads, so they are uploaded in a
+        second, narrower phase instead of starving the pool.
+        
+        Args:
+            file_paths: Paths of the files to upload
+            max_workers: Maximum number of concurrent small-file uploads
+            limiter: Optional limiter every upload goes through
+            metrics: Optional collector recording every upload as the upload stage
+            on_done: Optional function called with the path and public URL of
+                every file as soon as it is uploaded
+            
+        Returns:
+            Dict[str, Union[str, Exception]]: For each path, the public URL of the
+            uploaded file or the exception raised while uploading it
+        """
+        small, large = [], []
+        for file_path in map(str, file_paths):
+            try:
+                is_large = os.path.getsize(file_path) >= self.multipart_threshold
+            except OSError:
+                is_large = False  # upload_file reports the missing file
+            (large if is_large else small).append(file_path)
+        
+        results = upload_concurrently(
+            self.upload_file, small, min(max_workers, self.pool_size), limiter, metrics, on_done)
+        results.update(upload_concurrently(
+            self.upload_file, large, max(1, self.pool_size // max(1, self.multipart_threads)), limiter, metrics,
+            on_done
+        ))
+        return results
+    
+    def _exists_identical(self, key: str, file_path: Path) -> bool:
+        """Check whether the object under key already has the content of file_path"""
+        remote = self._remote.get(key)
+        if remote is None:
+            return False
+        if self.key_strategy == 'hash':
+            return True  # The key names the content
+        etag, size = remote
+        part_size = None
+        if size >= self.multipart_threshold:
+            part_size = oss2.determine_part_size(size, preferred_size=self.part_size)
+        return etag_matches(etag, size, file_path, part_size=part_size)
+    
+    def _list_prefix(self, prefix: str, recursive: bool = False) -> Iterator[Tuple[str, str, int]]:
+        """List the objects directly under a prefix, or anywhere below it if recursive"""
+        delimiter = '' if recursive else '/'
+        for obj in oss2.ObjectIterator(self.bucket, prefix=prefix, delimiter=delimiter, max_keys=1000):
+            if not obj.is_prefix():
+                yield obj.key, obj.etag, obj.size
+    
+    def _head_object(self, key: str) -> Optional[Tuple[str, int]]:
+        """Return the ETag and size of a single object, or None if it does not exist"""
+        try:
+            result = self.bucket.head_object(key)
+        except oss2.exceptions.OssError:
+            return None
+        return result.etag, result.content_length
+    
     def get_file_url(self, file_key: str) -> str:
         """Get the public URL for a file in OSS
         
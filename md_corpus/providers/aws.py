@@ -1,13 +1,35 @@
 """AWS S3 storage provider implementation"""
 
 import os
+import time
+from contextlib import ExitStack
+from functools import partial
 from pathlib import Path
 import mimetypes
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from s3transfer.manager import TransferManager
+from s3transfer.subscribers import BaseSubscriber
 
-from .base import StorageProvider
-from ..exceptions import MDCorpusError
+from .base import (IMMUTABLE_CACHE_CONTROL, RemoteObjectIndex, StorageProvider, check_key_strategy, etag_matches,
+                   object_key)
+from ..compression import check_encoding, compressed_upload
+from ..exceptions import MDCorpusError, ThrottlingError
+
+if TYPE_CHECKING:
+    from ..metrics import Metrics
+    from ..ratelimit import AdaptiveLimiter
+
+# Error codes and HTTP statuses S3 and compatible services use to ask clients to slow down
+THROTTLING_CODES = {
+    'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded',
+    'RequestThrottled', 'TooManyRequestsException', 'ServiceUnavailable', '503'
+}
+THROTTLING_STATUSES = {429, 503}
 
 class AWSProvider(StorageProvider):
     """AWS S3 storage provider"""
@@ -19,7 +41,14 @@ class AWSProvider(StorageProvider):
         secret_key: str = None,
         region: str = None,
         endpoint_url: str = None,
-        cname: str = None
+        cname: str = None,
+        skip_existing: bool = False,
+        max_pool_connections: int = 32,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunksize: int = 8 * 1024 * 1024,
+        max_concurrency: int = 10,
+        compression: Optional[str] = None,
+        key_strategy: str = 'name'
     ):
         """Initialize AWS S3 provider
         
@@ -30,23 +59,55 @@ class AWSProvider(StorageProvider):
             region: AWS region (optional, can be set via AWS_DEFAULT_REGION env var)
             endpoint_url: Custom endpoint URL for S3 compatible services
             cname: Custom domain name (CNAME) for the bucket
+            skip_existing: Skip uploads when an identical object (same size and
+                ETag) already exists under the key. Content-hashed keys only need
+                to exist.
+            max_pool_connections: Size of the HTTP connection pool shared by all
+                threads using this provider. It should be at least the number of
+                concurrent uploads times max_concurrency.
+            multipart_threshold: Files of at least this many bytes use multipart upload
+            multipart_chunksize: Multipart part size in bytes
+            max_concurrency: Number of parts uploaded in parallel per file
+            compression: Pre-compress text-based assets with 'gzip' or 'br' and
+                upload them with the matching Content-Encoding
+            key_strategy: Derive object keys from the file 'name', or from the content
+                'hash' and the name. Content-hashed objects are uploaded with an
+                immutable Cache-Control header.
         """
         self.bucket_name = bucket
         self.region = region or os.getenv('AWS_DEFAULT_REGION')
         self.cname = cname
+        self.skip_existing = skip_existing
+        self.compression = check_encoding(compression)
+        self.key_strategy = check_key_strategy(key_strategy)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency
+        )
+        self._remote = RemoteObjectIndex(self._list_prefix, self._head_object)
         
         if not self.region:
             raise MDCorpusError("AWS region is required")
         
-        # Initialize S3 client
-        self.s3 = boto3.client(
+        # Initialize S3 client from a dedicated session. Sessions are not
+        # thread-safe, but the client they create is and is shared by all
+        # upload threads.
+        session = boto3.session.Session()
+        self.s3 = session.client(
             's3',
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
             region_name=self.region,
-            endpoint_url=endpoint_url
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=max_pool_connections)
         )
     
+    @property
+    def destination(self) -> str:
+        """Identity of the bucket and endpoint files are uploaded to, and their URL prefix"""
+        return f"s3://{self.bucket_name} {self.s3.meta.endpoint_url} {self.get_file_url('')}"
+    
     def upload_file(self, file_path: str) -> str:
         """Upload a file to S3
         
@@ -63,26 +124,137 @@ class AWSProvider(StorageProvider):
         if not file_path.exists():
             raise MDCorpusError(f"File not found: {file_path}")
         
-        # Generate S3 key from file path
-        key = str(file_path.name)
+        key = object_key(file_path, self.key_strategy)
         
-        # Detect content type
         content_type = mimetypes.guess_type(file_path)[0]
-        extra_args = {
-            'ContentType': content_type,
-            'ACL': 'public-read'  # Set file to be publicly readable
-        } if content_type else {'ACL': 'public-read'}
-        
         try:
-            self.s3.upload_file(
-                str(file_path),
-                self.bucket_name,
-                key,
-                ExtraArgs=extra_args
-            )
+            with compressed_upload(file_path, content_type, self.compression) as (upload_path, encoding):
+                if self.skip_existing and self._exists_identical(key, upload_path):
+                    return self.get_file_url(key)
+                self.s3.upload_file(
+                    str(upload_path),
+                    self.bucket_name,
+                    key,
+                    ExtraArgs=self._extra_args(content_type, encoding),
+                    Config=self.transfer_config
+                )
             return self.get_file_url(key)
-        except ClientError as e:
-            raise MDCorpusError(f"Failed to upload file to S3: {str(e)}")
+        except (ClientError, S3UploadFailedError) as e:
+            raise _upload_error(file_path, e)
+    
+    def upload_many(
+        self,
+        file_paths: Iterable[str],
+        max_workers: int = 8,
+        limiter: Optional['AdaptiveLimiter'] = None,
+        metrics: Optional['Metrics'] = None,
+        on_done: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Union[str, Exception]]:
+        """Upload several files to S3 through a single transfer manager
+        
+        All files share the manager's request pool, so parts of large files
+        and small whole files are interleaved on the same max_concurrency
+        workers instead of each file getting its own pool.
+        
+        Args:
+            file_paths: Paths of the files to upload
+            max_workers: Unused; concurrency comes from max_concurrency
+            limiter: Optional limiter every file goes through. Throttled files
+                are submitted again after a backoff delay.
+            metrics: Optional collector recording every transfer, from submission
+                to completion, as the upload stage
+            on_done: Optional function called with the path and public URL of
+                every file as soon as its transfer finishes, from the transfer
+                thread. s3transfer logs and ignores exceptions it raises.
+            
+        Returns:
+            Dict[str, Union[str, Exception]]: For each path, the public URL of the
+            uploaded file or the exception raised while uploading it
+        """
+        results = {}
+        with ExitStack() as stack:
+            pending = []
+            for file_path in map(str, file_paths):
+                path = Path(file_path)
+                if not path.exists():
+                    results[file_path] = MDCorpusError(f"File not found: {path}")
+                    continue
+                key = object_key(path, self.key_strategy)
+                content_type = mimetypes.guess_type(path)[0]
+                upload_path, encoding = stack.enter_context(
+                    compressed_upload(path, content_type, self.compression))
+                if self.skip_existing and self._exists_identical(key, upload_path):
+                    results[file_path] = self.get_file_url(key)
+                    if on_done is not None:
+                        on_done(file_path, results[file_path])
+                else:
+                    pending.append((file_path, key, str(upload_path), self._extra_args(content_type, encoding)))
+            
+            attempt = 0
+            while pending:
+                futures = []
+                with TransferManager(self.s3, config=self.transfer_config) as manager:
+                    for file_path, key, upload_path, extra_args in pending:
+                        if limiter is not None:
+                            limiter.acquire()
+                        on_success = None if on_done is None else partial(on_done, file_path, self.get_file_url(key))
+                        futures.append((file_path, key, upload_path, extra_args, manager.upload(
+                            upload_path, self.bucket_name, key, extra_args=extra_args,
+                            subscribers=[_TransferSubscriber(upload_path, limiter, metrics, on_success)]
+                        )))
+                
+                throttled = []
+                for file_path, key, upload_path, extra_args, future in futures:
+                    try:
+                        future.result()
+                        results[file_path] = self.get_file_url(key)
+                    except Exception as e:
+                        results[file_path] = _upload_error(file_path, e)
+                        if isinstance(results[file_path], ThrottlingError):
+                            throttled.append((file_path, key, upload_path, extra_args))
+                if limiter is None or not throttled or attempt >= limiter.max_retries:
+                    break
+                limiter.backoff(attempt)
+                attempt += 1
+                pending = throttled
+        return results
+    
+    def _extra_args(self, content_type: Optional[str], encoding: Optional[str] = None) -> dict:
+        """Return the upload arguments (ACL, content type, encoding and caching) for a file"""
+        extra_args = {'ACL': 'public-read'}  # Set file to be publicly readable
+        if content_type:
+            extra_args['ContentType'] = content_type
+        if encoding:
+            extra_args['ContentEncoding'] = encoding
+        if self.key_strategy == 'hash':
+            extra_args['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+        return extra_args
+    
+    def _exists_identical(self, key: str, file_path: Path) -> bool:
+        """Check whether the object under key already has the content of file_path"""
+        remote = self._remote.get(key)
+        if remote is None:
+            return False
+        if self.key_strategy == 'hash':
+            return True  # The key names the content
+        etag, size = remote
+        return etag_matches(etag, size, file_path, part_size=self.transfer_config.multipart_chunksize)
+    
+    def _list_prefix(self, prefix: str, recursive: bool = False) -> Iterator[Tuple[str, str, int]]:
+        """List the objects directly under a prefix, or anywhere below it if recursive"""
+        paginator = self.s3.get_paginator('list_objects_v2')
+        delimiter = {} if recursive else {'Delimiter': '/'}
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, **delimiter):
+            for obj in page.get('Contents', []):
+                yield obj['Key'], obj['ETag'], obj['Size']
+    
+    def _head_object(self, key: str) -> Optional[Tuple[str, int]]:
+        """Return the ETag and size of a single object, or None if it does not exist"""
+        try:
+            response = self.s3.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError:
+            return None
+        return response['ETag'], response['ContentLength']
     
     def get_file_url(self, file_key: str) -> str:
         """Get the public URL for a file in S3
@@ -95,4 +267,57 @@ class AWSProvider(StorageProvider):
         """
         if self.cname:
             return f"https://{self.cname}/{file_key}"
-        return f"https://{self.bucket_name}.s3.amazonaws.com/{file_key}" 
\ No newline at end of file
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{file_key}" 
+
+def _upload_error(file_path: Union[str, Path], error: Exception) -> Exception:
+    """Translate an upload exception into an MDCorpusError
+    
+    Throttling responses become ThrottlingError so that callers can retry them.
+    boto3's S3UploadFailedError wraps the original ClientError.
+    """
+    cause = error.__context__ if isinstance(error, S3UploadFailedError) else error
+    if not isinstance(cause, ClientError):
+        return error if isinstance(error, MDCorpusError) else MDCorpusError(
+            f"Failed to upload file to S3: {str(error)}")
+    code = cause.response.get('Error', {}).get('Code')
+    status = cause.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    if code in THROTTLING_CODES or status in THROTTLING_STATUSES:
+        return ThrottlingError(f"S3 throttled upload of {file_path}: {str(cause)}")
+    return MDCorpusError(f"Failed to upload file to S3: {str(cause)}")
+
+class _TransferSubscriber(BaseSubscriber):
+    """s3transfer subscriber timing a transfer and releasing its limiter slot when it finishes
+    
+    An optional on_success function is called without arguments once the
+    transfer succeeded.
+    """
+    
+    def __init__(
+        self,
+        file_path: str,
+        limiter: Optional['AdaptiveLimiter'],
+        metrics: Optional['Metrics'],
+        on_success: Optional[Callable[[], None]] = None
+    ):
+        self.file_path = file_path
+        self.limiter = limiter
+        self.metrics = metrics
+        self.on_success = on_success
+        self.start = time.perf_counter()
+    
+    def on_done(self, future, **kwargs):
+        throttled = False
+        succeeded = False
+        nbytes = 0
+        try:
+            future.result()
+            succeeded = True
+            nbytes = os.path.getsize(self.file_path)
+        except Exception as e:
+            throttled = isinstance(_upload_error(self.file_path, e), ThrottlingError)
+        if self.metrics is not None:
+            self.metrics.observe('upload', time.perf_counter() - self.start, nbytes)
+        if self.limiter is not None:
+            self.limiter.release(throttled=throttled)
+        if succeeded and self.on_success is not None:
+            self.on_success()
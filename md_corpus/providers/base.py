@@ -1,6 +1,27 @@
 """Base classes for storage providers"""
 
+import hashlib
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from ..exceptions import MDCorpusError
+from ..utils import CHUNK_SIZE, file_md5, file_sha256
+
+if TYPE_CHECKING:
+    from ..metrics import Metrics
+    from ..ratelimit import AdaptiveLimiter
+
+# How object keys are derived: from the file name, or from the content hash and the name
+KEY_STRATEGIES = ('name', 'hash')
+# Prefix of content-hashed keys
+HASH_KEY_PREFIX = 'assets'
+# Content under a content-hashed key never changes, so it can be cached forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
 class StorageProvider(ABC):
     """Abstract base class for storage providers"""
@@ -27,4 +48,250 @@ class StorageProvider(ABC):
         Returns:
             str: Public URL of the file
         """
-        pass 
\ No newline at end of file
+        pass
+    
+    @property
+    def destination(self) -> str:
+        """Identity of the place files are uploaded to
+        
+        URLs recorded in a manifest or journal are only reused for the same
+        destination. The default is the provider class and the URL prefix of
+        its objects; providers add the bucket or root the objects are stored in.
+        
+        Returns:
+            str: Destination identity
+        """
+        return f"{type(self).__name__} {self.get_file_url('')}"
+    
+    def upload_many(
+        self,
+        file_paths: Iterable[str],
+        max_workers: int = 8,
+        limiter: Optional['AdaptiveLimiter'] = None,
+        metrics: Optional['Metrics'] = None,
+        on_done: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Union[str, Exception]]:
+        """Upload several files to cloud storage
+        
+        The default implementation calls upload_file from a thread pool.
+        Providers override it to use their native batching or pipelining.
+        
+        Args:
+            file_paths: Paths of the files to upload
+            max_workers: Maximum number of concurrent uploads
+            limiter: Optional limiter every upload goes through; throttled
+                uploads are retried with backoff
+            metrics: Optional collector recording every upload request as the
+                upload stage
+            on_done: Optional function called with the path and public URL of
+                every file as soon as it is uploaded, from the uploading thread
+        Returns:
+            Dict[str, Union[str, Exception]]: For each path, the public URL of the
+            uploaded file or the exception raised while uploading it
+        """
+        return upload_concurrently(self.upload_file, file_paths, max_workers, limiter, metrics, on_done)
+
+def check_key_strategy(key_strategy: str) -> str:
+    """Validate an object key strategy
+    
+    Args:
+        key_strategy: 'name' or 'hash'
+        
+    Returns:
+        str: The key strategy
+        
+    Raises:
+        MDCorpusError: If the strategy is unknown
+    """
+    if key_strategy not in KEY_STRATEGIES:
+        raise MDCorpusError(f"Invalid key strategy: {key_strategy}")
+    return key_strategy
+
+def object_key(file_path: Path, key_strategy: str = 'name') -> str:
+    """Derive the object key of a file
+    
+    With the 'name' strategy the key is the file name, so files with the same
+    name overwrite each other. The 'hash' strategy puts the SHA-256 digest of
+    the content in the key (assets/ab/abcdef.../image.png), so every key is
+    unique to its content and never changes.
+    
+    Args:
+        file_path: Local file to upload
+        key_strategy: 'name' or 'hash'
+        
+    Returns:
+        str: The object key
+    """
+    if key_strategy == 'hash':
+        digest = file_sha256(file_path)
+        return f"{HASH_KEY_PREFIX}/{digest[:2]}/{digest}/{file_path.name}"
+    return file_path.name
+
+def upload_concurrently(
+    upload_file: Callable[[str], str],
+    file_paths: Iterable[str],
+    max_workers: int = 8,
+    limiter: Optional['AdaptiveLimiter'] = None,
+    metrics: Optional['Metrics'] = None,
+    on_done: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Union[str, Exception]]:
+    """Call an upload function for many files from a bounded thread pool
+    
+    Args:
+        upload_file: Function uploading one file and returning its URL
+        file_paths: Paths of the files to upload
+        max_workers: Maximum number of concurrent uploads
+        limiter: Optional limiter every call goes through
+        metrics: Optional collector recording the latency and size of every call
+        on_done: Optional function called with the path and URL of every file
+            as soon as it is uploaded. Its exceptions are raised to the caller.
+        
+    Returns:
+        Dict[str, Union[str, Exception]]: For each path, the URL or the raised exception
+    """
+    file_paths = [str(file_path) for file_path in file_paths]
+    if metrics is not None:
+        upload_file = timed_upload(upload_file, metrics)
+    
+    def attempt(file_path):
+        try:
+            if limiter is not None:
+                url = limiter.call(upload_file, file_path)
+            else:
+                url = upload_file(file_path)
+        except Exception as e:
+            return e
+        if on_done is not None:
+            on_done(file_path, url)
+        return url
+    
+    if max_workers <= 1 or len(file_paths) <= 1:
+        return {file_path: attempt(file_path) for file_path in file_paths}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(file_paths))) as executor:
+        return dict(zip(file_paths, executor.map(attempt, file_paths)))
+
+def timed_upload(upload_file: Callable[[str], str], metrics: 'Metrics') -> Callable[[str], str]:
+    """Wrap an upload function so that every call is recorded as the upload stage
+    
+    Args:
+        upload_file: Function uploading one file and returning its URL
+        metrics: Collector to record the calls in
+        
+    Returns:
+        Callable[[str], str]: The wrapped function. Failed calls are recorded
+        with zero bytes.
+    """
+    def upload(file_path: str) -> str:
+        start = time.perf_counter()
+        nbytes = 0
+        try:
+            url = upload_file(file_path)
+            nbytes = os.path.getsize(file_path)
+            return url
+        finally:
+            metrics.observe('upload', time.perf_counter() - start, nbytes)
+    return upload
+
+class RemoteObjectIndex:
+    """Thread-safe cache of the objects stored under bucket prefixes
+    
+    Each prefix is listed once, in bulk, the first time a key under it is
+    looked up, so checking many keys costs a few list calls instead of one
+    HEAD request per key. Content-hashed keys (assets/ab/<digest>/<name>)
+    each have a prefix of their own, so they are found by listing their
+    shard of the hash space (assets/ab/) recursively: at most 256 listings
+    however many assets there are.
+    """
+    
+    def __init__(
+        self,
+        list_prefix: Callable[[str, bool], Iterable[Tuple[str, str, int]]],
+        head_object: Callable[[str], Optional[Tuple[str, int]]]
+    ):
+        """Initialize the index
+        
+        Args:
+            list_prefix: Returns (key, etag, size) for every object directly under
+                a prefix, or anywhere below it if its second argument is True
+            head_object: Returns (etag, size) of a single object, or None if it does
+                not exist; used when a prefix cannot be listed
+        """
+        self._list_prefix = list_prefix
+        self._head_object = head_object
+        self._objects: Dict[str, Tuple[str, int]] = {}
+        self._prefixes: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """Return the (etag, size) of a remote object, or None if it does not exist"""
+        prefix, recursive = _listing_prefix(key)
+        with self._lock:
+            if prefix not in self._prefixes:
+                try:
+                    for object_key, etag, size in self._list_prefix(prefix, recursive):
+                        self._objects[object_key] = (etag, size)
+                    self._prefixes[prefix] = True
+                except Exception:
+                    # Listing may be denied by the bucket policy
+                    self._prefixes[prefix] = False
+            if self._prefixes[prefix]:
+                return self._objects.get(key)
+        return self._head_object(key)
+
+def _listing_prefix(key: str) -> Tuple[str, bool]:
+    """Return the prefix listed to find a key, and whether it is listed recursively"""
+    parts = key.split('/')
+    if len(parts) == 4 and parts[0] == HASH_KEY_PREFIX:
+        return f"{parts[0]}/{parts[1]}/", True
+    return (key.rpartition('/')[0] + '/' if '/' in key else ''), False
+
+def etag_matches(etag: str, size: int, file_path: Path, part_size: int = None) -> bool:
+    """Check whether a remote object has the same content as a local file
+    
+    Single-part ETags are the MD5 of the content. Multipart ETags
+    ("<md5 of part md5s>-<parts>") can only be compared when the part size
+    used for the upload is known.
+    
+    Args:
+        etag: ETag of the remote object
+        size: Size of the remote object in bytes
+        file_path: Local file to compare against
+        part_size: Part size used for multipart uploads, if any
+        
+    Returns:
+        bool: True if the remote object is identical to the local file
+    """
+    if size != file_path.stat().st_size:
+        return False
+    etag = etag.strip('"').lower()
+    if '-' not in etag:
+        return etag == file_md5(file_path)
+    if not part_size:
+        return False
+    return etag == multipart_etag(file_path, part_size)
+
+def multipart_etag(file_path: Path, part_size: int) -> str:
+    """Compute the ETag of a multipart upload of a local file
+    
+    Args:
+        file_path: Local file
+        part_size: Size of each uploaded part in bytes
+        
+    Returns:
+        str: The multipart ETag in "<hex>-<parts>" form
+    """
+    part_digests = []
+    with open(file_path, 'rb') as f:
+        while True:
+            part = hashlib.md5()
+            remaining = part_size
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                part.update(chunk)
+                remaining -= len(chunk)
+            if remaining == part_size:
+                break
+            part_digests.append(part.digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
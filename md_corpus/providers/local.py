@@ -0,0 +1,160 @@
+"""Local filesystem storage provider implementation"""
+
+import errno
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from urllib.parse import quote
+
+from .base import StorageProvider, check_key_strategy, object_key
+from ..exceptions import MDCorpusError
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# ioctl request that clones a file's extents (copy-on-write), from linux/fs.h
+FICLONE = 0x40049409
+
+LINK_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+class LocalProvider(StorageProvider):
+    """Storage provider that publishes files into a local directory
+    
+    Files are placed without copying data through user space where possible:
+    a reflink (copy-on-write clone) on filesystems that support it, otherwise
+    a hardlink, otherwise a kernel-side copy with os.copy_file_range. The
+    directory is expected to be served by a web server or CDN origin under
+    base_url.
+    """
+    
+    def __init__(self, root: str, base_url: str, link_mode: str = 'auto', key_strategy: str = 'name'):
+        """Initialize local provider
+        
+        Args:
+            root: Directory that files are published into (created if missing)
+            base_url: Public URL under which root is served
+            link_mode: How files are placed: "reflink", "hardlink", "copy", or
+                "auto" to try them in that order. A hardlink shares the file with
+                its source, so later in-place edits of the source are published too.
+            key_strategy: Place files by their 'name', or under their content 'hash'
+                and name (assets/ab/abcdef.../image.png). Content-hashed files must
+                never change, so they are not hardlinked.
+                
+        Raises:
+            MDCorpusError: If the root cannot be created or the options are invalid
+        """
+        if not root:
+            raise MDCorpusError("Missing required local storage root directory")
+        if not base_url:
+            raise MDCorpusError("Missing required base URL for local storage")
+        if link_mode not in LINK_MODES:
+            raise MDCorpusError(f"Invalid link mode: {link_mode}")
+        
+        self.root = Path(root)
+        self.base_url = base_url.rstrip('/')
+        self.link_mode = link_mode
+        self.key_strategy = check_key_strategy(key_strategy)
+        if link_mode == 'hardlink' and key_strategy == 'hash':
+            raise MDCorpusError("Hardlinks cannot be used with content-hashed keys")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            raise MDCorpusError(f"Failed to create storage directory {self.root}: {str(e)}")
+    
+    @property
+    def destination(self) -> str:
+        """Identity of the storage directory and its base URL"""
+        return f"{self.root.resolve().as_uri()} {self.base_url}/"
+    
+    def upload_file(self, file_path: str) -> str:
+        """Publish a file into the storage directory
+        
+        Args:
+            file_path: Path to the file to publish
+            
+        Returns:
+            str: Public URL of the published file
+            
+        Raises:
+            MDCorpusError: If the file cannot be placed
+        """
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise MDCorpusError(f"File not found: {file_path}")
+        
+        try:
+            key = object_key(file_path, self.key_strategy)
+            destination = self.root / key
+            if destination.exists() and (self.key_strategy == 'hash' or os.path.samefile(file_path, destination)):
+                return self.get_file_url(key)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            # Place under a temporary name and rename, so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=destination.parent, prefix=f'.{file_path.name}.', suffix='.tmp')
+            os.close(fd)
+            try:
+                self._place(file_path, Path(tmp_path))
+                os.replace(tmp_path, destination)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            return self.get_file_url(key)
+        except OSError as e:
+            raise MDCorpusError(f"Failed to place file in local storage: {str(e)}")
+    
+    def get_file_url(self, file_key: str) -> str:
+        """Get the public URL for a file in the storage directory
+        
+        Args:
+            file_key: Key of the file relative to the storage root
+            
+        Returns:
+            str: Public URL of the file
+        """
+        return f"{self.base_url}/{quote(file_key)}"
+    
+    def _place(self, source: Path, target: Path) -> None:
+        """Place source at target (an existing empty file) using the configured link mode"""
+        if self.link_mode in ('auto', 'reflink'):
+            try:
+                _reflink(source, target)
+                return
+            except OSError:
+                if self.link_mode == 'reflink':
+                    raise
+        # A hardlink would let edits of the source change content under its hash
+        if self.link_mode in ('auto', 'hardlink') and self.key_strategy != 'hash':
+            try:
+                os.unlink(target)
+                os.link(source, target)
+                return
+            except OSError:
+                if self.link_mode == 'hardlink':
+                    raise
+                # Cross-device or unsupported: fall back to copying
+                target.touch()
+        _copy(source, target)
+
+def _reflink(source: Path, target: Path) -> None:
+    """Clone source into target with the FICLONE ioctl"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def _copy(source: Path, target: Path) -> None:
+    """Copy source into target in the kernel where possible"""
+    if hasattr(os, 'copy_file_range'):
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            try:
+                while os.copy_file_range(src.fileno(), dst.fileno(), 1 << 30):
+                    pass
+                return
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+    # shutil uses sendfile on Linux and fcopyfile on macOS
+    shutil.copyfile(source, target)
@@ -0,0 +1,158 @@
+"""Adaptive rate limiting and retries for provider requests"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from .exceptions import ThrottlingError
+
+T = TypeVar('T')
+
+# Lowest fraction of the configured rate that throttling can push the rate down to
+MIN_RATE_FRACTION = 1 / 32
+
+
+class AdaptiveLimiter:
+    """Limit the concurrency and request rate of provider calls
+
+    The number of requests in flight follows AIMD (additive increase,
+    multiplicative decrease): every successful request raises the limit by
+    1/limit, so it grows by about one per round of requests, and every
+    throttled request halves it. When a rate is set, a token bucket also caps
+    the number of requests started per second and the rate is adjusted the
+    same way. Throttled calls are retried with jittered exponential backoff.
+
+    One limiter is meant to be shared by all threads uploading to the same
+    storage service. Its counters are reported at the end of a run.
+
+    Attributes:
+        throttled: Number of requests rejected with ThrottlingError
+        retries: Number of retried requests
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_retries: int = 5,
+        base_delay: float = 0.1,
+        max_delay: float = 10.0
+    ):
+        """Initialize the limiter
+
+        Args:
+            max_concurrency: Maximum number of requests in flight
+            rate: Maximum number of requests started per second (unlimited if not set)
+            burst: Token bucket size, i.e. requests that may start at once (default: rate)
+            max_retries: Number of times a throttled call is retried before giving up
+            base_delay: Upper bound in seconds of the first backoff delay
+            max_delay: Upper bound in seconds of any backoff delay
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or (max(1, int(rate)) if rate else None)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttled = 0
+        self.retries = 0
+        self._active = 0
+        self._tokens = float(self.burst or 0)
+        self._refilled = time.monotonic()
+        self._cond = threading.Condition()
+        self._bucket_lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait for a free request slot and, when rate limited, a token"""
+        with self._cond:
+            while self._active >= max(1, int(self.limit)):
+                self._cond.wait()
+            self._active += 1
+        if self.max_rate is not None:
+            self._take_token()
+
+    def release(self, throttled: bool = False) -> None:
+        """Free a request slot and adjust the limits
+
+        Args:
+            throttled: Whether the service throttled the request
+        """
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self.throttled += 1
+                self.limit = max(1.0, self.limit / 2)
+                if self.max_rate is not None:
+                    self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                if self.max_rate is not None:
+                    self.rate = min(self.max_rate, self.rate + self.max_rate * MIN_RATE_FRACTION)
+            self._cond.notify_all()
+
+    def backoff(self, attempt: int) -> None:
+        """Sleep before retrying a throttled request
+
+        The delay is drawn uniformly between zero and base_delay * 2**attempt
+        (capped at max_delay), so that throttled clients do not retry in lockstep.
+
+        Args:
+            attempt: Number of previous retries of the request
+        """
+        with self._cond:
+            self.retries += 1
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Call func within the limits, retrying it while it is throttled
+
+        Args:
+            func: Provider call to make
+            *args: Positional arguments of func
+            **kwargs: Keyword arguments of func
+
+        Returns:
+            The result of func
+
+        Raises:
+            ThrottlingError: If the call is still throttled after max_retries retries
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except ThrottlingError:
+                self.release(throttled=True)
+                if attempt >= self.max_retries:
+                    raise
+                self.backoff(attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                self.release()
+                raise
+            self.release()
+            return result
+
+    def stats(self) -> Dict[str, int]:
+        """Return the throttle and retry counters"""
+        with self._cond:
+            return {'throttled': self.throttled, 'retries': self.retries}
+
+    def _take_token(self) -> None:
+        """Wait until the token bucket holds a token and take it"""
+        while True:
+            with self._bucket_lock:
+                now = time.monotonic()
+                self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate)
+                self._refilled = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,99 @@
+"""Deterministic partitioning of a corpus between machines"""
+
+import hashlib
+import re
+
+from .exceptions import MDCorpusError
+
+SHARD_SPEC = re.compile(r'\s*(\d+)\s*/\s*(\d+)\s*\Z')
+
+
+def stable_hash(key: str) -> int:
+    """Hash a string to an integer that is the same on every machine and run
+
+    Python's built-in hash is salted per process, so it cannot be used to
+    agree on a partition between machines.
+
+    Args:
+        key: String to hash
+
+    Returns:
+        int: The first 8 bytes of the SHA-256 digest of key, as an unsigned integer
+    """
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class Shard:
+    """One of N deterministic partitions of the documents and assets of a corpus
+
+    Documents are assigned by their path relative to the walked directory,
+    assets by their content digest and file name, so every machine running
+    the same shard count agrees on the owner of each without coordination.
+
+    Attributes:
+        index: Number of this shard, from 1 to count
+        count: Total number of shards
+    """
+
+    def __init__(self, index: int, count: int):
+        """Create a shard
+
+        Args:
+            index: Number of this shard, from 1 to count
+            count: Total number of shards
+
+        Raises:
+            MDCorpusError: If index is not between 1 and count
+        """
+        if count < 1 or not 1 <= index <= count:
+            raise MDCorpusError(f"Invalid shard {index}/{count}: expected 1 <= i <= N")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Shard':
+        """Parse a shard given as 'i/N'
+
+        Args:
+            spec: Shard number and count, e.g. '3/12'
+
+        Returns:
+            Shard: The parsed shard
+
+        Raises:
+            MDCorpusError: If spec is not of the form i/N with 1 <= i <= N
+        """
+        match = SHARD_SPEC.match(spec)
+        if match is None:
+            raise MDCorpusError(f"Invalid shard {spec!r}: expected i/N, e.g. 1/4")
+        return cls(int(match.group(1)), int(match.group(2)))
+
+    def owns(self, key: str) -> bool:
+        """Check whether a document or asset key belongs to this shard
+
+        Args:
+            key: Path of a document relative to the walked directory, with '/'
+                separators, or 'digest/name' of an asset
+
+        Returns:
+            bool: True if the key is assigned to this shard
+        """
+        return stable_hash(key) % self.count == self.index - 1
+
+    def owns_asset(self, digest: str, name: str) -> bool:
+        """Check whether this shard uploads an asset
+
+        Args:
+            digest: SHA-256 hex digest of the asset content
+            name: File name of the asset
+
+        Returns:
+            bool: True if the asset is assigned to this shard
+        """
+        return self.owns(f"{digest}/{name}")
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def __repr__(self) -> str:
+        return f"Shard({self.index}, {self.count})"
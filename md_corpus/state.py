@@ -0,0 +1,207 @@
+"""Persistent state for incremental format and convert runs"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Union
+
+from .exceptions import MDCorpusError
+from .utils import file_sha256
+
+STATE_VERSION = 1
+DEFAULT_STATE_FILE = ".md-corpus-state.json"
+
+
+class IncrementalState:
+    """Record of the files processed by previous runs
+
+    For every processed document the state stores its mtime, size and content
+    hash after processing, plus the same fingerprint and the uploaded URL for
+    each asset it referenced. A document is dirty when it, or one of its assets, no longer
+    matches its fingerprint. Entries are kept per mode ("format" or "convert")
+    because a formatted file still needs converting.
+
+    The mtime and size are checked first; the content hash is only computed
+    when they differ, so unchanged trees are checked with one stat per file.
+    """
+
+    def __init__(self, path: Union[str, Path], root: Union[str, Path] = None):
+        """Load the state file, starting empty if it does not exist
+
+        Args:
+            path: Path to the JSON state file
+            root: Directory that recorded paths are relative to
+                (defaults to the directory containing the state file)
+        """
+        self.path = Path(path)
+        self.root = Path(root) if root is not None else self.path.parent
+        self._entries: Dict[str, Dict[str, Dict]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise MDCorpusError(f"Failed to read state file {self.path}: {str(e)}")
+            if data.get('version') == STATE_VERSION:
+                self._entries = data.get('entries', {})
+
+    def is_dirty(self, mode: str, file_path: Union[str, Path]) -> bool:
+        """Check whether a document needs processing
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the Markdown file
+
+        Returns:
+            bool: True if the document or one of its assets changed since it was recorded
+        """
+        entry = self._entries.get(mode, {}).get(self._key(file_path))
+        if entry is None or entry.get('incomplete') or not self._matches(entry, Path(file_path)):
+            return True
+        return bool(self.changed_assets(mode, file_path))
+
+    def changed_assets(self, mode: str, file_path: Union[str, Path]) -> Set[Path]:
+        """Return the recorded assets of a document that changed since they were recorded
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the Markdown file
+
+        Returns:
+            Set[Path]: Paths of the changed (or missing) assets
+        """
+        entry = self._entries.get(mode, {}).get(self._key(file_path), {})
+        return {self.root / asset_key for asset_key, fingerprint in entry.get('assets', {}).items()
+                if not self._matches(fingerprint, self.root / asset_key)}
+
+    def record(
+        self,
+        mode: str,
+        file_path: Union[str, Path],
+        assets: Union[Mapping[Union[str, Path], Optional[str]], Iterable[Union[str, Path]]] = (),
+        complete: bool = True
+    ) -> None:
+        """Record a document, and the assets it references, as processed
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the processed Markdown file
+            assets: Local assets referenced by the document, optionally mapped
+                to the URL they were uploaded to
+            complete: False if some uploads of the document failed. The
+                document then stays dirty, and assets without a URL keep what
+                was recorded for them before, so that the next run retries them.
+        """
+        urls = assets if isinstance(assets, Mapping) else dict.fromkeys(assets)
+        key = self._key(file_path)
+        previous = self._entries.get(mode, {}).get(key, {}).get('assets', {})
+        entry = self._fingerprint(Path(file_path))
+        entry['assets'] = {}
+        for asset, url in urls.items():
+            asset_key = self._key(asset)
+            if not complete and url is None and asset_key in previous:
+                entry['assets'][asset_key] = previous[asset_key]
+                continue
+            fingerprint = self._fingerprint(Path(asset))
+            if url is not None:
+                fingerprint['url'] = url
+            entry['assets'][asset_key] = fingerprint
+        if not complete:
+            entry['incomplete'] = True
+        self._entries.setdefault(mode, {})[key] = entry
+
+    def assets(self, mode: str, file_path: Union[str, Path]) -> Dict[Path, Optional[str]]:
+        """Return the assets recorded for a document with their URLs
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the Markdown file
+
+        Returns:
+            Dict[Path, Optional[str]]: URL of every asset (None if unknown)
+        """
+        entry = self._entries.get(mode, {}).get(self._key(file_path), {})
+        return {self.root / key: fingerprint.get('url') for key, fingerprint in entry.get('assets', {}).items()}
+
+    def asset_paths(self, mode: str) -> Set[Path]:
+        """Return the assets recorded for any document
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+
+        Returns:
+            Set[Path]: Paths of the assets
+        """
+        return {self.root / asset_key for entry in self._entries.get(mode, {}).values()
+                for asset_key in entry.get('assets', {})}
+
+    def forget(self, mode: str, file_path: Union[str, Path]) -> None:
+        """Drop a document so that the next run processes it again
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            file_path: Path to the Markdown file
+        """
+        self._entries.get(mode, {}).pop(self._key(file_path), None)
+
+    def dependents(self, mode: str, asset_path: Union[str, Path]) -> List[Path]:
+        """Return the recorded documents that reference an asset
+
+        Args:
+            mode: Processing mode, "format" or "convert"
+            asset_path: Path to the asset
+
+        Returns:
+            List[Path]: Paths of the documents, sorted
+        """
+        asset_key = self._key(asset_path)
+        return sorted(self.root / doc_key for doc_key, entry in self._entries.get(mode, {}).items()
+                      if asset_key in entry.get('assets', {}))
+
+    def save(self) -> None:
+        """Write the state file atomically"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(
+                json.dumps({'version': STATE_VERSION, 'entries': self._entries}, sort_keys=True),
+                encoding='utf-8'
+            )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            raise MDCorpusError(f"Failed to write state file {self.path}: {str(e)}")
+
+    def _key(self, file_path: Union[str, Path]) -> str:
+        """Return the path of a file relative to the state root"""
+        return os.path.relpath(os.path.abspath(file_path), os.path.abspath(self.root))
+
+    def _fingerprint(self, file_path: Path) -> Dict:
+        """Return the mtime, size and content hash of a file"""
+        stat = file_path.stat()
+        return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': file_sha256(file_path)}
+
+    def _matches(self, fingerprint: Dict, file_path: Path) -> bool:
+        """Check a file against a recorded fingerprint, refreshing it on a stat-only change"""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return False
+        if stat.st_mtime_ns == fingerprint['mtime_ns'] and stat.st_size == fingerprint['size']:
+            return True
+        if stat.st_size != fingerprint['size'] or file_sha256(file_path) != fingerprint['sha256']:
+            return False
+        # Touched but unchanged: remember the new mtime to skip hashing next time
+        fingerprint['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+
+def default_state_path(path: Union[str, Path]) -> Path:
+    """Return the default state file location for a file or directory
+
+    Args:
+        path: Markdown file or directory being processed
+
+    Returns:
+        Path: The state file inside the directory (or next to the file)
+    """
+    path = Path(path)
+    return (path if path.is_dir() else path.parent) / DEFAULT_STATE_FILE
@@ -0,0 +1,102 @@
+"""Shared helpers for md-corpus"""
+
+import hashlib
+import os
+import secrets
+import stat
+import tempfile
+from pathlib import Path
+from typing import Tuple, Union
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: Union[str, Path]) -> str:
+    """Compute the SHA-256 hex digest of a file
+
+    Args:
+        file_path: Path to the file to hash
+
+    Returns:
+        str: Hex encoded SHA-256 digest of the file content
+    """
+    return _file_digest(file_path, hashlib.sha256())
+
+
+def file_md5(file_path: Union[str, Path]) -> str:
+    """Compute the MD5 hex digest of a file, as used in object storage ETags
+
+    Args:
+        file_path: Path to the file to hash
+
+    Returns:
+        str: Hex encoded MD5 digest of the file content
+    """
+    return _file_digest(file_path, hashlib.md5())
+
+
+def _file_digest(file_path: Union[str, Path], digest) -> str:
+    """Feed a file into a hashlib object in chunks and return its hex digest"""
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _create_temp(file_path: Path) -> Tuple[int, str]:
+    """Create a temporary file next to file_path
+
+    Unlike mkstemp, which always uses mode 0o600, the file is created with
+    mode 0o666 and the umask applied by the kernel, so that a new target is
+    as readable as if it had been written directly (e.g. by the Prometheus
+    textfile collector running as another user).
+
+    Returns:
+        Tuple[int, str]: Open file descriptor and path of the temporary file
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    for _ in range(tempfile.TMP_MAX):
+        tmp_path = str(file_path.parent / f'.{file_path.name}.{secrets.token_hex(4)}.tmp')
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No usable temporary file name next to {file_path}")
+
+
+def atomic_write_text(file_path: Union[str, Path], content: str, encoding: str = 'utf-8') -> int:
+    """Replace a file with new content atomically
+
+    The content is written to a temporary file in the same directory, which
+    is then renamed over the target, so readers never see a partial file.
+    The permissions of an existing file are preserved; a new file gets the
+    mode a plain open would give it (0o666 minus the umask).
+
+    Args:
+        file_path: Path to the file to write
+        content: Text content to write
+        encoding: Text encoding
+
+    Returns:
+        int: Number of bytes written
+    """
+    file_path = Path(file_path)
+    fd, tmp_path = _create_temp(file_path)
+    try:
+        data = content.encode(encoding)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(file_path.stat().st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, file_path)
+        return len(data)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
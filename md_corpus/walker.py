@@ -0,0 +1,363 @@
+"""Directory walker listing the Markdown files of a corpus"""
+
+import os
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Pattern, Sequence, Set, Tuple, Union
+
+from .exceptions import MDCorpusError
+
+# Files holding gitignore-style patterns, read in every directory
+IGNORE_FILES = ('.gitignore', '.mdcorpusignore')
+# Directories that are never walked
+PRUNED_DIRS = ('.git', '.hg', '.svn')
+# Files that are processed unless include patterns are given
+DEFAULT_INCLUDE = ('*.md',)
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob (without leading or trailing slash) into a regular expression"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            # A ']' right after '[' or '[!' belongs to the set
+            start = i + 2 if pattern.startswith('[!', i) else i + 1
+            end = pattern.find(']', start + 1 if pattern.startswith(']', start) else start)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[start:end].replace('\\', '\\\\').replace('^', '\\^')
+                parts.append(('[^' if start == i + 2 else '[') + body + ']')
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return ''.join(parts)
+
+
+def _compile(line: str) -> Optional[Tuple[Pattern, bool, bool, bool]]:
+    """Compile one gitignore line into (regex, negated, directories only, anchored)
+
+    Returns None for blank lines and comments.
+    """
+    line = line.rstrip('\r\n')
+    if not line.endswith('\\ '):
+        line = line.rstrip(' ')
+    if not line or line.startswith('#'):
+        return None
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\'):
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    # Patterns containing a slash are relative to their base directory; others match the name at any depth
+    anchored = '/' in line
+    return re.compile(_translate(line.lstrip('/')) + r'\Z'), negated, dir_only, anchored
+
+
+class IgnoreRules:
+    """Ordered gitignore-style patterns, each relative to the directory it was read in
+
+    The last matching pattern decides, so a `!pattern` re-includes paths
+    excluded by an earlier one, and patterns read in a subdirectory override
+    those of its parents. Extending returns a new instance, so rule sets can
+    be shared by the subtrees they apply to.
+    """
+
+    def __init__(self, patterns: Iterable[str] = (), base: str = ''):
+        """Compile patterns
+
+        Args:
+            patterns: gitignore lines
+            base: Directory the patterns are relative to, relative to the walked
+                root with '/' separators ('' for the root)
+        """
+        self._rules: List[Tuple[str, Pattern, bool, bool, bool]] = []
+        self._add(patterns, base)
+
+    def extend(self, patterns: Iterable[str], base: str = '') -> 'IgnoreRules':
+        """Return the rules followed by more patterns
+
+        Args:
+            patterns: gitignore lines
+            base: Directory the patterns are relative to (see __init__)
+
+        Returns:
+            IgnoreRules: A new rule set
+        """
+        extended = IgnoreRules()
+        extended._rules = list(self._rules)
+        extended._add(patterns, base)
+        return extended
+
+    def matches(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Check whether a path is matched (ignored)
+
+        Args:
+            rel_path: Path relative to the walked root with '/' separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            bool: True if the last pattern matching the path is not negated
+        """
+        matched = False
+        name = rel_path.rpartition('/')[2]
+        for base, regex, negated, dir_only, anchored in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if not anchored:
+                path = name
+                if base and not rel_path.startswith(base + '/'):
+                    continue
+            elif base:
+                if not rel_path.startswith(base + '/'):
+                    continue
+                path = rel_path[len(base) + 1:]
+            else:
+                path = rel_path
+            if regex.match(path):
+                matched = not negated
+        return matched
+
+    def _add(self, patterns: Iterable[str], base: str) -> None:
+        for line in patterns:
+            compiled = _compile(line)
+            if compiled is not None:
+                self._rules.append((base, *compiled))
+
+
+class CorpusWalker:
+    """Stream the Markdown files below a directory with os.scandir
+
+    Directories are pruned as soon as they are excluded, so ignored trees
+    such as node_modules or build outputs are never entered. Patterns from
+    .gitignore and .mdcorpusignore files apply to their directory and below.
+    Symbolic links to directories are not followed.
+
+    With one worker, files are yielded in sorted path order. With several,
+    subtrees are scanned concurrently and files are yielded in the order they
+    are found.
+    """
+
+    def __init__(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Sequence[str] = (),
+        ignore_files: Sequence[str] = IGNORE_FILES,
+        pruned_dirs: Sequence[str] = PRUNED_DIRS,
+        workers: int = 1
+    ):
+        """Initialize the walker
+
+        Args:
+            include: gitignore-style patterns of the files to list (default: *.md)
+            exclude: gitignore-style patterns of files and directories to skip
+            ignore_files: Names of the files holding ignore patterns
+            pruned_dirs: Names of directories that are never walked
+            workers: Number of threads scanning directories
+        """
+        self.include = IgnoreRules(include or DEFAULT_INCLUDE)
+        self.exclude = IgnoreRules(exclude)
+        self.ignore_files = tuple(ignore_files)
+        self.pruned_dirs = frozenset(pruned_dirs)
+        self.workers = max(1, workers)
+
+    def walk(self, root: Union[str, Path]) -> Iterator[Path]:
+        """List the matching files below a directory as they are found
+
+        The root is read before returning, the subdirectories while iterating.
+
+        Args:
+            root: Directory to walk
+
+        Returns:
+            Iterator[Path]: Each matching file, as root joined with its relative path
+
+        Raises:
+            MDCorpusError: If root cannot be read
+        """
+        root = Path(root)
+        try:
+            items = self._scan(str(root), '', IgnoreRules())
+        except OSError as e:
+            raise MDCorpusError(f"Failed to read directory {root}: {str(e)}")
+        if self.workers > 1:
+            return self._walk_parallel(items)
+        return self._walk_sorted(items)
+
+    def includes(self, root: Union[str, Path], path: Union[str, Path]) -> bool:
+        """Check whether a file below root would be listed by walk
+
+        Args:
+            root: Walked directory
+            path: File to check
+
+        Returns:
+            bool: False if the file or one of its parent directories is excluded
+        """
+        root = Path(root)
+        try:
+            parts = Path(path).relative_to(root).parts
+        except ValueError:
+            return False
+        rules = IgnoreRules()
+        directory = root
+        for depth, name in enumerate(parts):
+            rules = self._read_ignore_files(str(directory), '/'.join(parts[:depth]), rules)
+            rel_path = '/'.join(parts[:depth + 1])
+            is_dir = depth < len(parts) - 1
+            if not self._accepts(name, rel_path, is_dir, rules):
+                return False
+            directory = directory / name
+        return bool(parts)
+
+    def _walk_sorted(self, items: List[Tuple[bool, str, str, IgnoreRules]]) -> Iterator[Path]:
+        """Walk depth-first in name order, which yields files sorted by path"""
+        stack = [iter(items)]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+            is_dir, path, rel_path, rules = item
+            if is_dir:
+                stack.append(iter(self._scan_subdir(path, rel_path, rules)))
+            else:
+                yield Path(path)
+
+    def _walk_parallel(self, items: List[Tuple[bool, str, str, IgnoreRules]]) -> Iterator[Path]:
+        """Scan subtrees in a thread pool, yielding files as their directories are scanned"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        found: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        lock = threading.Lock()
+        pending = [1]  # Directories submitted but not scanned yet, starting with the root
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        def dispatch(scanned):
+            """Submit the subdirectories of a scanned directory and queue its files"""
+            files = []
+            for is_dir, path, rel_path, rules in scanned:
+                if not is_dir:
+                    files.append(Path(path))
+                elif not stop.is_set():
+                    with lock:
+                        pending[0] += 1
+                    executor.submit(scan, path, rel_path, rules)
+            if files:
+                found.put(files)
+
+        def finish():
+            """Mark a directory as scanned, ending the walk after the last one"""
+            with lock:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    found.put(None)
+
+        def scan(path, rel_path, rules):
+            try:
+                if not stop.is_set():
+                    dispatch(self._scan_subdir(path, rel_path, rules))
+            except BaseException as e:
+                found.put(e)
+            finally:
+                finish()
+
+        try:
+            dispatch(items)
+            finish()
+            while True:
+                item = found.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _scan_subdir(self, path: str, rel_path: str, rules: IgnoreRules) -> List[Tuple[bool, str, str, IgnoreRules]]:
+        """Scan a directory below the root; unreadable directories are skipped like glob does"""
+        try:
+            return self._scan(path, rel_path, rules)
+        except OSError:
+            return []
+
+    def _scan(self, path: str, rel_path: str, rules: IgnoreRules) -> List[Tuple[bool, str, str, IgnoreRules]]:
+        """List the accepted entries of one directory
+
+        Args:
+            path: Directory to scan
+            rel_path: The directory relative to the root ('' for the root)
+            rules: Ignore rules of the parent directories
+
+        Returns:
+            List[Tuple[bool, str, str, IgnoreRules]]: (is directory, path, relative
+            path, rules of the directory) of every accepted entry, sorted by name
+        """
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        rules = self._read_ignore_files(path, rel_path, rules, {entry.name for entry in entries})
+        items = []
+        for entry in entries:
+            entry_rel = f"{rel_path}/{entry.name}" if rel_path else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                # Symbolic links to files are listed, broken links and special files are not
+                if self._accepts(entry.name, entry_rel, is_dir, rules) and (is_dir or entry.is_file()):
+                    items.append((is_dir, entry.path, entry_rel, rules))
+            except OSError:
+                continue
+        return items
+
+    def _accepts(self, name: str, rel_path: str, is_dir: bool, rules: IgnoreRules) -> bool:
+        """Check one entry against the pruned names, ignore rules, excludes and includes"""
+        if is_dir:
+            if name in self.pruned_dirs:
+                return False
+        elif not self.include.matches(rel_path):
+            return False
+        return not rules.matches(rel_path, is_dir) and not self.exclude.matches(rel_path, is_dir)
+
+    def _read_ignore_files(
+        self,
+        path: str,
+        rel_path: str,
+        rules: IgnoreRules,
+        names: Optional[Set[str]] = None
+    ) -> IgnoreRules:
+        """Extend rules with the ignore files of a directory"""
+        for ignore_file in self.ignore_files:
+            if names is not None and ignore_file not in names:
+                continue
+            try:
+                with open(os.path.join(path, ignore_file), encoding='utf-8', errors='replace') as f:
+                    rules = rules.extend(f.readlines(), rel_path)
+            except OSError:
+                continue
+        return rules
@@ -0,0 +1,326 @@
+"""Watch a directory tree and re-process documents as they change"""
+
+import os
+import queue
+import threading
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from . import FileResult, MDCorpus
+from .exceptions import BatchError, MDCorpusError
+from .state import IncrementalState
+from .walker import CorpusWalker
+
+BACKENDS = ('auto', 'native', 'polling')
+
+# watchdog event types that can change file content; opened and closed-without-write are ignored
+CHANGE_EVENTS = {'created', 'modified', 'moved', 'deleted', 'closed'}
+
+
+def _is_hidden(root: Path, path: Path) -> bool:
+    """Check whether a path lies in a hidden file or directory below root
+
+    Hidden entries include VCS directories, the state file, caches and the
+    temporary files of atomic writes.
+    """
+    try:
+        parts = path.relative_to(root).parts
+    except ValueError:
+        return True
+    return any(part.startswith('.') for part in parts)
+
+
+class PollingSource:
+    """Change source that compares mtime and size snapshots of the tree
+
+    Only the documents the walker lists and the tracked assets are checked,
+    so ignored and excluded trees are never scanned.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        interval: float = 1.0,
+        walker: Optional[CorpusWalker] = None,
+        assets: Optional[Callable[[], Iterable[Path]]] = None
+    ):
+        """Take the initial snapshot
+
+        Args:
+            root: Directory to watch
+            interval: Seconds between two scans
+            walker: Walker listing the documents to watch (default: *.md files)
+            assets: Optional function returning the assets to watch, called on every scan
+        """
+        self.root = root
+        self.interval = interval
+        self.walker = walker or CorpusWalker()
+        self.assets = assets
+        self._snapshot = self._scan()
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """Return the files that changed, waiting up to timeout seconds for one"""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {Path(path) for path in current.keys() | self._snapshot.keys()
+                       if current.get(path) != self._snapshot.get(path)}
+            self._snapshot = current
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self) -> None:
+        """Nothing to release"""
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Return the mtime and size of every watched document and asset"""
+        snapshot = {}
+        for path in chain(self.walker.walk(self.root), self.assets() if self.assets is not None else ()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+
+class NativeSource:
+    """Change source using the platform's file system events (inotify, FSEvents,
+    ReadDirectoryChangesW) through the optional watchdog package"""
+
+    def __init__(self, root: Path):
+        """Start observing the tree
+
+        Args:
+            root: Directory to watch
+
+        Raises:
+            MDCorpusError: If watchdog is not installed
+        """
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            raise MDCorpusError("Native file watching requires watchdog: pip install 'md-corpus[watch]'")
+        self.root = root
+        self._queue: queue.Queue = queue.Queue()
+        events = self._queue
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in CHANGE_EVENTS:
+                    return
+                events.put(Path(os.fsdecode(event.src_path)))
+                if getattr(event, 'dest_path', None):
+                    events.put(Path(os.fsdecode(event.dest_path)))
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(root), recursive=True)
+        self._observer.start()
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """Return the files that changed, waiting up to timeout seconds for one"""
+        changed = set()
+        try:
+            changed.add(self._queue.get(timeout=timeout))
+            while True:
+                changed.add(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return {path for path in changed if not _is_hidden(self.root, path)}
+
+    def close(self) -> None:
+        """Stop the observer thread"""
+        self._observer.stop()
+        self._observer.join()
+
+
+class Watcher:
+    """Re-process the documents of a directory as they and their assets change
+
+    Bursts of changes (an editor saving several files, a git checkout) are
+    debounced: processing starts once no change arrived for `debounce`
+    seconds, or `max_delay` seconds after the first change. Changed documents
+    are formatted and converted with the shared MDCorpus, so the provider
+    client, upload cache and formatter stay warm between batches. A changed
+    asset is uploaded again and the documents that reference it are updated
+    if its URL changed; they are looked up in the corpus's link graph if it
+    has one, otherwise in the state.
+    """
+
+    def __init__(
+        self,
+        corpus: MDCorpus,
+        root: Union[str, Path],
+        state: IncrementalState,
+        convert: bool = True,
+        workers: int = 1,
+        debounce: float = 0.5,
+        max_delay: float = 5.0,
+        backend: str = 'auto',
+        poll_interval: float = 1.0,
+        walker: Optional[CorpusWalker] = None
+    ):
+        """Initialize the watcher
+
+        Args:
+            corpus: MDCorpus used for processing
+            root: Directory to watch
+            state: Incremental state of the directory, updated after every batch
+            convert: Whether to convert links (otherwise only format)
+            workers: Number of worker processes used for formatting
+            debounce: Seconds without changes before a batch is processed
+            max_delay: Maximum seconds between the first change of a batch and processing it
+            backend: 'native' (watchdog), 'polling', or 'auto' to use watchdog when installed
+            poll_interval: Seconds between two scans of the polling backend
+            walker: Walker whose include, exclude and ignore rules select the
+                documents to process (default: *.md files)
+        """
+        if backend not in BACKENDS:
+            raise MDCorpusError(f"Unknown watch backend: {backend}")
+        self.corpus = corpus
+        self.root = Path(root)
+        self.state = state
+        self.convert = convert
+        self.workers = workers
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.walker = walker or CorpusWalker()
+        self.mode = 'convert' if convert else 'format'
+
+    def run(
+        self,
+        stop: Optional[threading.Event] = None,
+        on_batch: Optional[Callable[[List[FileResult], Dict[str, str]], None]] = None,
+        on_ready: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Watch until stop is set (or forever)
+
+        Args:
+            stop: Event ending the loop
+            on_batch: Called with the results and errors of every processed batch
+            on_ready: Called once the watch has started, before the first change is awaited
+        """
+        stop = stop or threading.Event()
+        source = self._open_source()
+        try:
+            if on_ready is not None:
+                on_ready()
+            while not stop.is_set():
+                changed = source.wait(self.poll_interval)
+                if not changed:
+                    continue
+                deadline = time.monotonic() + self.max_delay
+                while not stop.is_set():
+                    more = source.wait(max(0.0, min(self.debounce, deadline - time.monotonic())))
+                    changed |= more
+                    if not more or time.monotonic() >= deadline:
+                        break
+                results, errors = self.process(changed)
+                if on_batch is not None and (results or errors):
+                    on_batch(results, errors)
+        finally:
+            source.close()
+
+    def process(self, changed: Iterable[Union[str, Path]]) -> Tuple[List[FileResult], Dict[str, str]]:
+        """Process a batch of changed files
+
+        Args:
+            changed: Files that were created, modified or deleted
+
+        Returns:
+            Tuple[List[FileResult], Dict[str, str]]: Results of the processed
+            documents and error messages of the failed documents and assets
+        """
+        docs: Set[Path] = set()
+        assets: Set[Path] = set()
+        for path in map(Path, changed):
+            if _is_hidden(self.root, path):
+                continue
+            if self.walker.includes(self.root, path):
+                if path.is_file():
+                    docs.add(path)
+                else:
+                    self.state.forget(self.mode, path)
+                    if self.corpus.link_graph is not None:
+                        self.corpus.link_graph.remove_document(path)
+            elif self.convert and path.is_file() and self._dependents(path):
+                assets.add(path)
+
+        results: List[FileResult] = []
+        errors: Dict[str, str] = {}
+        try:
+            if assets:
+                results.extend(self._refresh_assets(assets, errors))
+            dirty = [doc for doc in sorted(docs) if self.state.is_dirty(self.mode, doc)]
+            results.extend(self.corpus.process_files(dirty, self.convert, self.workers, self.state))
+        except BatchError as e:
+            errors.update(e.errors)
+        finally:
+            self.state.save()
+        return results, errors
+
+    def _refresh_assets(self, assets: Set[Path], errors: Dict[str, str]) -> List[FileResult]:
+        """Upload changed assets again and update the documents referencing them
+
+        Args:
+            assets: Changed assets referenced by recorded documents
+            errors: Receives the error message of every failed upload or document
+
+        Returns:
+            List[FileResult]: Results of the documents that reference the assets
+        """
+        if self.corpus.link_graph is not None:
+            return self._refresh_linked_assets(assets, errors)
+        try:
+            return self.corpus.refresh_recorded_assets(assets, self.state)
+        except BatchError as e:
+            errors.update(e.errors)
+            return []
+
+    def _refresh_linked_assets(self, assets: Set[Path], errors: Dict[str, str]) -> List[FileResult]:
+        """Refresh changed assets through the link graph of the corpus (see _refresh_assets)"""
+        results = {}
+        for asset in sorted(assets):
+            try:
+                updated = self.corpus.refresh_asset(asset)
+            except BatchError as e:
+                errors.update(e.errors)
+                continue
+            except MDCorpusError as e:
+                errors[str(asset)] = str(e)
+                continue
+            for result in updated:
+                results[result.path] = result
+        for result in results.values():
+            # Rewritten documents are up to date; keep them from looking dirty
+            self.state.record(self.mode, result.path, result.assets)
+        return list(results.values())
+
+    def _dependents(self, asset: Path) -> List[Path]:
+        """Return the documents referencing an asset"""
+        if self.corpus.link_graph is not None:
+            return list(self.corpus.link_graph.dependents(asset))
+        return self.state.dependents(self.mode, asset)
+
+    def _open_source(self):
+        """Create the change source for the configured backend"""
+        if self.backend == 'polling':
+            return self._polling_source()
+        if self.backend == 'native':
+            return NativeSource(self.root)
+        try:
+            return NativeSource(self.root)
+        except MDCorpusError:
+            return self._polling_source()
+
+    def _polling_source(self) -> PollingSource:
+        """Create a polling source watching the documents of the walker and the recorded assets"""
+        assets = (lambda: self.state.asset_paths(self.mode)) if self.convert else None
+        return PollingSource(self.root, self.poll_interval, self.walker, assets)
@@ -105,4 +105,146 @@ def test_format_file_not_found(runner):
     """Test formatting a non-existent file"""
     result = runner.invoke(cli, ['format', 'nonexistent.md'])
     assert result.exit_code == 2  # Click returns 2 for file not found
-    assert "Error: Invalid value for 'PATH'" in result.output 
\ No newline at end of file
+    assert "Error: Invalid value for 'PATH'" in result.output 
+
+def test_export_manifest(runner, tmp_path):
+    """Test exporting an asset manifest as JSON"""
+    from md_corpus.manifest import AssetManifest
+
+    db = tmp_path / "manifest.db"
+    with AssetManifest(db) as manifest:
+        manifest.put("abc", "a.png", "https://example.com/a.png", 3)
+    output = tmp_path / "manifest.json"
+
+    result = runner.invoke(cli, ['export-manifest', str(db), str(output)])
+    assert result.exit_code == 0
+    assert "Exported 1 assets" in result.output
+    assert "https://example.com/a.png" in output.read_text()
+
+def test_format_directory_with_jobs(runner, tmp_path):
+    """Test formatting a directory with several worker processes"""
+    (tmp_path / "test1.md").write_text("# File 1\n* Item 1")
+    (tmp_path / "test2.md").write_text("# File 2\n* Item 1")
+    
+    result = runner.invoke(cli, ['format', str(tmp_path), '--jobs', '2'])
+    assert result.exit_code == 0
+    assert "Formatted 2 files" in result.output
+
+def test_format_directory_incremental(runner, tmp_path):
+    """Test that an incremental run skips files formatted by the previous run"""
+    (tmp_path / "test1.md").write_text("# File 1\n* Item 1")
+    
+    result = runner.invoke(cli, ['format', str(tmp_path), '--incremental'])
+    assert "Formatted 1 files" in result.output
+    assert (tmp_path / ".md-corpus-state.json").exists()
+    
+    result = runner.invoke(cli, ['format', str(tmp_path), '--incremental'])
+    assert result.exit_code == 0
+    assert "Formatted 0 files" in result.output
+
+def test_cli_import_is_lazy():
+    """Test that importing the CLI does not load provider SDKs, mdformat or sqlite3"""
+    import subprocess
+    import sys
+    
+    code = (
+        "import sys, md_corpus.cli; "
+        "print(','.join(m for m in ('boto3', 'botocore', 'oss2', 'mdformat', 'sqlite3') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+def test_format_stdin(runner):
+    """Test formatting Markdown from stdin to stdout"""
+    result = runner.invoke(cli, ['format', '-'], input="# Title\n* Item 1\n")
+    assert result.exit_code == 0
+    assert result.output == "# Title\n\n- Item 1\n"
+
+def test_convert_with_local_provider(runner, tmp_path):
+    """Test converting with the local filesystem provider"""
+    test_file = tmp_path / "test.md"
+    test_file.write_text("![test](./image/test.jpg)")
+    (tmp_path / "image").mkdir()
+    (tmp_path / "image" / "test.jpg").write_bytes(b"test image")
+    public = tmp_path / "public"
+    
+    result = runner.invoke(cli, [
+        'convert', str(test_file),
+        '--provider', 'local',
+        '--root', str(public),
+        '--base-url', 'https://cdn.example.com'
+    ])
+    assert result.exit_code == 0
+    assert (public / "test.jpg").read_bytes() == b"test image"
+    assert "https://cdn.example.com/test.jpg" in test_file.read_text()
+
+def test_convert_reports_upload_failures(runner, tmp_path, monkeypatch):
+    """Test that failed and throttled uploads are reported at the end of the run"""
+    from md_corpus.exceptions import ThrottlingError
+    from md_corpus.providers.local import LocalProvider
+    
+    def throttled(self, file_path):
+        raise ThrottlingError("slow down")
+    
+    monkeypatch.setattr(LocalProvider, "upload_file", throttled)
+    test_file = tmp_path / "test.md"
+    test_file.write_text("![test](./test.jpg)\n")
+    (tmp_path / "test.jpg").write_bytes(b"test image")
+    
+    result = runner.invoke(cli, [
+        'convert', str(test_file),
+        '--provider', 'local',
+        '--root', str(tmp_path / "public"),
+        '--base-url', 'https://cdn.example.com',
+        '--max-retries', '1'
+    ])
+    assert result.exit_code == 0
+    assert f"Upload failed: {tmp_path / 'test.jpg'}: slow down" in result.output
+    assert "Uploads: 1 failed, 2 throttled, 1 retried" in result.output
+    assert test_file.read_text() == "![test](./test.jpg)\n"
+
+def test_format_metrics_and_profile(runner, tmp_path):
+    """Test writing metrics and profile statistics of a run"""
+    import json
+    import pstats
+    
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.md").write_text("* Item\n")
+    metrics_file = tmp_path / "metrics.json"
+    profile_file = tmp_path / "run.prof"
+    
+    result = runner.invoke(cli, ['format', str(tmp_path / "docs"), '--metrics-out', str(metrics_file),
+                                 '--profile', str(profile_file)])
+    assert result.exit_code == 0
+    metrics = json.loads(metrics_file.read_text())
+    assert metrics['stages']['format']['count'] == 1
+    assert metrics['counters']['files_changed'] == 1
+    assert pstats.Stats(str(profile_file)).total_calls > 0
+
+def test_refresh_with_link_graph(runner, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("![logo](logo.png)\n")
+    (docs / "b.md").write_text("# B\n")
+    (docs / "logo.png").write_bytes(b"logo v1")
+    graph = tmp_path / "links.db"
+    options = ['--provider', 'local', '--root', str(tmp_path / "public"), '--base-url', 'https://cdn.example.com',
+               '--link-graph', str(graph)]
+    assert runner.invoke(cli, ['convert', str(docs)] + options).exit_code == 0
+    
+    result = runner.invoke(cli, ['dependents', str(graph), str(docs / "logo.png")])
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [str(docs / "a.md")]
+    
+    (docs / "logo.png").write_bytes(b"logo v2")
+    result = runner.invoke(cli, ['refresh', str(docs / "logo.png")] + options)
+    assert result.exit_code == 0
+    assert "1 documents (0 changed)" in result.output
+    assert (tmp_path / "public" / "logo.png").read_bytes() == b"logo v2"
+
+def test_refresh_requires_link_graph(runner, tmp_path):
+    (tmp_path / "logo.png").write_bytes(b"logo")
+    result = runner.invoke(cli, ['refresh', str(tmp_path / "logo.png"), '--provider', 'local',
+                                 '--root', str(tmp_path / "public")])
+    assert result.exit_code == 1
+    assert "requires --link-graph" in result.output
@@ -0,0 +1,56 @@
+import gzip
+import os
+
+import pytest
+
+from md_corpus.compression import check_encoding, compressed_upload, is_compressible
+from md_corpus.exceptions import MDCorpusError
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg">' + b'<rect x="1" y="2" width="3" height="4"/>' * 500 + b'</svg>'
+
+def test_is_compressible():
+    assert is_compressible('image/svg+xml')
+    assert is_compressible('text/csv')
+    assert is_compressible('application/json; charset=utf-8')
+    assert not is_compressible('image/png')
+    assert not is_compressible(None)
+
+def test_gzip_is_deterministic_and_cleaned_up(tmp_path):
+    source = tmp_path / "diagram.svg"
+    source.write_bytes(SVG)
+    
+    with compressed_upload(source, 'image/svg+xml', 'gzip') as (first, encoding):
+        assert encoding == 'gzip'
+        assert gzip.decompress(first.read_bytes()) == SVG
+        assert first.stat().st_size < len(SVG) / 10
+        with compressed_upload(source, 'image/svg+xml', 'gzip') as (second, _):
+            assert second.read_bytes() == first.read_bytes()
+    assert not first.exists()
+
+def test_brotli(tmp_path):
+    brotli = pytest.importorskip("brotli")
+    source = tmp_path / "data.json"
+    source.write_bytes(b'{"values": [' + b'1, 2, 3, ' * 1000 + b'4]}')
+    
+    with compressed_upload(source, 'application/json', 'br') as (upload_path, encoding):
+        assert encoding == 'br'
+        assert brotli.decompress(upload_path.read_bytes()) == source.read_bytes()
+
+@pytest.mark.parametrize("content, content_type", [
+    (SVG, 'image/png'),             # Not a compressible type
+    (b'<svg/>', 'image/svg+xml'),   # Too small to be worth it
+    (os.urandom(4096), 'text/csv'), # Does not compress
+])
+def test_uploaded_as_is(tmp_path, content, content_type):
+    source = tmp_path / "asset"
+    source.write_bytes(content)
+    
+    with compressed_upload(source, content_type, 'gzip') as (upload_path, encoding):
+        assert upload_path == source
+        assert encoding is None
+
+def test_check_encoding():
+    assert check_encoding(None) is None
+    assert check_encoding('gzip') == 'gzip'
+    with pytest.raises(MDCorpusError):
+        check_encoding('deflate')
@@ -1,7 +1,7 @@
 import pytest
 from pathlib import Path
 from md_corpus import MDCorpus
-from md_corpus.exceptions import MDCorpusError
+from md_corpus.exceptions import BatchError, MDCorpusError
 from urllib.parse import quote
 
 class MockStorageProvider:
@@ -302,4 +302,225 @@ def test_convert_nested_directory(corpus, test_data_dir):
     # Verify formatting and image conversion
     assert "- Item 1" in converted_content  # Check formatting
     assert "https://example.com/bucket/test.jpg" in converted_content  # Check image URL
-    assert str(test_image) in corpus.storage.uploaded_files  # Check image upload 
\ No newline at end of file
+    assert str(test_image) in corpus.storage.uploaded_files  # Check image upload 
+
+def test_format_directory_parallel(corpus, tmp_path):
+    """Test that formatting with a process pool matches the sequential result"""
+    for i in range(6):
+        (tmp_path / f"doc{i}.md").write_text(f"# Doc {i}\n* Item 1\n* Item 2")
+    
+    processed = corpus.format_directory(tmp_path, workers=3)
+    
+    assert processed == sorted(str(p) for p in tmp_path.glob("*.md"))
+    for i in range(6):
+        assert "- Item 1" in (tmp_path / f"doc{i}.md").read_text()
+
+def test_convert_directory_parallel(corpus, tmp_path):
+    """Test converting a directory with formatting spread over worker processes"""
+    (tmp_path / "image").mkdir()
+    (tmp_path / "image/1.jpg").write_bytes(b"test1")
+    for i in range(4):
+        (tmp_path / f"doc{i}.md").write_text(f"* Item {i}\n![test](./image/1.jpg)")
+    
+    processed = corpus.convert_directory(tmp_path, workers=2)
+    
+    assert len(processed) == 4
+    for i in range(4):
+        content = (tmp_path / f"doc{i}.md").read_text()
+        assert f"- Item {i}" in content
+        assert "https://example.com/bucket/1.jpg" in content
+
+def test_directory_errors_are_collected(corpus, tmp_path):
+    """Test that one failing file does not stop the rest of the directory"""
+    (tmp_path / "bad.md").write_bytes(b"\xff\xfe invalid utf-8")
+    (tmp_path / "good.md").write_text("* Item")
+    
+    with pytest.raises(BatchError) as exc:
+        corpus.format_directory(tmp_path, workers=2)
+    
+    assert list(exc.value.errors) == [str(tmp_path / "bad.md")]
+    assert exc.value.processed == [str(tmp_path / "good.md")]
+    assert "- Item" in (tmp_path / "good.md").read_text()
+
+def test_process_content_uploads_concurrently(tmp_path):
+    """Test that the unique assets of a document are uploaded in parallel"""
+    import threading
+    
+    class SlowProvider(MockStorageProvider):
+        def __init__(self):
+            super().__init__()
+            self.active = 0
+            self.max_active = 0
+            self.lock = threading.Lock()
+            self.barrier = threading.Barrier(3, timeout=5)
+        
+        def upload_file(self, file_path):
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            self.barrier.wait()  # Only passes if three uploads run at once
+            with self.lock:
+                self.active -= 1
+            return super().upload_file(file_path)
+    
+    for i in range(3):
+        (tmp_path / f"{i}.png").write_bytes(f"image {i}".encode())
+    content = "\n".join(f"![img](./{i}.png) ![again](./{i}.png)" for i in range(3))
+    
+    provider = SlowProvider()
+    converted = MDCorpus(provider, upload_workers=4)._process_content(content, tmp_path)
+    
+    assert provider.max_active == 3
+    assert len(provider.uploaded_files) == 3
+    for i in range(3):
+        assert converted.count(f"https://example.com/bucket/{i}.png") == 2
+
+def test_process_file_reports_changes(corpus, tmp_path):
+    """Test that files are rewritten only when their content changes"""
+    test_file = tmp_path / "test.md"
+    test_file.write_text("* Item 1")
+    
+    result = corpus.process_file(test_file, convert=False)
+    assert result.changed
+    assert test_file.read_text() == "- Item 1\n"
+    
+    mtime = test_file.stat().st_mtime_ns
+    result = corpus.process_file(test_file)
+    assert not result.changed
+    assert test_file.stat().st_mtime_ns == mtime
+    assert list(tmp_path.iterdir()) == [test_file]  # No temporary files left behind
+
+def test_convert_file_single_write(corpus, tmp_path, monkeypatch):
+    """Test that converting a file reads it once and writes it once"""
+    import md_corpus
+    
+    (tmp_path / "image.jpg").write_bytes(b"image")
+    test_file = tmp_path / "test.md"
+    test_file.write_text("* Item\n\n![img](./image.jpg)")
+    
+    writes = []
+    original_write = md_corpus.atomic_write_text
+    monkeypatch.setattr(md_corpus, "atomic_write_text",
+                        lambda path, content: writes.append(path) or original_write(path, content))
+    
+    result = corpus.process_file(test_file)
+    
+    assert result.changed
+    assert writes == [test_file]
+    assert result.assets == {tmp_path / "image.jpg": "https://example.com/bucket/image.jpg"}
+    assert test_file.read_text() == result.content
+
+def test_convert_targets_starting_with_url_letters(corpus, tmp_path):
+    """Test that assets whose path starts with h, t or p are converted"""
+    for name in ("pic.png", "thumb.png", "hero.png"):
+        (tmp_path / name).write_bytes(name.encode())
+    content = "![a](pic.png) ![b](<thumb.png>) ![c](hero.png \"Hero\")"
+    
+    converted = corpus._process_content(content, tmp_path)
+    
+    assert converted == ('![a](https://example.com/bucket/pic.png) ![b](<https://example.com/bucket/thumb.png>) '
+                         '![c](https://example.com/bucket/hero.png "Hero")')
+
+def test_convert_directory_batches_uploads(tmp_path):
+    """Test that the assets of a directory are uploaded with one upload_many call per batch"""
+    class BatchProvider(MockStorageProvider):
+        def __init__(self):
+            super().__init__()
+            self.batches = []
+        
+        def upload_many(self, file_paths, **kwargs):
+            self.batches.append(sorted(Path(p).name for p in file_paths))
+            return {p: self.upload_file(p) for p in file_paths}
+    
+    for i in range(5):
+        (tmp_path / f"{i}.png").write_bytes(f"image {i}".encode())
+        (tmp_path / f"doc{i}.md").write_text(f"![img](./{i}.png) ![shared](./0.png)\n")
+    
+    provider = BatchProvider()
+    MDCorpus(provider, batch_size=3).convert_directory(tmp_path)
+    
+    assert provider.batches == [["0.png", "1.png", "2.png"], ["3.png", "4.png"]]
+    assert "https://example.com/bucket/4.png" in (tmp_path / "doc4.md").read_text()
+
+def test_throttled_uploads_are_retried(tmp_path):
+    """Test that throttled uploads are retried and permanent failures are recorded"""
+    from md_corpus.exceptions import ThrottlingError
+    from md_corpus.ratelimit import AdaptiveLimiter
+    
+    class ThrottlingProvider(MockStorageProvider):
+        def __init__(self):
+            super().__init__()
+            self.attempts = 0
+        
+        def upload_file(self, file_path):
+            if Path(file_path).name == "broken.png":
+                raise MDCorpusError("access denied")
+            self.attempts += 1
+            if self.attempts <= 2:
+                raise ThrottlingError("slow down")
+            return super().upload_file(file_path)
+    
+    (tmp_path / "image.png").write_bytes(b"image")
+    (tmp_path / "broken.png").write_bytes(b"broken")
+    corpus = MDCorpus(ThrottlingProvider(), limiter=AdaptiveLimiter(base_delay=0))
+    
+    converted = corpus._process_content("![a](./image.png) ![b](./broken.png)", tmp_path)
+    
+    assert converted == "![a](https://example.com/bucket/image.png) ![b](./broken.png)"
+    assert corpus.limiter.stats() == {'throttled': 2, 'retries': 2}
+    assert corpus.upload_errors == {str(tmp_path / "broken.png"): "access denied"}
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_directory_records_metrics(corpus, tmp_path, workers):
+    """Test that every stage of a conversion is timed, also with worker processes"""
+    (tmp_path / "image.png").write_bytes(b"image")
+    (tmp_path / "a.md").write_text("* ![img](./image.png)\n")
+    (tmp_path / "b.md").write_text("- Already formatted\n")
+    
+    corpus.convert_directory(tmp_path, workers=workers)
+    
+    snapshot = corpus.metrics.snapshot()
+    stages = snapshot['stages']
+    assert stages['read']['count'] == 2
+    assert stages['read']['bytes'] == len(b"* ![img](./image.png)\n") + len(b"- Already formatted\n")
+    assert stages['format']['count'] == 2
+    assert stages['prefilter']['count'] == 2
+    assert stages['scan']['count'] == 1  # b.md has no links and takes the fast path
+    assert stages['upload']['count'] == 1
+    assert stages['upload']['bytes'] == 5
+    assert stages['write']['count'] == 1
+    assert snapshot['counters'] == {'assets_uploaded': 1, 'files_changed': 1, 'files_fast_path': 1,
+                                    'files_processed': 2}
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_skip_unlinked_leaves_documents_unformatted(mock_provider, tmp_path, workers):
+    """Test that documents without local links are neither formatted nor rewritten"""
+    (tmp_path / "image.png").write_bytes(b"image")
+    (tmp_path / "a.md").write_text("* ![img](./image.png)\n")
+    (tmp_path / "b.md").write_text("* [Site](https://example.com)\n")
+    corpus = MDCorpus(mock_provider, skip_unlinked=True)
+    
+    results = corpus.process_directory(tmp_path, workers=workers)
+    
+    assert [result.changed for result in results] == [True, False]
+    assert (tmp_path / "a.md").read_text() == "- ![img](https://example.com/bucket/image.png)\n"
+    assert (tmp_path / "b.md").read_text() == "* [Site](https://example.com)\n"
+    assert corpus.metrics.snapshot()['stages']['format']['count'] == 1
+    assert corpus.metrics.snapshot()['counters']['files_fast_path'] == 1
+
+def test_convert_with_image_optimizer(mock_provider, tmp_path):
+    """Test that optimized images are uploaded instead of the originals"""
+    Image = pytest.importorskip("PIL.Image")
+    from md_corpus.images import ImageOptimizer
+    
+    Image.new('RGB', (64, 64), (10, 20, 30)).save(tmp_path / "shot.png", compress_level=0)
+    test_file = tmp_path / "test.md"
+    test_file.write_text("![shot](./shot.png)\n")
+    corpus = MDCorpus(mock_provider, optimizer=ImageOptimizer(tmp_path / ".cache", target_format="webp"))
+    
+    corpus.convert_file(test_file)
+    
+    uploaded, = mock_provider.uploaded_files
+    assert uploaded.startswith(str(tmp_path / ".cache")) and uploaded.endswith("shot.webp")
+    assert test_file.read_text() == "![shot](https://example.com/bucket/shot.webp)\n"
+    assert corpus.metrics.snapshot()['counters']['optimize_bytes_saved'] > 0
@@ -0,0 +1,45 @@
+import pickle
+import mdformat
+import pytest
+from md_corpus import MDCorpus
+from md_corpus.exceptions import MDCorpusError
+from md_corpus.formatter import Formatter
+
+SAMPLES = [
+    "# Title\n* Item 1\n* Item 2\n  * Subitem\n",
+    "Some *emphasis* and __strong__ text\nwith a [link](./a.md) and ![img](./b.png)\n",
+    "```python\ndef hello():\n    print('Hello')\n```\n",
+    "1) one\n2) two\n\n> quote\n> continued\n",
+    "",
+]
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_formatter_matches_mdformat(sample):
+    assert Formatter().format(sample) == mdformat.text(sample)
+
+def test_formatter_options():
+    text = "word " * 30
+    assert Formatter({"wrap": 40}).format(text) == mdformat.text(text, options={"wrap": 40})
+
+def test_formatter_reuses_parser():
+    formatter = Formatter()
+    formatter.format("# One")
+    mdit = formatter._mdit
+    formatter.format("# Two")
+    assert formatter._mdit is mdit
+
+def test_format_texts():
+    corpus = MDCorpus(None)
+    results = list(corpus.format_texts(iter(["* a", "* b"])))
+    assert results == ["- a\n", "- b\n"]
+
+def test_formatter_pickle_keeps_settings():
+    formatter = Formatter({"wrap": 40})
+    formatter.format("# Built")
+    restored = pickle.loads(pickle.dumps(formatter))
+    assert restored.options == {"wrap": 40}
+    assert restored._mdit is None
+
+def test_formatter_unknown_extension():
+    with pytest.raises(MDCorpusError):
+        Formatter(extensions=["no-such-plugin"]).format("# Title")
@@ -0,0 +1,113 @@
+import pytest
+
+from md_corpus import MDCorpus
+from md_corpus.exceptions import MDCorpusError
+from md_corpus.images import ImageOptimizer
+from md_corpus.manifest import AssetManifest
+from md_corpus.utils import file_sha256
+from tests.test_core import MockStorageProvider
+
+Image = pytest.importorskip("PIL.Image")
+
+def make_png(path, size=(200, 150)):
+    """Write an uncompressed PNG that compresses well"""
+    image = Image.new('RGB', size)
+    for x in range(0, size[0], 10):
+        for y in range(size[1]):
+            image.putpixel((x, y), (x % 256, y % 256, 128))
+    image.save(path, compress_level=0)
+    return path
+
+def test_png_is_recompressed_losslessly(tmp_path):
+    source = make_png(tmp_path / "shot.png")
+    optimizer = ImageOptimizer(tmp_path / "cache")
+    
+    optimized = optimizer.optimize(source, file_sha256(source))
+    
+    assert optimized.name == "shot.png"
+    assert optimized.stat().st_size < source.stat().st_size
+    with Image.open(source) as original, Image.open(optimized) as result:
+        assert original.tobytes() == result.tobytes()
+
+def test_results_are_cached(tmp_path, monkeypatch):
+    import md_corpus.images
+    
+    calls = []
+    optimize_image = md_corpus.images._optimize_image
+    monkeypatch.setattr(md_corpus.images, "_optimize_image", lambda *args: calls.append(1) or optimize_image(*args))
+    source = make_png(tmp_path / "shot.png")
+    
+    first = ImageOptimizer(tmp_path / "cache").optimize(source, file_sha256(source))
+    assert ImageOptimizer(tmp_path / "cache").optimize(source, file_sha256(source)) == first
+    assert len(calls) == 1
+    # Different settings use a different cache entry
+    ImageOptimizer(tmp_path / "cache", quality=50).optimize(source, file_sha256(source))
+    assert len(calls) == 2
+
+def test_convert_to_webp(tmp_path):
+    source = make_png(tmp_path / "shot.png")
+    
+    optimized = ImageOptimizer(tmp_path / "cache", target_format="webp").optimize(source, file_sha256(source))
+    
+    assert optimized.name == "shot.webp"
+    with Image.open(optimized) as result:
+        assert result.format == "WEBP"
+
+def test_metadata_is_stripped_after_applying_orientation(tmp_path):
+    source = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    exif[0x010f] = "Camera maker"
+    Image.new('RGB', (40, 20), (200, 10, 10)).save(source, quality=100, exif=exif)
+    
+    optimized = ImageOptimizer(tmp_path / "cache", quality=60).optimize(source, file_sha256(source))
+    
+    with Image.open(optimized) as result:
+        assert result.size == (20, 40)
+        assert not result.getexif()
+
+def test_unoptimizable_files_are_uploaded_as_is(tmp_path):
+    optimizer = ImageOptimizer(tmp_path / "cache")
+    document = tmp_path / "doc.pdf"
+    document.write_bytes(b"%PDF-1.4")
+    corrupt = tmp_path / "broken.png"
+    corrupt.write_bytes(b"not a png")
+    small = tmp_path / "dot.png"
+    Image.new('1', (1, 1)).save(small, optimize=True)
+    
+    assert optimizer.optimize(document, file_sha256(document)) == document
+    assert optimizer.optimize(corrupt, file_sha256(corrupt)) == corrupt
+    assert optimizer.optimize(small, file_sha256(small)) == small
+    # The decision to keep the original is cached too
+    assert optimizer._cached(small, file_sha256(small)) == small
+
+def test_optimize_many_in_process_pool(tmp_path):
+    sources = {make_png(tmp_path / f"{i}.png", size=(100 + i, 80)): None for i in range(3)}
+    sources = {source: file_sha256(source) for source in sources}
+    
+    results = ImageOptimizer(tmp_path / "cache", workers=2).optimize_many(sources)
+    
+    assert set(results) == set(sources)
+    for source, optimized in results.items():
+        assert optimized.parent.parent.parent == tmp_path / "cache"
+        assert optimized.stat().st_size < source.stat().st_size
+
+def test_manifest_scoped_by_optimizer_settings(tmp_path):
+    make_png(tmp_path / "a.png")
+    doc = tmp_path / "doc.md"
+    optimizers = (None, ImageOptimizer(tmp_path / "cache"), ImageOptimizer(tmp_path / "cache", quality=50))
+    uploads = []
+    with AssetManifest(tmp_path / "manifest.db") as manifest:
+        for optimizer in optimizers + optimizers:
+            doc.write_text("![a](./a.png)\n")
+            provider = MockStorageProvider()
+            MDCorpus(provider, manifest=manifest, optimizer=optimizer).convert_file(doc)
+            uploads.append(len(provider.uploaded_files))
+        assert len(manifest) == 3
+    assert uploads == [1, 1, 1, 0, 0, 0]
+
+def test_invalid_settings(tmp_path):
+    with pytest.raises(MDCorpusError):
+        ImageOptimizer(tmp_path, target_format="gif")
+    with pytest.raises(MDCorpusError):
+        ImageOptimizer(tmp_path, quality=0)
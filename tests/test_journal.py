@@ -0,0 +1,126 @@
+import pytest
+from click.testing import CliRunner
+
+from md_corpus import MDCorpus
+from md_corpus.cli import cli
+from md_corpus.journal import DEFAULT_JOURNAL_FILE, ConversionJournal
+from tests.test_core import MockStorageProvider
+
+class CrashingProvider(MockStorageProvider):
+    """Provider interrupted, like a killed process, after a number of uploads"""
+    def __init__(self, crash_after=None):
+        super().__init__()
+        self.crash_after = crash_after
+
+    def upload_file(self, file_path):
+        if self.crash_after is not None and len(self.uploaded_files) >= self.crash_after:
+            raise KeyboardInterrupt
+        return super().upload_file(file_path)
+
+@pytest.fixture
+def docs(tmp_path):
+    root = tmp_path / "docs"
+    root.mkdir()
+    for i in range(4):
+        (root / f"{i}.png").write_bytes(f"image {i}".encode())
+        (root / f"doc{i}.md").write_text(f"![img](./{i}.png)\n")
+    return root
+
+def test_replay_drops_torn_record(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    (tmp_path / "a.md").write_text("# A\n")
+    with ConversionJournal(path) as journal:
+        journal.record_upload("abc", "a.png", "https://example.com/a.png", "s3://bucket")
+        journal.record_document("convert", tmp_path / "a.md", "# A\n")
+    with open(path, 'ab') as f:
+        f.write(b'{"op":"upload","digest":"def","na')
+
+    with ConversionJournal(path, resume=True) as journal:
+        assert journal.uploads == {("abc", "a.png", "s3://bucket"): "https://example.com/a.png"}
+        assert journal.is_done("convert", tmp_path / "a.md")
+        assert not journal.is_done("format", tmp_path / "a.md")
+        journal.record_upload("def", "b.png", "https://example.com/b.png")
+    with ConversionJournal(path, resume=True) as journal:
+        assert len(journal.uploads) == 2
+
+    (tmp_path / "a.md").write_text("# Changed\n")
+    with ConversionJournal(path, resume=True) as journal:
+        assert not journal.is_done("convert", tmp_path / "a.md")
+    with ConversionJournal(path) as journal:
+        assert journal.uploads == {}
+    assert path.read_bytes() == b""
+
+def test_name_keyed_upload_replaces_overwritten_digest(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with ConversionJournal(path) as journal:
+        journal.record_upload("abc", "a.png", "https://example.com/a.png", replace_name=True)
+        journal.record_upload("def", "a.png", "https://example.com/a.png", replace_name=True)
+        journal.record_upload("abc", "b.png", "https://example.com/b.png")
+        assert set(journal.uploads) == {("def", "a.png", ""), ("abc", "b.png", "")}
+    with ConversionJournal(path, resume=True) as journal:
+        assert set(journal.uploads) == {("def", "a.png", ""), ("abc", "b.png", "")}
+
+def test_resume_skips_finished_work(docs):
+    journal_path = docs / DEFAULT_JOURNAL_FILE
+    provider = CrashingProvider(crash_after=2)
+    corpus = MDCorpus(provider, batch_size=1, journal=ConversionJournal(journal_path, root=docs))
+    with pytest.raises(KeyboardInterrupt):
+        corpus.process_directory(docs)
+    corpus.journal.close()
+    finished = [doc for doc in sorted(docs.glob("*.md")) if "https://" in doc.read_text()]
+    assert len(finished) == 2
+
+    provider = CrashingProvider()
+    corpus = MDCorpus(provider, batch_size=1, journal=ConversionJournal(journal_path, root=docs, resume=True))
+    results = corpus.process_directory(docs)
+
+    assert [result.path for result in results] == [str(doc) for doc in sorted(docs.glob("*.md"))[2:]]
+    assert sorted(provider.uploaded_files) == [str(docs / "2.png"), str(docs / "3.png")]
+    assert corpus.metrics.snapshot()['counters']['files_resumed'] == 2
+    assert all("https://" in doc.read_text() for doc in docs.glob("*.md"))
+
+def test_resume_after_crash_within_batch(docs):
+    journal_path = docs / DEFAULT_JOURNAL_FILE
+    first = CrashingProvider(crash_after=2)
+    corpus = MDCorpus(first, upload_workers=1, journal=ConversionJournal(journal_path, root=docs))
+    with pytest.raises(KeyboardInterrupt):
+        corpus.process_directory(docs)
+    corpus.journal.close()
+    assert len(first.uploaded_files) == 2
+
+    second = CrashingProvider()
+    corpus = MDCorpus(second, upload_workers=1, journal=ConversionJournal(journal_path, root=docs, resume=True))
+    corpus.process_directory(docs)
+
+    assert set(first.uploaded_files).isdisjoint(second.uploaded_files)
+    assert len(second.uploaded_files) == 2
+    assert all("https://" in doc.read_text() for doc in docs.glob("*.md"))
+
+def test_convert_command_journal(docs, tmp_path):
+    runner = CliRunner()
+    base = ['convert', str(docs), '--provider', 'local', '--root', str(tmp_path / "storage"),
+            '--base-url', 'https://cdn.example.com']
+
+    result = runner.invoke(cli, base + ['--resume'])
+    assert result.exit_code == 0
+    assert "starting from the beginning" in result.output
+    assert not (docs / DEFAULT_JOURNAL_FILE).exists()
+
+    result = runner.invoke(cli, base + ['--resume', '--no-journal'])
+    assert result.exit_code == 1
+
+
+def test_convert_startup_failure_keeps_journal(docs, tmp_path):
+    journal_path = docs / DEFAULT_JOURNAL_FILE
+    journal_path.write_text('{"unfinished": true}\n')
+    runner = CliRunner()
+
+    # The local provider fails without a base URL, before anything is converted
+    result = runner.invoke(cli, ['convert', str(docs), '--provider', 'local', '--root', str(tmp_path / "storage")])
+    assert result.exit_code == 1
+    assert journal_path.read_text() == '{"unfinished": true}\n'
+
+    result = runner.invoke(cli, ['convert', str(docs), '--provider', 'local', '--root', str(tmp_path / "storage"),
+                                 '--base-url', 'https://cdn.example.com'])
+    assert result.exit_code == 0
+    assert "discarding the journal of an unfinished run" in result.output
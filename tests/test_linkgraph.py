@@ -0,0 +1,79 @@
+import pytest
+
+from md_corpus import MDCorpus
+from md_corpus.linkgraph import LinkGraph
+from tests.test_watch import HashingProvider
+
+@pytest.fixture
+def docs(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "logo.png").write_bytes(b"logo v1")
+    (tmp_path / "images" / "chart.png").write_bytes(b"chart v1")
+    (tmp_path / "guide").mkdir()
+    (tmp_path / "guide" / "a.md").write_text("![logo](../images/logo.png)\n")
+    (tmp_path / "guide" / "b.md").write_text("![logo](../images/logo.png) ![chart](../images/chart.png)\n")
+    (tmp_path / "c.md").write_text("# No images\n")
+    return tmp_path
+
+def test_set_links_and_dependents(tmp_path):
+    graph = LinkGraph(tmp_path / "links.db")
+    graph.set_links(tmp_path / "b.md", {tmp_path / "x.png": "u1", tmp_path / "y.png": None})
+    graph.set_links(tmp_path / "a.md", {tmp_path / "sub" / ".." / "x.png": "u2"})
+
+    assert graph.dependents(tmp_path / "x.png") == {tmp_path / "a.md": "u2", tmp_path / "b.md": "u1"}
+    assert graph.assets(tmp_path / "b.md") == {tmp_path / "x.png": "u1", tmp_path / "y.png": None}
+
+    graph.set_links(tmp_path / "b.md", {tmp_path / "y.png": "u3"})
+    graph.remove_document(tmp_path / "a.md")
+    assert graph.dependents(tmp_path / "x.png") == {}
+    assert len(graph) == 1
+    graph.close()
+
+    with LinkGraph(tmp_path / "links.db") as reopened:
+        assert reopened.dependents(tmp_path / "y.png") == {tmp_path / "b.md": "u3"}
+
+def test_conversion_records_links(docs):
+    graph = LinkGraph(docs / "links.db")
+    corpus = MDCorpus(HashingProvider(), link_graph=graph)
+    corpus.process_directory(docs)
+
+    assert list(graph.dependents(docs / "images" / "logo.png")) == [docs / "guide" / "a.md", docs / "guide" / "b.md"]
+    assert graph.assets(docs / "c.md") == {}
+
+    # Converted documents link by URL; converting them again keeps their edges
+    (docs / "guide" / "b.md").write_text((docs / "guide" / "b.md").read_text() + "\nMore text\n")
+    corpus.process_directory(docs)
+    assert set(graph.assets(docs / "guide" / "b.md")) == {docs / "images" / "logo.png", docs / "images" / "chart.png"}
+
+def test_refresh_asset_rewrites_only_dependents(docs):
+    provider = HashingProvider()
+    corpus = MDCorpus(provider, link_graph=LinkGraph(docs / "links.db"))
+    corpus.process_directory(docs)
+    old_url = corpus.link_graph.assets(docs / "guide" / "a.md")[docs / "images" / "logo.png"]
+    c_mtime = (docs / "c.md").stat().st_mtime_ns
+
+    (docs / "images" / "logo.png").write_bytes(b"logo v2")
+    provider.uploaded_files.clear()
+    results = corpus.refresh_asset(docs / "images" / "logo.png")
+
+    new_url = corpus.link_graph.assets(docs / "guide" / "a.md")[docs / "images" / "logo.png"]
+    assert new_url != old_url
+    assert list(provider.uploaded_files) == [str(docs / "images" / "logo.png")]
+    assert [result.path for result in results] == [str(docs / "guide" / "a.md"), str(docs / "guide" / "b.md")]
+    assert (docs / "guide" / "a.md").read_text() == f"![logo]({new_url})\n"
+    assert old_url not in (docs / "guide" / "b.md").read_text()
+    assert (docs / "c.md").stat().st_mtime_ns == c_mtime
+
+def test_refresh_asset_converts_failed_links(docs):
+    provider = HashingProvider()
+    corpus = MDCorpus(provider, link_graph=LinkGraph(docs / "links.db"))
+    upload_file = provider.upload_file
+    provider.upload_file = lambda path: (_ for _ in ()).throw(OSError("offline"))
+    corpus.process_file(docs / "guide" / "a.md")
+    assert corpus.link_graph.dependents(docs / "images" / "logo.png") == {docs / "guide" / "a.md": None}
+
+    provider.upload_file = upload_file
+    results = corpus.refresh_asset(docs / "images" / "logo.png")
+
+    assert results[0].changed
+    assert "../images/logo.png" not in (docs / "guide" / "a.md").read_text()
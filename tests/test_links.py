@@ -0,0 +1,63 @@
+import pytest
+
+from md_corpus.links import has_local_links, is_local_target, replace_targets, scan_links
+
+def targets(content):
+    return [link.target for link in scan_links(content)]
+
+def test_scan_markdown_links_and_images():
+    assert targets("![alt](a.png) and [doc](./b.md)") == ["a.png", "./b.md"]
+
+def test_scan_targets_starting_with_url_letters():
+    # The previous pattern rejected targets starting with h, t or p
+    assert targets("![x](pic.png) ![y](thumb.jpg) ![z](hero.gif)") == ["pic.png", "thumb.jpg", "hero.gif"]
+
+def test_scan_angle_brackets_and_titles():
+    content = '![a](<my image.png>) ![b](b.png "Title") ![c](c.png \'T\') ![d](<d e.png> "T")'
+    assert targets(content) == ["my image.png", "b.png", "c.png", "d e.png"]
+
+def test_scan_bare_target_with_spaces_and_parentheses():
+    assert targets("![a](./image/test space.jpg) ![b](b(1).png)") == ["./image/test space.jpg", "b(1).png"]
+
+def test_scan_img_tags():
+    content = '<img src="a.png"> <IMG class="x" data-src="lazy.png" src=\'b.png\' />'
+    assert targets(content) == ["a.png", "b.png"]
+
+def test_is_local_target():
+    assert is_local_target("./a.png")
+    assert is_local_target("pic.png")
+    assert not is_local_target("https://example.com/a.png")
+    assert not is_local_target("data:image/png;base64,AAAA")
+    assert not is_local_target("//cdn.example.com/a.png")
+    assert not is_local_target("#section")
+
+def test_replace_targets_keeps_everything_else():
+    content = '![a](a.png "Title") text <img src="b.png" alt="b"> ![c](c.png)'
+    links = list(scan_links(content))
+    replaced = replace_targets(content, links, {"a.png": "https://x/a.png", "b.png": "https://x/b.png"})
+    assert replaced == '![a](https://x/a.png "Title") text <img src="https://x/b.png" alt="b"> ![c](c.png)'
+
+@pytest.mark.parametrize("content", [
+    "# Title\n\nNo links at all.\n",
+    "[site](https://example.com) and [mail](mailto:a@b.c)",
+    "[top](#top) [cdn](//cdn.example.com/a.png) [empty]()",
+    "![a](<https://example.com/a b.png>) ![b](data:image/png;base64,AAAA)",
+    "![a](< https://example.com/a.png>) <img src=' https://example.com/b.png'>",
+    '<img alt="x" src="https://example.com/a.png">',
+])
+def test_prefilter_skips_documents_without_local_links(content):
+    assert not has_local_links(content.encode())
+    assert not any(is_local_target(target) for target in targets(content))
+
+@pytest.mark.parametrize("content", [
+    "![a](./a.png)",
+    "![a]( a.png \"Title\")",
+    "![a](<my image.png>)",
+    "![a](< x.png>)",
+    '<img src=" x.png">',
+    "[doc](../other.md)",
+    "<IMG class='x' SRC='images/a.png'>",
+    "text ![ü](bild.png)",
+])
+def test_prefilter_finds_local_links(content):
+    assert has_local_links(content.encode())
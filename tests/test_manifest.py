@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import pytest
+from md_corpus import MDCorpus
+from md_corpus.manifest import AssetManifest
+from md_corpus.providers.local import LocalProvider
+from md_corpus.utils import file_sha256
+
+from tests.test_core import MockStorageProvider
+
+class CountingProvider(MockStorageProvider):
+    def __init__(self):
+        super().__init__()
+        self.upload_count = 0
+
+    def upload_file(self, file_path):
+        self.upload_count += 1
+        return super().upload_file(file_path)
+
+@pytest.fixture
+def doc_with_image(tmp_path):
+    image_dir = tmp_path / "image"
+    image_dir.mkdir()
+    (image_dir / "shared.png").write_bytes(b"shared image")
+    doc = tmp_path / "doc.md"
+    doc.write_text("![a](./image/shared.png)\n\n![b](./image/shared.png)\n")
+    return doc
+
+def test_manifest_put_get(tmp_path):
+    with AssetManifest(tmp_path / "manifest.db") as manifest:
+        assert manifest.get("abc", "a.png") is None
+        manifest.put("abc", "a.png", "https://example.com/a.png", 3, "/tmp/a.png")
+        assert manifest.get("abc", "a.png") == "https://example.com/a.png"
+        assert manifest.get("abc", "b.png") is None
+        assert manifest.get("abc", "a.png", "s3://other-bucket") is None
+        assert len(manifest) == 1
+
+def test_manifest_migrates_unscoped_entries(tmp_path):
+    db = tmp_path / "manifest.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE assets (digest TEXT NOT NULL, name TEXT NOT NULL, url TEXT NOT NULL, "
+                 "size INTEGER NOT NULL, source TEXT, PRIMARY KEY (digest, name))")
+    conn.execute("INSERT INTO assets VALUES ('abc', 'a.png', 'https://example.com/a.png', 3, NULL)")
+    conn.commit()
+    conn.close()
+    with AssetManifest(db) as manifest:
+        assert manifest.get("abc", "a.png") == "https://example.com/a.png"
+        manifest.put("abc", "a.png", "https://cdn.example.com/a.png", 3, scope="file:///public")
+        assert [entry['scope'] for entry in manifest.entries()] == ['', 'file:///public']
+
+def test_manifest_persists(tmp_path):
+    db = tmp_path / "manifest.db"
+    with AssetManifest(db) as manifest:
+        manifest.put("abc", "a.png", "https://example.com/a.png", 3)
+    with AssetManifest(db) as manifest:
+        assert manifest.get("abc", "a.png") == "https://example.com/a.png"
+
+def test_manifest_export_json(tmp_path):
+    output = tmp_path / "manifest.json"
+    with AssetManifest() as manifest:
+        manifest.put("abc", "a.png", "https://example.com/a.png", 3)
+        assert manifest.export_json(output) == 1
+    data = json.loads(output.read_text())
+    assert data["assets"][0]["url"] == "https://example.com/a.png"
+    assert data["assets"][0]["digest"] == "abc"
+
+def test_duplicate_links_uploaded_once(doc_with_image):
+    provider = CountingProvider()
+    MDCorpus(provider).convert_file(doc_with_image)
+    assert provider.upload_count == 1
+    assert doc_with_image.read_text().count("https://example.com/bucket/shared.png") == 2
+
+def test_manifest_skips_upload_across_runs(doc_with_image, tmp_path):
+    original = doc_with_image.read_text()
+    image = doc_with_image.parent / "image" / "shared.png"
+    with AssetManifest(tmp_path / "manifest.db") as manifest:
+        first = CountingProvider()
+        MDCorpus(first, manifest=manifest).convert_file(doc_with_image)
+        assert first.upload_count == 1
+        scope = MDCorpus(first).upload_scope
+        assert manifest.get(file_sha256(image), "shared.png", scope) == "https://example.com/bucket/shared.png"
+
+        doc_with_image.write_text(original)
+        second = CountingProvider()
+        MDCorpus(second, manifest=manifest).convert_file(doc_with_image)
+        assert second.upload_count == 0
+        assert "https://example.com/bucket/shared.png" in doc_with_image.read_text()
+
+def test_manifest_scoped_by_destination(doc_with_image, tmp_path):
+    original = doc_with_image.read_text()
+    with AssetManifest(tmp_path / "manifest.db") as manifest:
+        for root, base_url in (("public", "https://cdn.example.com"), ("mirror", "https://mirror.example.com")):
+            doc_with_image.write_text(original)
+            provider = LocalProvider(root=str(tmp_path / root), base_url=base_url)
+            MDCorpus(provider, manifest=manifest).convert_file(doc_with_image)
+            assert f"{base_url}/shared.png" in doc_with_image.read_text()
+            assert (tmp_path / root / "shared.png").read_bytes() == b"shared image"
+        assert len(manifest) == 2
+
+def test_manifest_scoped_by_key_strategy(doc_with_image, tmp_path):
+    original = doc_with_image.read_text()
+    with AssetManifest(tmp_path / "manifest.db") as manifest:
+        for key_strategy in ("name", "hash"):
+            doc_with_image.write_text(original)
+            provider = LocalProvider(root=str(tmp_path / "public"), base_url="https://cdn.example.com",
+                                     key_strategy=key_strategy)
+            MDCorpus(provider, manifest=manifest).convert_file(doc_with_image)
+        digest = file_sha256(doc_with_image.parent / "image" / "shared.png")
+        assert f"https://cdn.example.com/assets/{digest[:2]}/{digest}/shared.png" in doc_with_image.read_text()
+        assert len(manifest) == 2
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_manifest_asset_changed_back(doc_with_image, tmp_path, shared):
+    original = doc_with_image.read_text()
+    image = doc_with_image.parent / "image" / "shared.png"
+    provider = LocalProvider(root=str(tmp_path / "public"), base_url="https://cdn.example.com", link_mode="copy")
+    with AssetManifest(tmp_path / "manifest.db") as manifest:
+        corpus = MDCorpus(provider, manifest=manifest)
+        for content in (b"version A", b"version B", b"version A"):
+            image.write_bytes(content)
+            doc_with_image.write_text(original)
+            (corpus if shared else MDCorpus(provider, manifest=manifest)).convert_file(doc_with_image)
+            assert (tmp_path / "public" / "shared.png").read_bytes() == content
+        assert len(manifest) == 1
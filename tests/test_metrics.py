@@ -0,0 +1,65 @@
+import json
+import os
+import stat
+
+from md_corpus.metrics import Metrics
+
+def test_observe_fills_histogram():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.observe('upload', 0.005, 100)
+    metrics.observe('upload', 0.05, 200)
+    metrics.observe('upload', 3.0, 300)
+    metrics.increment('files_processed', 2)
+    
+    stage = metrics.snapshot()['stages']['upload']
+    assert stage['count'] == 3
+    assert stage['bytes'] == 600
+    assert stage['max_seconds'] == 3.0
+    assert stage['buckets'] == {'0.01': 1, '0.1': 1, '+Inf': 1}
+    assert metrics.snapshot()['counters'] == {'files_processed': 2}
+
+def test_time_context_manager():
+    metrics = Metrics()
+    with metrics.time('format', 10):
+        pass
+    
+    stage = metrics.snapshot()['stages']['format']
+    assert stage['count'] == 1
+    assert stage['bytes'] == 10
+
+def test_prometheus_format():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.observe('read', 0.005, 100)
+    metrics.observe('read', 0.05, 50)
+    metrics.increment('files_changed')
+    
+    lines = metrics.to_prometheus().splitlines()
+    assert '# TYPE md_corpus_stage_seconds histogram' in lines
+    assert 'md_corpus_stage_seconds_bucket{stage="read",le="0.01"} 1' in lines
+    assert 'md_corpus_stage_seconds_bucket{stage="read",le="0.1"} 2' in lines
+    assert 'md_corpus_stage_seconds_bucket{stage="read",le="+Inf"} 2' in lines
+    assert 'md_corpus_stage_seconds_count{stage="read"} 2' in lines
+    assert 'md_corpus_stage_bytes_total{stage="read"} 150' in lines
+    assert 'md_corpus_files_changed_total 1' in lines
+
+def test_write_by_extension(tmp_path):
+    metrics = Metrics()
+    metrics.observe('write', 0.001, 10)
+    
+    metrics.write(tmp_path / "metrics.json")
+    metrics.write(tmp_path / "metrics.prom")
+    
+    assert json.loads((tmp_path / "metrics.json").read_text())['stages']['write']['bytes'] == 10
+    assert (tmp_path / "metrics.prom").read_text().startswith('# HELP md_corpus_stage_seconds')
+
+def test_new_metrics_file_honors_umask(tmp_path):
+    umask = os.umask(0o022)
+    try:
+        Metrics().write(tmp_path / "metrics.prom")
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE((tmp_path / "metrics.prom").stat().st_mode) == 0o644
+    
+    os.chmod(tmp_path / "metrics.prom", 0o600)
+    Metrics().write(tmp_path / "metrics.prom")
+    assert stat.S_IMODE((tmp_path / "metrics.prom").stat().st_mode) == 0o600
@@ -14,6 +14,7 @@ def test_aliyun_provider_init():
     )
     assert provider.bucket_name == "test-bucket"
     assert provider.internal is False
+    assert provider.destination.startswith("oss://test-bucket https://oss-cn-beijing.aliyuncs.com ")
 
 def test_aliyun_provider_init_internal():
     provider = AliyunProvider(
@@ -34,6 +35,8 @@ def test_aws_provider_init():
     )
     assert provider.bucket_name == "test-bucket"
     assert provider.region == "us-east-1"
+    assert provider.destination == ("s3://test-bucket https://s3.amazonaws.com "
+                                    "https://test-bucket.s3.amazonaws.com/")
 
 def test_aws_provider_missing_region():
     with pytest.raises(MDCorpusError):
@@ -142,4 +145,459 @@ def test_aws_provider_integration(aws_credentials, tmp_path):
     )
     
     url = provider.upload_file(test_file)
-    assert url.startswith(f"https://{aws_credentials['bucket']}.s3.{aws_credentials['region']}.amazonaws.com/") 
\ No newline at end of file
+    assert url.startswith(f"https://{aws_credentials['bucket']}.s3.{aws_credentials['region']}.amazonaws.com/") 
+
+class FakeOssBucket:
+    """Minimal stand-in for oss2.Bucket recording list and put calls"""
+    def __init__(self, objects):
+        self.endpoint = "https://oss-cn-beijing.aliyuncs.com"
+        self.objects = objects
+        self.list_calls = 0
+        self.list_args = []
+        self.put_keys = []
+        self.put_headers = []
+    
+    def list_objects(self, prefix='', delimiter='', marker='', max_keys=100, headers=None):
+        from types import SimpleNamespace
+        from oss2.models import SimplifiedObjectInfo
+        self.list_calls += 1
+        self.list_args.append((prefix, delimiter))
+        object_list = [SimplifiedObjectInfo(key, 0, etag, 'Normal', size, 'Standard')
+                       for key, (etag, size) in self.objects.items() if key.startswith(prefix)]
+        return SimpleNamespace(object_list=object_list, prefix_list=[], is_truncated=False, next_marker='')
+    
+    def put_object(self, key, data, headers=None):
+        self.put_keys.append(key)
+        self.put_headers.append(headers)
+
+@pytest.fixture
+def aliyun_provider():
+    return AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com",
+        skip_existing=True
+    )
+
+def test_etag_matches(tmp_path):
+    from md_corpus.providers.base import etag_matches
+    from md_corpus.utils import file_md5
+    
+    test_file = tmp_path / "a.png"
+    test_file.write_bytes(b"image data")
+    md5 = file_md5(test_file)
+    
+    assert etag_matches(f'"{md5}"', 10, test_file)
+    assert etag_matches(md5.upper(), 10, test_file)
+    assert not etag_matches(md5, 11, test_file)
+    assert not etag_matches("0" * 32, 10, test_file)
+
+def test_multipart_etag(tmp_path):
+    import hashlib
+    from md_corpus.providers.base import etag_matches, multipart_etag
+    
+    test_file = tmp_path / "big.bin"
+    test_file.write_bytes(b"a" * 10 + b"b" * 10 + b"c" * 5)
+    parts = [b"a" * 10, b"b" * 10, b"c" * 5]
+    expected = hashlib.md5(b"".join(hashlib.md5(p).digest() for p in parts)).hexdigest() + "-3"
+    
+    assert multipart_etag(test_file, 10) == expected
+    assert etag_matches(expected, 25, test_file, part_size=10)
+    assert not etag_matches(expected, 25, test_file)
+
+def test_aliyun_skip_existing(aliyun_provider, tmp_path):
+    from md_corpus.utils import file_md5
+    
+    same = tmp_path / "same.png"
+    same.write_bytes(b"unchanged")
+    changed = tmp_path / "changed.png"
+    changed.write_bytes(b"new content")
+    aliyun_provider.bucket = FakeOssBucket({
+        "same.png": (file_md5(same).upper(), 9),
+        "changed.png": ("0" * 32, 11),
+    })
+    
+    assert aliyun_provider.upload_file(same).endswith("/same.png")
+    assert aliyun_provider.upload_file(changed).endswith("/changed.png")
+    
+    assert aliyun_provider.bucket.put_keys == ["changed.png"]
+    assert aliyun_provider.bucket.list_calls == 1
+
+def test_aws_skip_existing(tmp_path):
+    from botocore.stub import Stubber
+    from md_corpus.utils import file_md5
+    
+    same = tmp_path / "same.png"
+    same.write_bytes(b"unchanged")
+    provider = AWSProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        region="us-east-1",
+        skip_existing=True
+    )
+    
+    with Stubber(provider.s3) as stubber:
+        stubber.add_response(
+            'list_objects_v2',
+            {'Contents': [{'Key': 'same.png', 'ETag': f'"{file_md5(same)}"', 'Size': 9}], 'IsTruncated': False},
+            {'Bucket': 'test-bucket', 'Prefix': '', 'Delimiter': '/'}
+        )
+        url = provider.upload_file(same)
+        stubber.assert_no_pending_responses()
+    
+    assert url == "https://test-bucket.s3.amazonaws.com/same.png"
+
+def test_aliyun_upload_sets_acl_in_put(tmp_path):
+    provider = AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com"
+    )
+    provider.bucket = FakeOssBucket({})
+    image = tmp_path / "a.png"
+    image.write_bytes(b"image")
+    
+    provider.upload_file(image)
+    
+    assert provider.bucket.put_headers == [{'x-oss-object-acl': 'public-read', 'Content-Type': 'image/png'}]
+
+def test_aliyun_large_file_uses_resumable_upload(tmp_path, monkeypatch):
+    import oss2
+    
+    calls = []
+    monkeypatch.setattr(oss2, "resumable_upload", lambda bucket, key, filename, **kwargs: calls.append((key, kwargs)))
+    provider = AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com",
+        multipart_threshold=10,
+        multipart_threads=3,
+        checkpoint_dir=str(tmp_path / "checkpoints")
+    )
+    provider.bucket = FakeOssBucket({})
+    video = tmp_path / "demo.mp4"
+    video.write_bytes(b"x" * 20)
+    
+    provider.upload_file(video)
+    
+    assert provider.bucket.put_keys == []
+    key, kwargs = calls[0]
+    assert key == "demo.mp4"
+    assert kwargs["num_threads"] == 3
+    assert kwargs["headers"]["x-oss-object-acl"] == "public-read"
+    assert kwargs["store"].dir.startswith(str(tmp_path / "checkpoints"))
+
+def test_aws_provider_transfer_settings():
+    provider = AWSProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        region="us-east-1",
+        max_pool_connections=64,
+        multipart_threshold=16 * 1024 * 1024,
+        multipart_chunksize=16 * 1024 * 1024,
+        max_concurrency=4
+    )
+    assert provider.s3.meta.config.max_pool_connections == 64
+    assert provider.transfer_config.multipart_threshold == 16 * 1024 * 1024
+    assert provider.transfer_config.multipart_chunksize == 16 * 1024 * 1024
+    assert provider.transfer_config.max_concurrency == 4
+
+def test_local_provider_upload(tmp_path):
+    from md_corpus.providers import LocalProvider
+    
+    source = tmp_path / "docs" / "test space.png"
+    source.parent.mkdir()
+    source.write_bytes(b"image data")
+    provider = LocalProvider(root=str(tmp_path / "public"), base_url="https://cdn.example.com/assets/")
+    
+    url = provider.upload_file(source)
+    
+    assert url == "https://cdn.example.com/assets/test%20space.png"
+    assert (tmp_path / "public" / "test space.png").read_bytes() == b"image data"
+    assert [p.name for p in (tmp_path / "public").iterdir()] == ["test space.png"]
+
+@pytest.mark.parametrize("link_mode", ["hardlink", "copy", "auto"])
+def test_local_provider_link_modes(tmp_path, link_mode):
+    from md_corpus.providers import LocalProvider
+    
+    source = tmp_path / "a.png"
+    source.write_bytes(b"v1")
+    provider = LocalProvider(root=str(tmp_path / "public"), base_url="https://cdn.example.com",
+                             link_mode=link_mode)
+    published = tmp_path / "public" / "a.png"
+    
+    provider.upload_file(source)
+    assert published.read_bytes() == b"v1"
+    if link_mode == "hardlink":
+        assert published.stat().st_ino == source.stat().st_ino
+    if link_mode == "copy":
+        assert published.stat().st_ino != source.stat().st_ino
+    
+    # Re-uploading replaces the published file
+    source.unlink()
+    source.write_bytes(b"version 2")
+    provider.upload_file(source)
+    assert published.read_bytes() == b"version 2"
+
+def test_local_provider_invalid_link_mode(tmp_path):
+    from md_corpus.providers import LocalProvider
+    
+    with pytest.raises(MDCorpusError):
+        LocalProvider(root=str(tmp_path), base_url="https://cdn.example.com", link_mode="symlink")
+
+def test_upload_many_reports_errors(tmp_path):
+    from md_corpus.providers import LocalProvider
+    
+    provider = LocalProvider(root=tmp_path / "public", base_url="https://cdn.example.com")
+    image = tmp_path / "a.png"
+    image.write_bytes(b"image")
+    missing = tmp_path / "missing.png"
+    
+    done = {}
+    results = provider.upload_many([str(image), str(missing)], max_workers=2, on_done=done.__setitem__)
+    
+    assert results[str(image)] == "https://cdn.example.com/a.png"
+    assert isinstance(results[str(missing)], MDCorpusError)
+    assert done == {str(image): "https://cdn.example.com/a.png"}
+
+def test_aws_upload_many(tmp_path):
+    moto = pytest.importorskip("moto")
+    
+    with moto.mock_aws():
+        provider = AWSProvider(
+            bucket="test-bucket",
+            access_key="test-key",
+            secret_key="test-secret",
+            region="us-east-1",
+            multipart_threshold=5 * 1024 * 1024,
+            multipart_chunksize=5 * 1024 * 1024
+        )
+        provider.s3.create_bucket(Bucket="test-bucket")
+        paths = []
+        for name, size in [("a.png", 10), ("b.txt", 20), ("large.bin", 6 * 1024 * 1024)]:
+            path = tmp_path / name
+            path.write_bytes(b"x" * size)
+            paths.append(str(path))
+        
+        # A single slot makes every upload wait for the previous one to release it
+        from md_corpus.ratelimit import AdaptiveLimiter
+        limiter = AdaptiveLimiter(max_concurrency=1)
+        done = {}
+        results = provider.upload_many(paths + [str(tmp_path / "missing.png")], limiter=limiter,
+                                       on_done=done.__setitem__)
+        
+        for path in paths:
+            assert results[path] == f"https://test-bucket.s3.amazonaws.com/{os.path.basename(path)}"
+        assert done == {path: results[path] for path in paths}
+        assert isinstance(results[str(tmp_path / "missing.png")], MDCorpusError)
+        head = provider.s3.head_object(Bucket="test-bucket", Key="large.bin")
+        assert head['ContentLength'] == 6 * 1024 * 1024
+        assert head['ETag'].endswith('-2"')
+        assert provider.s3.head_object(Bucket="test-bucket", Key="a.png")['ContentType'] == "image/png"
+        assert limiter.stats() == {'throttled': 0, 'retries': 0}
+
+def test_aws_throttling_errors():
+    from boto3.exceptions import S3UploadFailedError
+    from botocore.exceptions import ClientError
+    from md_corpus.exceptions import ThrottlingError
+    from md_corpus.providers.aws import _upload_error
+    
+    slow_down = ClientError({'Error': {'Code': 'SlowDown'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}, 'PutObject')
+    denied = ClientError({'Error': {'Code': 'AccessDenied'}, 'ResponseMetadata': {'HTTPStatusCode': 403}}, 'PutObject')
+    try:
+        try:
+            raise slow_down
+        except ClientError as e:
+            raise S3UploadFailedError(f"Failed to upload: {e}")
+    except S3UploadFailedError as e:
+        wrapped = e
+    
+    assert isinstance(_upload_error("a.png", slow_down), ThrottlingError)
+    assert isinstance(_upload_error("a.png", wrapped), ThrottlingError)
+    error = _upload_error("a.png", denied)
+    assert isinstance(error, MDCorpusError) and not isinstance(error, ThrottlingError)
+
+def test_aliyun_throttling_error(tmp_path):
+    import oss2
+    from md_corpus.exceptions import ThrottlingError
+    
+    class BusyBucket(FakeOssBucket):
+        def put_object(self, key, data, headers=None):
+            raise oss2.exceptions.ServerError(503, {}, b'', {'Code': 'ServerBusy', 'Message': 'busy'})
+    
+    provider = AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com"
+    )
+    provider.bucket = BusyBucket({})
+    image = tmp_path / "a.png"
+    image.write_bytes(b"image")
+    
+    with pytest.raises(ThrottlingError):
+        provider.upload_file(image)
+
+def test_aliyun_compression(tmp_path):
+    import gzip
+    
+    class RecordingBucket(FakeOssBucket):
+        def put_object(self, key, data, headers=None):
+            super().put_object(key, data, headers)
+            self.data = data.read()
+    
+    provider = AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com",
+        compression="gzip"
+    )
+    provider.bucket = RecordingBucket({})
+    diagram = tmp_path / "diagram.svg"
+    diagram.write_text("<svg>" + "<g/>" * 1000 + "</svg>")
+    
+    provider.upload_file(diagram)
+    
+    assert provider.bucket.put_headers[0]['Content-Encoding'] == 'gzip'
+    assert provider.bucket.put_headers[0]['Content-Type'] == 'image/svg+xml'
+    assert gzip.decompress(provider.bucket.data) == diagram.read_bytes()
+
+def test_aws_compression(tmp_path):
+    import gzip
+    moto = pytest.importorskip("moto")
+    
+    with moto.mock_aws():
+        provider = AWSProvider(
+            bucket="test-bucket",
+            access_key="test-key",
+            secret_key="test-secret",
+            region="us-east-1",
+            compression="gzip"
+        )
+        provider.s3.create_bucket(Bucket="test-bucket")
+        diagram = tmp_path / "diagram.svg"
+        diagram.write_text("<svg>" + "<g/>" * 1000 + "</svg>")
+        data = tmp_path / "data.csv"
+        data.write_text("a,b\n" + "1,2\n" * 1000)
+        
+        provider.upload_file(diagram)
+        provider.upload_many([str(data)])
+        
+        for path in (diagram, data):
+            obj = provider.s3.get_object(Bucket="test-bucket", Key=path.name)
+            assert obj['ContentEncoding'] == 'gzip'
+            assert gzip.decompress(obj['Body'].read()) == path.read_bytes()
+
+def test_aws_hash_key_strategy(tmp_path):
+    import hashlib
+    moto = pytest.importorskip("moto")
+    
+    with moto.mock_aws():
+        provider = AWSProvider(
+            bucket="test-bucket",
+            access_key="test-key",
+            secret_key="test-secret",
+            region="us-east-1",
+            key_strategy="hash"
+        )
+        provider.s3.create_bucket(Bucket="test-bucket")
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        first = tmp_path / "a" / "image.png"
+        first.write_bytes(b"first")
+        second = tmp_path / "b" / "image.png"
+        second.write_bytes(b"second")
+        
+        urls = provider.upload_many([str(first), str(second)])
+        
+        digest = hashlib.sha256(b"first").hexdigest()
+        assert urls[str(first)] == f"https://test-bucket.s3.amazonaws.com/assets/{digest[:2]}/{digest}/image.png"
+        assert urls[str(second)] != urls[str(first)]
+        key = urls[str(first)].split(".com/")[1]
+        obj = provider.s3.get_object(Bucket="test-bucket", Key=key)
+        assert obj['CacheControl'] == 'public, max-age=31536000, immutable'
+        assert obj['Body'].read() == b"first"
+
+def test_aliyun_hash_key_strategy(tmp_path):
+    provider = AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com",
+        key_strategy="hash"
+    )
+    provider.bucket = FakeOssBucket({})
+    image = tmp_path / "my image.png"
+    image.write_bytes(b"image")
+    
+    url = provider.upload_file(image)
+    
+    assert "/assets/" in url and url.endswith("/my%20image.png")
+    assert provider.bucket.put_headers[0]['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+def test_hash_keys_are_listed_in_bulk(tmp_path):
+    import hashlib
+    from md_corpus.utils import file_md5
+    
+    # Find contents whose digests fall in the same assets/ab/ shard of the hash space
+    contents = {}
+    for i in range(10000):
+        data = f"image {i}".encode()
+        contents.setdefault(hashlib.sha256(data).hexdigest()[:2], []).append(data)
+    shard, datas = next((shard, datas) for shard, datas in contents.items() if len(datas) >= 3)
+    paths = []
+    for i, data in enumerate(datas[:3]):
+        paths.append(tmp_path / f"{i}.png")
+        paths[-1].write_bytes(data)
+    existing = hashlib.sha256(datas[0]).hexdigest()
+    provider = AliyunProvider(
+        bucket="test-bucket",
+        access_key="test-key",
+        secret_key="test-secret",
+        endpoint="https://oss-cn-beijing.aliyuncs.com",
+        skip_existing=True,
+        key_strategy="hash"
+    )
+    provider.bucket = FakeOssBucket({f"assets/{shard}/{existing}/0.png": (file_md5(paths[0]), len(datas[0]))})
+    
+    provider.upload_many([str(path) for path in paths], max_workers=1)
+    
+    assert provider.bucket.list_args == [(f"assets/{shard}/", '')]
+    assert len(provider.bucket.put_keys) == 2
+
+def test_local_hash_key_strategy(tmp_path):
+    from md_corpus.providers import LocalProvider
+    
+    image = tmp_path / "image.png"
+    image.write_bytes(b"image")
+    provider = LocalProvider(tmp_path / "public", "https://cdn.example.com", key_strategy="hash")
+    
+    url = provider.upload_file(image)
+    
+    key = url[len("https://cdn.example.com/"):]
+    assert key.startswith("assets/") and key.endswith("/image.png")
+    assert (tmp_path / "public" / key).read_bytes() == b"image"
+    with pytest.raises(MDCorpusError):
+        LocalProvider(tmp_path / "public", "https://cdn.example.com", key_strategy="path")
+
+def test_local_hash_key_strategy_never_hardlinks(tmp_path):
+    from md_corpus.providers import LocalProvider
+
+    source = tmp_path / "image.png"
+    source.write_bytes(b"image v1")
+    provider = LocalProvider(tmp_path / "public", "https://cdn.example.com", key_strategy="hash")
+    url = provider.upload_file(source)
+    published = tmp_path / "public" / url.split("https://cdn.example.com/")[1]
+
+    assert not os.path.samefile(source, published)
+    with open(source, "r+b") as f:
+        f.write(b"IMAGE")
+    assert published.read_bytes() == b"image v1"
+    with pytest.raises(MDCorpusError):
+        LocalProvider(tmp_path / "public", "https://cdn.example.com", link_mode="hardlink", key_strategy="hash")
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from md_corpus.exceptions import ThrottlingError
+from md_corpus.ratelimit import AdaptiveLimiter
+
+def flaky(failures):
+    """Return a function that is throttled the given number of times before succeeding"""
+    calls = []
+    
+    def call():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ThrottlingError("slow down")
+        return "ok"
+    return call
+
+def test_call_retries_throttled_requests():
+    limiter = AdaptiveLimiter(base_delay=0)
+    
+    assert limiter.call(flaky(2)) == "ok"
+    assert limiter.stats() == {'throttled': 2, 'retries': 2}
+
+def test_call_gives_up_after_max_retries():
+    limiter = AdaptiveLimiter(max_retries=2, base_delay=0)
+    
+    with pytest.raises(ThrottlingError):
+        limiter.call(flaky(10))
+    assert limiter.stats() == {'throttled': 3, 'retries': 2}
+
+def test_other_errors_are_not_retried():
+    limiter = AdaptiveLimiter(base_delay=0)
+    
+    with pytest.raises(ValueError):
+        limiter.call(int, "not a number")
+    assert limiter.stats() == {'throttled': 0, 'retries': 0}
+
+def test_limit_is_aimd():
+    limiter = AdaptiveLimiter(max_concurrency=8, rate=100)
+    
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    assert limiter.rate == 50
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 4.25
+    assert limiter.rate == 100 / 2 + 100 / 32
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+    assert limiter.rate == 100
+
+def test_concurrency_is_capped():
+    limiter = AdaptiveLimiter(max_concurrency=2)
+    lock = threading.Lock()
+    active = []
+    peak = []
+    
+    def work():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+    
+    threads = [threading.Thread(target=limiter.call, args=(work,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+def test_token_bucket_limits_rate():
+    limiter = AdaptiveLimiter(rate=200, burst=1)
+    
+    start = time.monotonic()
+    for _ in range(21):
+        limiter.call(lambda: None)
+    assert time.monotonic() - start >= 0.09
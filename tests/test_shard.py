@@ -0,0 +1,117 @@
+import shutil
+
+import pytest
+from click.testing import CliRunner
+from pathlib import Path
+from urllib.parse import quote
+
+from md_corpus import MDCorpus
+from md_corpus.cli import cli
+from md_corpus.exceptions import BatchError, MDCorpusError
+from md_corpus.manifest import AssetManifest
+from md_corpus.shard import Shard, stable_hash
+from tests.test_core import MockStorageProvider
+
+class KeyedProvider(MockStorageProvider):
+    """Provider whose upload URLs can be derived from the object key"""
+    def get_file_url(self, file_key):
+        return f"{self.base_url}/{quote(file_key)}"
+
+@pytest.fixture
+def docs(tmp_path):
+    root = tmp_path / "docs"
+    (root / "images").mkdir(parents=True)
+    for i in range(6):
+        (root / "images" / f"{i}.png").write_bytes(f"image {i}".encode())
+    (root / "images" / "shared.png").write_bytes(b"shared")
+    for i in range(20):
+        (root / f"doc{i}.md").write_text(f"![a](./images/{i % 6}.png)\n\n![shared](./images/shared.png)\n")
+    return root
+
+def test_parse_shard():
+    assert repr(Shard.parse("2/8")) == "Shard(2, 8)"
+    assert str(Shard.parse(" 1 / 1 ")) == "1/1"
+    for spec in ("0/4", "5/4", "1/0", "2", "a/b"):
+        with pytest.raises(MDCorpusError):
+            Shard.parse(spec)
+
+def test_stable_hash_partitions_keys():
+    assert stable_hash("docs/a.md") == stable_hash("docs/a.md")
+    keys = [f"docs/{i}.md" for i in range(200)]
+    shards = [Shard(i, 4) for i in range(1, 5)]
+    owners = [[shard for shard in shards if shard.owns(key)] for key in keys]
+    assert all(len(owner) == 1 for owner in owners)
+    assert all(any(owner == [shard] for owner in owners) for shard in shards)
+
+def test_shards_upload_each_asset_once(docs, tmp_path):
+    uploads = []
+    converted = {}
+    for i in range(1, 4):
+        # Every shard runs on its own checkout
+        checkout = shutil.copytree(docs, tmp_path / f"checkout{i}")
+        provider = KeyedProvider()
+        corpus = MDCorpus(provider, shard=Shard(i, 3), manifest=AssetManifest(tmp_path / f"part{i}.db"))
+        for result in corpus.process_directory(checkout):
+            converted[Path(result.path).name] = Path(result.path).read_text()
+        corpus.manifest.close()
+        uploads += [Path(path).relative_to(checkout).as_posix() for path in provider.uploaded_files]
+
+    assert sorted(converted) == sorted(doc.name for doc in docs.glob("*.md"))
+    assert sorted(uploads) == sorted(f"images/{image.name}" for image in (docs / "images").iterdir())
+    for i in range(20):
+        assert converted[f"doc{i}.md"] == (
+            f"![a](https://example.com/bucket/{i % 6}.png)\n\n![shared](https://example.com/bucket/shared.png)\n")
+
+    with AssetManifest(tmp_path / "merged.db") as merged:
+        assert sum(merged.merge(tmp_path / f"part{i}.db") for i in range(1, 4)) == 7
+        assert merged.merge(tmp_path / "part1.db") == 0
+        assert len(merged) == 7
+
+def test_shard_uploads_assets_only_other_shards_reference(tmp_path):
+    (tmp_path / "logo.png").write_bytes(b"logo")
+    (tmp_path / "a.md").write_text("![logo](./logo.png)\n")
+    docs_owner = next(i for i in (1, 2) if Shard(i, 2).owns("a.md"))
+    provider = KeyedProvider()
+    corpus = MDCorpus(provider, shard=Shard(3 - docs_owner, 2))
+    corpus.shard.owns_asset = lambda digest, name: True
+
+    assert corpus.process_directory(tmp_path) == []
+    assert list(provider.uploaded_files) == [str(tmp_path / "logo.png")]
+
+def test_failed_shard_does_not_upload_other_assets(tmp_path):
+    (tmp_path / "logo.png").write_bytes(b"logo")
+    (tmp_path / "a.md").write_text("![logo](./logo.png)\n")
+    shard = Shard(3 - next(i for i in (1, 2) if Shard(i, 2).owns("a.md")), 2)
+    broken = next(f"broken{i}.md" for i in range(100) if shard.owns(f"broken{i}.md"))
+    (tmp_path / broken).write_bytes(b"\xff\xfe not utf-8")
+    provider = KeyedProvider()
+    corpus = MDCorpus(provider, shard=shard)
+    corpus.shard.owns_asset = lambda digest, name: True
+
+    with pytest.raises(BatchError):
+        corpus.process_directory(tmp_path)
+    assert provider.uploaded_files == {}
+
+def test_shard_requires_file_urls():
+    with pytest.raises(MDCorpusError):
+        MDCorpus(MockStorageProvider(), shard=Shard(1, 2))
+
+def test_format_and_merge_commands(docs, tmp_path):
+    runner = CliRunner()
+    outputs = [runner.invoke(cli, ['format', str(docs), '--shard', f'{i}/2']) for i in (1, 2)]
+    assert all(result.exit_code == 0 for result in outputs)
+    assert "(shard 1/2)" in outputs[0].output
+    counts = [int(result.output.split("Formatted ")[1].split()[0]) for result in outputs]
+    assert sum(counts) == 20
+
+    result = runner.invoke(cli, ['format', str(docs), '--shard', '3/2'])
+    assert result.exit_code == 1
+    assert "Invalid shard" in result.output
+
+    for i, digest in enumerate(("abc", "def")):
+        with AssetManifest(tmp_path / f"part{i}.db") as part:
+            part.put(digest, "a.png", f"https://example.com/{digest}/a.png", 3)
+    result = runner.invoke(cli, ['merge', str(tmp_path / "merged.db"), str(tmp_path / "part0.db"),
+                                 str(tmp_path / "part1.db")])
+    assert result.exit_code == 0
+    assert "Merged 2 assets from 2 manifests" in result.output
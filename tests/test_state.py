@@ -0,0 +1,163 @@
+import os
+import pytest
+from pathlib import Path
+from md_corpus import MDCorpus
+from md_corpus.state import IncrementalState
+
+from tests.test_core import MockStorageProvider
+from tests.test_watch import HashingProvider
+
+@pytest.fixture
+def corpus():
+    return MDCorpus(MockStorageProvider())
+
+def test_state_new_file_is_dirty(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text("# Doc\n")
+    state = IncrementalState(tmp_path / "state.json")
+    assert state.is_dirty("format", doc)
+    state.record("format", doc)
+    assert not state.is_dirty("format", doc)
+    assert state.is_dirty("convert", doc)
+
+def test_state_detects_content_change(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text("# Doc\n")
+    state = IncrementalState(tmp_path / "state.json")
+    state.record("format", doc)
+    doc.write_text("# Changed\n")
+    assert state.is_dirty("format", doc)
+
+def test_state_ignores_touch_without_change(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text("# Doc\n")
+    state = IncrementalState(tmp_path / "state.json")
+    state.record("format", doc)
+    stat = doc.stat()
+    os.utime(doc, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not state.is_dirty("format", doc)
+
+def test_state_tracks_assets(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text("# Doc\n")
+    asset = tmp_path / "a.png"
+    asset.write_bytes(b"v1")
+    state = IncrementalState(tmp_path / "state.json")
+    state.record("convert", doc, [asset])
+    assert not state.is_dirty("convert", doc)
+    asset.write_bytes(b"v2 with new size")
+    assert state.is_dirty("convert", doc)
+
+def test_state_incomplete_record_keeps_failed_assets(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text("![a](https://example.com/v1/a.png)\n")
+    asset = tmp_path / "a.png"
+    asset.write_bytes(b"v1")
+    state = IncrementalState(tmp_path / "state.json")
+    state.record("convert", doc, {asset: "https://example.com/v1/a.png"})
+    asset.write_bytes(b"v2 with new size")
+    assert state.changed_assets("convert", doc) == {asset}
+    
+    state.record("convert", doc, {asset: None}, complete=False)
+    assert state.is_dirty("convert", doc)
+    assert state.changed_assets("convert", doc) == {asset}
+    assert state.assets("convert", doc) == {asset: "https://example.com/v1/a.png"}
+
+def test_state_persists(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text("# Doc\n")
+    state = IncrementalState(tmp_path / "state.json")
+    state.record("format", doc)
+    state.save()
+    assert not IncrementalState(tmp_path / "state.json").is_dirty("format", doc)
+
+def test_format_directory_incremental(corpus, tmp_path):
+    (tmp_path / "a.md").write_text("* Item A")
+    (tmp_path / "b.md").write_text("* Item B")
+    state_file = tmp_path / ".md-corpus-state.json"
+    
+    first = corpus.format_directory(tmp_path, state=IncrementalState(state_file))
+    assert len(first) == 2
+    
+    second = corpus.format_directory(tmp_path, state=IncrementalState(state_file))
+    assert second == []
+    
+    (tmp_path / "b.md").write_text("* Item B changed")
+    third = corpus.format_directory(tmp_path, state=IncrementalState(state_file))
+    assert third == [str(tmp_path / "b.md")]
+
+def test_convert_directory_incremental_retries_failed_uploads(tmp_path):
+    class FlakyProvider(MockStorageProvider):
+        fail = True
+        
+        def upload_file(self, file_path):
+            if self.fail:
+                raise RuntimeError("Upload failed")
+            return super().upload_file(file_path)
+    
+    (tmp_path / "a.png").write_bytes(b"image")
+    (tmp_path / "doc.md").write_text("![a](./a.png)")
+    (tmp_path / "plain.md").write_text("# Plain")
+    state_file = tmp_path / ".md-corpus-state.json"
+    provider = FlakyProvider()
+    corpus = MDCorpus(provider)
+    
+    assert len(corpus.convert_directory(tmp_path, state=IncrementalState(state_file))) == 2
+    assert "./a.png" in (tmp_path / "doc.md").read_text()
+    
+    provider.fail = False
+    processed = corpus.convert_directory(tmp_path, state=IncrementalState(state_file))
+    assert processed == [str(tmp_path / "doc.md")]
+    assert "https://example.com/bucket/a.png" in (tmp_path / "doc.md").read_text()
+
+def test_convert_directory_incremental_uploads_changed_assets(tmp_path):
+    class RecordingProvider(HashingProvider):
+        def __init__(self):
+            super().__init__()
+            self.uploaded_bytes = []
+        
+        def upload_file(self, file_path):
+            self.uploaded_bytes.append(Path(file_path).read_bytes())
+            return super().upload_file(file_path)
+    
+    (tmp_path / "a.png").write_bytes(b"v1")
+    (tmp_path / "doc.md").write_text("![a](./a.png)")
+    state_file = tmp_path / ".md-corpus-state.json"
+    provider = RecordingProvider()
+    corpus = MDCorpus(provider)
+    corpus.convert_directory(tmp_path, state=IncrementalState(state_file))
+    old_url = IncrementalState(state_file).assets('convert', tmp_path / "doc.md")[tmp_path / "a.png"]
+    
+    (tmp_path / "a.png").write_bytes(b"v2 of the image")
+    processed = MDCorpus(provider).convert_directory(tmp_path, state=IncrementalState(state_file))
+    
+    state = IncrementalState(state_file)
+    new_url = state.assets('convert', tmp_path / "doc.md")[tmp_path / "a.png"]
+    assert processed == [str(tmp_path / "doc.md")]
+    assert provider.uploaded_bytes == [b"v1", b"v2 of the image"]
+    assert new_url != old_url
+    assert (tmp_path / "doc.md").read_text() == f"![a]({new_url})\n"
+    assert not state.is_dirty('convert', tmp_path / "doc.md")
+    
+    # Editing the document keeps the asset recorded, so later changes are still picked up
+    (tmp_path / "doc.md").write_text(f"# Title\n\n![a]({new_url})\n")
+    MDCorpus(provider).convert_directory(tmp_path, state=IncrementalState(state_file))
+    assert IncrementalState(state_file).assets('convert', tmp_path / "doc.md") == {tmp_path / "a.png": new_url}
+
+def test_refresh_recorded_assets(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"v1")
+    (tmp_path / "doc.md").write_text("![a](./a.png)")
+    (tmp_path / "other.md").write_text("# Other")
+    state = IncrementalState(tmp_path / ".md-corpus-state.json", root=tmp_path)
+    corpus = MDCorpus(HashingProvider())
+    corpus.convert_directory(tmp_path, state=state)
+    old_url = state.assets('convert', tmp_path / "doc.md")[tmp_path / "a.png"]
+    
+    (tmp_path / "a.png").write_bytes(b"v2 of the image")
+    results = corpus.refresh_recorded_assets([tmp_path / "a.png"], state)
+    
+    new_url = state.assets('convert', tmp_path / "doc.md")[tmp_path / "a.png"]
+    assert new_url != old_url
+    assert [(result.path, result.changed) for result in results] == [(str(tmp_path / "doc.md"), True)]
+    assert (tmp_path / "doc.md").read_text() == f"![a]({new_url})\n"
+    assert not state.is_dirty('convert', tmp_path / "doc.md")
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import pytest
+
+from md_corpus import MDCorpus
+from md_corpus.exceptions import MDCorpusError
+from md_corpus.walker import CorpusWalker, IgnoreRules
+from tests.test_core import MockStorageProvider
+
+@pytest.fixture
+def tree(tmp_path):
+    files = [
+        "README.md",
+        "a.md",
+        "a/b.md",
+        "a/b/c.md",
+        "a/notes.txt",
+        "docs/guide.md",
+        "docs/draft.md",
+        "docs/keep.draft.md",
+        "build/out.md",
+        "node_modules/pkg/README.md",
+        ".git/HEAD.md",
+        "vendor/lib/doc.md",
+    ]
+    for name in files:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("# Doc\n")
+    (tmp_path / ".gitignore").write_text("# Build output\nbuild/\nnode_modules\n")
+    (tmp_path / "docs" / ".mdcorpusignore").write_text("*draft.md\n!keep.draft.md\n")
+    return tmp_path
+
+def relative(paths, root):
+    return [Path(path).relative_to(root).as_posix() for path in paths]
+
+@pytest.mark.parametrize("pattern, path, is_dir, expected", [
+    ("*.md", "a/b/c.md", False, True),
+    ("/top.md", "top.md", False, True),
+    ("/top.md", "a/top.md", False, False),
+    ("docs/*.md", "docs/a.md", False, True),
+    ("docs/*.md", "docs/sub/a.md", False, False),
+    ("docs/**/*.md", "docs/sub/deep/a.md", False, True),
+    ("**/build", "x/build", True, True),
+    ("build/", "build", False, False),
+    ("a?.md", "ab.md", False, True),
+    ("[!a]*.md", "a.md", False, False),
+])
+def test_ignore_patterns(pattern, path, is_dir, expected):
+    assert IgnoreRules([pattern]).matches(path, is_dir) is expected
+
+def test_negation_and_base():
+    rules = IgnoreRules(["*.md"]).extend(["!keep.md"], base="docs")
+    assert rules.matches("a.md")
+    assert rules.matches("docs/other.md")
+    assert not rules.matches("docs/keep.md")
+    assert rules.matches("keep.md")
+
+def test_walk_honours_ignore_files(tree):
+    files = relative(CorpusWalker().walk(tree), tree)
+
+    assert files == ["README.md", "a/b/c.md", "a/b.md", "a.md", "docs/guide.md", "docs/keep.draft.md",
+                     "vendor/lib/doc.md"]
+    assert [tree / name for name in files] == sorted(tree / name for name in files)
+
+def test_walk_include_exclude(tree):
+    walker = CorpusWalker(include=["*.md", "*.txt"], exclude=["vendor/", "/README.md"])
+
+    assert relative(walker.walk(tree), tree) == ["a/b/c.md", "a/b.md", "a/notes.txt", "a.md", "docs/guide.md",
+                                                 "docs/keep.draft.md"]
+
+def test_walk_without_ignore_files(tree):
+    files = relative(CorpusWalker(ignore_files=()).walk(tree), tree)
+
+    assert "build/out.md" in files
+    assert "docs/draft.md" in files
+    assert ".git/HEAD.md" not in files
+
+def test_parallel_walk_finds_same_files(tree):
+    for i in range(20):
+        (tree / "many" / str(i)).mkdir(parents=True)
+        (tree / "many" / str(i) / "doc.md").write_text("# Doc\n")
+
+    assert sorted(CorpusWalker(workers=4).walk(tree)) == list(CorpusWalker().walk(tree))
+
+def test_walk_missing_directory(tmp_path):
+    with pytest.raises(MDCorpusError):
+        CorpusWalker().walk(tmp_path / "missing")
+
+def test_includes_single_path(tree):
+    walker = CorpusWalker()
+
+    assert walker.includes(tree, tree / "docs" / "guide.md")
+    assert not walker.includes(tree, tree / "docs" / "draft.md")
+    assert not walker.includes(tree, tree / "node_modules" / "pkg" / "README.md")
+    assert not walker.includes(tree, tree / "a" / "notes.txt")
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_directory_uses_walker(tree, workers):
+    corpus = MDCorpus(MockStorageProvider())
+
+    results = corpus.process_directory(tree, convert=False, workers=workers,
+                                       walker=CorpusWalker(exclude=["vendor/"], workers=workers))
+
+    assert relative([result.path for result in results], tree) == ["README.md", "a/b/c.md", "a/b.md", "a.md",
+                                                                   "docs/guide.md", "docs/keep.draft.md"]
@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from md_corpus import MDCorpus
+from md_corpus.linkgraph import LinkGraph
+from md_corpus.state import IncrementalState
+from md_corpus.walker import CorpusWalker
+from md_corpus.watch import PollingSource, Watcher
+from tests.test_core import MockStorageProvider
+
+class HashingProvider(MockStorageProvider):
+    """Provider whose URLs change with the asset content"""
+    def upload_file(self, file_path):
+        super().upload_file(file_path)
+        digest = hashlib.sha256(Path(file_path).read_bytes()).hexdigest()[:8]
+        return f"{self.base_url}/{digest}/{Path(file_path).name}"
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "image.png").write_bytes(b"image v1")
+    (tmp_path / "a.md").write_text("![img](./image.png)\n")
+    (tmp_path / "b.md").write_text("# B\n")
+    return tmp_path
+
+def make_watcher(tree, provider, **kwargs):
+    corpus = MDCorpus(provider)
+    state = IncrementalState(tree / ".md-corpus-state.json", root=tree)
+    corpus.process_directory(tree, state=state)
+    return Watcher(corpus, tree, state, **kwargs)
+
+def test_process_changed_documents(tree):
+    watcher = make_watcher(tree, MockStorageProvider())
+    (tree / "b.md").write_text("# B\n* Item\n")
+    (tree / "a.md").touch()
+    
+    results, errors = watcher.process([tree / "a.md", tree / "b.md", tree / ".hidden.md"])
+    
+    assert errors == {}
+    assert [result.path for result in results] == [str(tree / "b.md")]
+    assert (tree / "b.md").read_text() == "# B\n\n- Item\n"
+
+def test_deleted_document_is_forgotten(tree):
+    watcher = make_watcher(tree, MockStorageProvider())
+    (tree / "a.md").unlink()
+    
+    watcher.process([tree / "a.md"])
+    
+    assert watcher.state.dependents('convert', tree / "image.png") == []
+
+def test_changed_asset_is_uploaded_again(tree):
+    provider = HashingProvider()
+    watcher = make_watcher(tree, provider)
+    old_url = watcher.state.assets('convert', tree / "a.md")[tree / "image.png"]
+    assert old_url in (tree / "a.md").read_text()
+    
+    (tree / "image.png").write_bytes(b"image v2")
+    results, errors = watcher.process([tree / "image.png"])
+    
+    new_url = watcher.state.assets('convert', tree / "a.md")[tree / "image.png"]
+    assert errors == {}
+    assert new_url != old_url
+    assert (tree / "a.md").read_text() == f"![img]({new_url})\n"
+    assert [result.path for result in results] == [str(tree / "a.md")]
+    assert not watcher.state.is_dirty('convert', tree / "a.md")
+
+def test_changed_asset_is_uploaded_again_after_document_edit(tree):
+    provider = HashingProvider()
+    watcher = make_watcher(tree, provider)
+    old_url = watcher.state.assets('convert', tree / "a.md")[tree / "image.png"]
+    (tree / "a.md").write_text(f"# A\n\n![img]({old_url})\n")
+    watcher.process([tree / "a.md"])
+    
+    (tree / "image.png").write_bytes(b"image v2")
+    results, errors = watcher.process([tree / "image.png"])
+    
+    new_url = watcher.state.assets('convert', tree / "a.md")[tree / "image.png"]
+    assert errors == {}
+    assert new_url != old_url
+    assert (tree / "a.md").read_text() == f"# A\n\n![img]({new_url})\n"
+
+def test_refresh_replaces_only_link_targets(tree):
+    watcher = make_watcher(tree, HashingProvider())
+    old_url = watcher.state.assets('convert', tree / "a.md")[tree / "image.png"]
+    (tree / "a.md").write_text(f"![img]({old_url})\n\nFirst published at `{old_url}`\n")
+    watcher.process([tree / "a.md"])
+    
+    (tree / "image.png").write_bytes(b"image v2")
+    results, errors = watcher.process([tree / "image.png"])
+    
+    new_url = watcher.state.assets('convert', tree / "a.md")[tree / "image.png"]
+    assert errors == {}
+    assert (tree / "a.md").read_text() == f"![img]({new_url})\n\nFirst published at `{old_url}`\n"
+
+def test_polling_source_follows_walker_rules(tree):
+    (tree / ".gitignore").write_text("build/\n")
+    (tree / "build").mkdir()
+    (tree / "build" / "out.md").write_text("# Out\n")
+    (tree / "notes.txt").write_text("notes")
+    source = PollingSource(tree, 0.01, CorpusWalker(), lambda: [tree / "image.png"])
+    
+    (tree / "build" / "out.md").write_text("# Out changed\n")
+    (tree / "notes.txt").write_text("notes changed")
+    (tree / "image.png").write_bytes(b"image version 2")
+    (tree / "b.md").write_text("# B changed\n")
+    
+    assert source.wait(0) == {tree / "image.png", tree / "b.md"}
+
+@pytest.mark.parametrize("backend", ["polling", "native"])
+def test_run_debounces_changes(tree, backend):
+    if backend == "native":
+        pytest.importorskip("watchdog")
+    watcher = make_watcher(tree, MockStorageProvider(), backend=backend, debounce=0.2, poll_interval=0.05)
+    batches = []
+    stop = threading.Event()
+    ready = threading.Event()
+    
+    def on_batch(results, errors):
+        batches.append(sorted(Path(result.path).name for result in results))
+    
+    thread = threading.Thread(target=watcher.run, kwargs={'stop': stop, 'on_batch': on_batch, 'on_ready': ready.set})
+    thread.start()
+    try:
+        assert ready.wait(5)
+        time.sleep(0.1)
+        (tree / "c.md").write_text("* new\n")
+        time.sleep(0.05)
+        (tree / "b.md").write_text("* changed\n")
+        deadline = time.monotonic() + 5
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join(5)
+    
+    assert batches[0] == ["b.md", "c.md"]
+    assert (tree / "c.md").read_text() == "- new\n"
+
+def test_changed_asset_refreshed_through_link_graph(tree):
+    corpus = MDCorpus(HashingProvider(), link_graph=LinkGraph(tree / ".links.db"))
+    state = IncrementalState(tree / ".md-corpus-state.json", root=tree)
+    corpus.process_directory(tree, state=state)
+    watcher = Watcher(corpus, tree, state)
+    
+    (tree / "image.png").write_bytes(b"image v2")
+    results, errors = watcher.process([tree / "image.png"])
+    
+    new_url = corpus.link_graph.assets(tree / "a.md")[tree / "image.png"]
+    assert errors == {}
+    assert (tree / "a.md").read_text() == f"![img]({new_url})\n"
+    assert [result.path for result in results] == [str(tree / "a.md")]
+    assert not state.is_dirty('convert', tree / "a.md")